@@ -3,7 +3,20 @@ import pandas as pd
 import plotly.express as px
 from datetime import datetime
 from io import BytesIO
+from data_export import export_bytes
+from database import PARTICIPANT_COLUMNS
+from figure_cache import figure_cache
 from game_config import GameConfigManager, GameOperatorManager
+from live_leaderboard import gift_figure
+from snapshot_cache import snapshot_cache
+from streamlit_tables import paginated_table
+
+# Sort choices for the participants table: label -> (record field, descending)
+PARTICIPANT_SORTS = {
+    'Employee ID': ('emp_id', False),
+    'Name': ('name', False),
+    'Newest first': ('registration_date', True)
+}
 
 class AdminPanel:
     def __init__(self, database, auth_system):
@@ -56,20 +69,15 @@ class AdminPanel:
                 st.write("Enter scores for a participant:")
                 
                 # Get all participants for dropdown
-                participants = self.db.get_all_participants()
-                if not participants.empty:
-                    participant_options = []
-                    for _, p in participants.iterrows():
-                        participant_options.append(f"{p['emp_id']} - {p['name']}")
-                    
-                    selected_participant = st.selectbox(
+                registry = self.db.get_participant_registry()
+                if len(registry):
+                    emp_id = st.selectbox(
                         "Select Participant",
-                        options=participant_options
+                        options=registry.emp_ids,
+                        format_func=registry.id_label
                     )
                     
-                    if selected_participant:
-                        emp_id = selected_participant.split(' - ')[0]
-                        
+                    if emp_id:
                         # Game score inputs
                         col_g1, col_g2, col_g3, col_g4, col_g5 = st.columns(5)
                         
@@ -123,17 +131,14 @@ class AdminPanel:
         """Participant management interface"""
         st.write("### 👥 Participant Management")
         
-        participants_df = self.db.get_all_participants()
+        registry = self.db.get_participant_registry()
         
         # Debug information
         st.write("**Debug Info:**")
-        st.write(f"DataFrame shape: {participants_df.shape}")
-        st.write(f"DataFrame columns: {list(participants_df.columns)}")
-        if not participants_df.empty:
-            st.write("First few rows:")
-            st.write(participants_df.head())
+        st.write(f"Registered participants: {len(registry)}")
+        st.write(f"Columns: {PARTICIPANT_COLUMNS}")
         
-        if not participants_df.empty:
+        if len(registry):
             col1, col2 = st.columns([3, 1])
             
             with col1:
@@ -141,64 +146,49 @@ class AdminPanel:
                 st.write("#### Registered Participants")
                 
                 # Add search functionality
-                search_term = st.text_input("🔍 Search participants", placeholder="Search by name or emp_id")
+                search_term = st.text_input("🔍 Search participants", placeholder="Search by name, emp_id or email")
+                sort_label = st.selectbox("Sort by", list(PARTICIPANT_SORTS), key="participants_sort")
+                sort_by, descending = PARTICIPANT_SORTS[sort_label]
                 
-                if search_term and not participants_df.empty:
-                    # Safe search with column existence check (removed department)
-                    mask = pd.Series([False] * len(participants_df))
-                    if 'name' in participants_df.columns:
-                        mask |= participants_df['name'].str.contains(search_term, case=False, na=False)
-                    if 'emp_id' in participants_df.columns:
-                        mask |= participants_df['emp_id'].str.contains(search_term, case=False, na=False)
-                    filtered_df = participants_df[mask]
-                else:
-                    filtered_df = participants_df
+                # Only the visible page is fetched; search goes through the shared index
+                page = paginated_table(
+                    lambda offset, limit: self.db.query_participants(
+                        offset, limit, sort_by=sort_by, descending=descending, search=search_term
+                    ),
+                    key="participants_page",
+                    reset_on=(search_term, sort_label)
+                )
                 
-                # Display table with selection
-                if not filtered_df.empty:
-                    # Ensure all required columns exist (removed department requirement)
-                    required_columns = ['emp_id', 'name', 'email', 'registration_date']
-                    available_columns = [col for col in required_columns if col in filtered_df.columns]
-                    
-                    if available_columns:
-                        st.dataframe(
-                            filtered_df[available_columns],
-                            use_container_width=True,
-                            height=400
-                        )
-                        
-                        # Excel download feature
-                        if st.button("📥 Download as Excel", key="download_participants"):
-                            try:
-                                # Create Excel file in memory
-                                from io import BytesIO
-                                import pandas as pd
-                                
-                                output = BytesIO()
-                                with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                                    filtered_df[available_columns].to_excel(writer, sheet_name='Participants', index=False)
-                                
-                                output.seek(0)
-                                
-                                st.download_button(
-                                    label="💾 Download Excel File",
-                                    data=output.getvalue(),
-                                    file_name=f"participants_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                                )
-                                st.success("Excel file ready for download!")
-                            except Exception as e:
-                                st.error(f"Error creating Excel file: {str(e)}")
-                    else:
-                        st.error("No valid columns found in participant data!")
-                        st.write("Available columns:", list(filtered_df.columns))
+                if page.total:
+                    # Excel download feature
+                    if st.button("📥 Download as Excel", key="download_participants"):
+                        try:
+                            # Fetch every matching row only when a download is asked for
+                            matching = self.db.query_participants(
+                                0, page.total, sort_by=sort_by, descending=descending, search=search_term
+                            ).rows
+                            output = BytesIO()
+                            with pd.ExcelWriter(output, engine='openpyxl') as writer:
+                                matching.to_excel(writer, sheet_name='Participants', index=False)
+                            
+                            output.seek(0)
+                            
+                            st.download_button(
+                                label="💾 Download Excel File",
+                                data=output.getvalue(),
+                                file_name=f"participants_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+                                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                            )
+                            st.success("Excel file ready for download!")
+                        except Exception as e:
+                            st.error(f"Error creating Excel file: {str(e)}")
                     
                     # Bulk operations
                     st.write("#### Bulk Operations")
                     selected_participants = st.multiselect(
-                        "Select participants for bulk operations",
-                        options=filtered_df['emp_id'].tolist(),
-                        format_func=lambda x: f"{x} - {filtered_df[filtered_df['emp_id']==x]['name'].iloc[0]}"
+                        "Select participants on this page for bulk operations",
+                        options=page.rows['emp_id'].tolist(),
+                        format_func=registry.id_label
                     )
                     
                     if selected_participants:
@@ -231,16 +221,20 @@ class AdminPanel:
                 st.metric("Pending Scores", stats['total_participants'] - stats['total_scored'])
                 
                 # Participation summary chart
-                if not participants_df.empty:
+                if stats['total_participants']:
                     participation_data = {
                         'Category': ['Scored', 'Pending'],
                         'Count': [stats['total_scored'], stats['total_participants'] - stats['total_scored']]
                     }
-                    fig_participation = px.pie(
-                        values=participation_data['Count'],
-                        names=participation_data['Category'],
-                        title="Participation Status",
-                        height=300
+                    fig_participation = figure_cache.get(
+                        'participation_status',
+                        tuple(participation_data['Count']),
+                        lambda: px.pie(
+                            values=participation_data['Count'],
+                            names=participation_data['Category'],
+                            title="Participation Status",
+                            height=300
+                        )
                     )
                     st.plotly_chart(fig_participation, use_container_width=True)
                 
@@ -251,10 +245,19 @@ class AdminPanel:
                     if excel_buffer:
                         st.download_button(
                             label="📥 Download Excel File",
-                            data=excel_buffer,
+                            data=export_bytes(excel_buffer),
                             file_name=f"event_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
                             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                         )
+                if st.button("📄 Export Scores to CSV", help="Export the score table as CSV"):
+                    csv_file = self.db.export_data_to_csv('Scores')
+                    if csv_file:
+                        st.download_button(
+                            label="📥 Download CSV File",
+                            data=export_bytes(csv_file),
+                            file_name=f"scores_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                            mime="text/csv"
+                        )
         else:
             st.info("No participants registered yet.")
     
@@ -264,6 +267,7 @@ class AdminPanel:
         
         scores_df = self.db.get_all_scores()
         participants_df = self.db.get_all_participants()
+        scores_version = self.db.scores_version()
         
         if not scores_df.empty:
             # Key metrics
@@ -283,25 +287,24 @@ class AdminPanel:
             
             with col1:
                 # Score distribution histogram
-                fig_hist = px.histogram(
+                fig_hist = figure_cache.get('score_distribution', scores_version, lambda: px.histogram(
                     scores_df,
                     x='total',
                     nbins=20,
                     title="Score Distribution",
                     labels={'total': 'Total Score', 'count': 'Number of Participants'}
-                )
+                ))
                 st.plotly_chart(fig_hist, use_container_width=True)
                 
                 # Game-wise performance
                 game_cols = ['game1', 'game2', 'game3', 'game4', 'game5']
-                game_avg = scores_df[game_cols].mean()
                 
-                fig_games = px.bar(
+                fig_games = figure_cache.get('game_averages', scores_version, lambda: px.bar(
                     x=game_cols,
-                    y=game_avg.values,
+                    y=scores_df[game_cols].mean().values,
                     title="Average Score by Game",
                     labels={'x': 'Game', 'y': 'Average Score'}
-                )
+                ))
                 st.plotly_chart(fig_games, use_container_width=True)
             
             with col2:
@@ -315,26 +318,17 @@ class AdminPanel:
                             game_participation[game.title()] = participated
                     
                     if game_participation:
-                        fig_games = px.bar(
+                        fig_games = figure_cache.get('game_participation', tuple(game_participation.items()), lambda: px.bar(
                             x=list(game_participation.keys()),
                             y=list(game_participation.values()),
                             title="Game Participation Count",
                             labels={'x': 'Games', 'y': 'Participants'}
-                        )
+                        ))
                         st.plotly_chart(fig_games, use_container_width=True)
                 
-                # Gift type distribution over time
+                # Gift type distribution (the same figure as the leaderboard's)
                 gift_counts = scores_df['gift_type'].value_counts()
-                fig_gift = px.pie(
-                    values=gift_counts.values,
-                    names=gift_counts.index,
-                    title="Gift Distribution",
-                    color_discrete_map={
-                        'Gold': '#FFD700',
-                        'Silver': '#C0C0C0',
-                        'Participation': '#87CEEB'
-                    }
-                )
+                fig_gift = figure_cache.get('leaderboard_gifts', tuple(gift_counts.items()), lambda: gift_figure(gift_counts))
                 st.plotly_chart(fig_gift, use_container_width=True)
             
             # Detailed performance analysis
@@ -398,7 +392,7 @@ class AdminPanel:
                 if excel_buffer:
                     st.download_button(
                         label="📥 Download Backup",
-                        data=excel_buffer,
+                        data=export_bytes(excel_buffer),
                         file_name=f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
                         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                     )
@@ -422,9 +416,31 @@ class AdminPanel:
                     st.session_state['confirm_reset'] = True
                     st.warning("⚠️ This will delete ALL data. Click again to confirm.")
         
+        if self.db.supports_point_in_time():
+            st.write("#### 🕰️ Scores at a Point in Time")
+            col1, col2 = st.columns(2)
+            with col1:
+                as_of_date = st.date_input("Date", value=datetime.now().date(), key="as_of_date")
+            with col2:
+                as_of_time = st.time_input("Time", value=datetime.now().time().replace(second=0, microsecond=0), key="as_of_time")
+            
+            if st.button("🔁 Rebuild Scores"):
+                as_of = datetime.combine(as_of_date, as_of_time)
+                as_of_scores = self.db.get_scores_as_of(as_of)
+                if as_of_scores.empty:
+                    st.info(f"No scores had been recorded by {as_of.strftime('%Y-%m-%d %H:%M')}")
+                else:
+                    st.dataframe(
+                        as_of_scores.sort_values('total', ascending=False)[['emp_id', 'name', 'game1', 'game2', 'game3', 'game4', 'game5', 'total', 'gift_type']],
+                        use_container_width=True,
+                        hide_index=True
+                    )
+        
         # System information
         st.write("#### ℹ️ System Information")
         stats = self.db.get_statistics()
+        cache_stats = snapshot_cache.stats()
+        chart_stats = figure_cache.stats()
         
         info_data = {
             'Metric': [
@@ -435,6 +451,8 @@ class AdminPanel:
                 'Gold Winners',
                 'Silver Winners',
                 'Participation Gifts',
+                'Read Cache Hits / Misses',
+                'Chart Cache Hits / Misses',
                 'Last Updated'
             ],
             'Value': [
@@ -445,12 +463,23 @@ class AdminPanel:
                 stats['gold_winners'],
                 stats['silver_winners'],
                 stats['participation_gifts'],
+                f"{cache_stats['hits']} / {cache_stats['misses']} ({cache_stats['hit_rate']}%)",
+                f"{chart_stats['hits']} / {chart_stats['misses']} ({chart_stats['hit_rate']}%, {chart_stats['bytes'] // 1024} KB)",
                 datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             ]
         }
         
         info_df = pd.DataFrame(info_data)
         st.dataframe(info_df, use_container_width=True, hide_index=True)
+        
+        if st.button("🔍 Verify Statistics", help="Recompute statistics from scratch and compare"):
+            differences = self.db.verify_statistics()
+            if differences:
+                st.warning("Statistics were out of date and have been rebuilt:")
+                for difference in differences:
+                    st.write(f"• {difference}")
+            else:
+                st.success("✅ Statistics match a full recompute")
     
     def show_game_configuration(self):
         """Game configuration management"""
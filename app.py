@@ -20,6 +20,15 @@ from dashboard import UserDashboard
 from email_service import EmailService
 from game_operator import GameOperatorPanel
 from game_logger import GameScoringLogger
+from write_behind import get_write_behind_queue, write_behind_enabled
+from streamlit_errors import install_streamlit_reporter
+from email_outbox import get_outbox, get_outbox_worker, resume_outbox_worker
+from email_templates import TemplateError, compile_template
+from live_leaderboard import get_leaderboard_view, rank_icon
+from streamlit_tables import paginated_table
+
+# Seconds between leaderboard refreshes, where Streamlit supports fragments
+LEADERBOARD_REFRESH_SECONDS = 5
 
 # Page configuration
 st.set_page_config(
@@ -176,6 +185,7 @@ def initialize_session_state():
 def main():
     """Main application function"""
     initialize_session_state()
+    install_streamlit_reporter()
     
     # Initialize components
     auth = Authentication()
@@ -183,14 +193,24 @@ def main():
     admin_panel = AdminPanel(database=db, auth_system=auth)  # FIXED CONSTRUCTOR
     user_dashboard = UserDashboard(db)
     email_service = EmailService()
+    # Start the outbox sender with the app when email is set up or a campaign
+    # is unfinished, so it resumes after a restart without anyone opening the
+    # Email Center (checked once per process)
+    resume_outbox_worker(email_service)
     game_logger = GameScoringLogger()
-    game_operator_panel = GameOperatorPanel(db, game_logger)
+    write_behind = get_write_behind_queue(db, game_logger) if write_behind_enabled() else None
+    game_operator_panel = GameOperatorPanel(db, game_logger, write_behind)
     
     # Header
     st.markdown('<h1 class="main-header">🎮 Event Tracker - Gamified Scoring System</h1>', unsafe_allow_html=True)
     
-    # Authentication
-    authenticator = auth.get_authenticator()
+    # Authentication: keep one authenticator per session (its cookie manager
+    # belongs to the browser session) and rebuild it only when users change
+    users_version = auth.users_version()
+    if st.session_state.get('authenticator_users_version') != users_version:
+        st.session_state['authenticator'] = auth.get_authenticator()
+        st.session_state['authenticator_users_version'] = users_version
+    authenticator = st.session_state['authenticator']
     
     # Check if authenticator was created successfully
     if authenticator is None:
@@ -213,7 +233,7 @@ def main():
             except Exception as e:
                 st.error(f"Login error: {str(e)}")
                 st.error("Please check if all required files exist.")
-                
+        
         with col2:
             st.subheader("📝 New User Registration")
             with st.form("registration_form"):
@@ -278,12 +298,12 @@ def main():
             
             with tabs[3]:
                 show_email_center(db, email_service)
-                
+        
         elif is_game_operator:
             # Game operator interface
             assigned_game = auth.get_assigned_game(st.session_state["username"])
             game_operator_panel.show_game_operator_panel(assigned_game, st.session_state["username"])
-                
+        
         else:
             # Regular user interface
             tabs = st.tabs(["🏠 Dashboard", "🏆 Leaderboard"])
@@ -294,83 +314,74 @@ def main():
             with tabs[1]:
                 show_leaderboard(db)
 
+def live_fragment(function):
+    """Rerun function by itself every LEADERBOARD_REFRESH_SECONDS where Streamlit supports fragments"""
+    fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None)
+    if fragment is None:
+        return function
+    return fragment(run_every=LEADERBOARD_REFRESH_SECONDS)(function)
+
+def leaderboard_rows(rows):
+    """Leaderboard page as displayed: medal ranks and readable column names"""
+    return pd.DataFrame({
+        'Rank': rows['rank'].apply(rank_icon),
+        'Name': rows['name'],
+        'Total Score': rows['total'],
+        'Gift Category': rows['gift_type']
+    })
+
 def show_leaderboard(db):
     """Display the leaderboard"""
     st.subheader("🏆 Leaderboard")
-    
-    scores_df = db.get_all_scores()
-    if not scores_df.empty:
-        # Sort by total score descending
-        leaderboard = scores_df.sort_values('total', ascending=False).reset_index(drop=True)
-        leaderboard['rank'] = leaderboard.index + 1
-        
-        # Add rank icons
-        def get_rank_icon(rank):
-            if rank == 1:
-                return "🥇"
-            elif rank == 2:
-                return "🥈"
-            elif rank == 3:
-                return "🥉"
-            else:
-                return f"{rank}"
-        
-        leaderboard['Rank'] = leaderboard['rank'].apply(get_rank_icon)
-        
-        # Display leaderboard
-        display_cols = ['Rank', 'name', 'total', 'gift_type']
-        col_names = {'name': 'Name', 'total': 'Total Score', 'gift_type': 'Gift Category'}
-        
-        st.dataframe(
-            leaderboard[display_cols].rename(columns=col_names),
-            use_container_width=True,
+    show_live_leaderboard(db)
+
+@live_fragment
+def show_live_leaderboard(db):
+    """Leaderboard body, drawn from the shared view (rebuilt only when scores change)"""
+    view = get_leaderboard_view(db)
+    if view.stats:
+        # Only the visible page of the ranking is fetched and sent
+        paginated_table(
+            lambda offset, limit: db.query_leaderboard(offset, limit),
+            key="leaderboard_page",
+            prepare=leaderboard_rows,
             height=400
         )
         
+        if view.movements:
+            moves = []
+            for name, old_rank, new_rank in view.movements:
+                if old_rank is None:
+                    moves.append(f"🆕 {name} enters at #{new_rank}")
+                elif new_rank < old_rank:
+                    moves.append(f"📈 {name} #{old_rank} → #{new_rank}")
+                else:
+                    moves.append(f"📉 {name} #{old_rank} → #{new_rank}")
+            st.caption("Recent moves: " + " · ".join(moves))
+        
         # Leaderboard visualization
         col1, col2 = st.columns(2)
         
         with col1:
             # Top 10 bar chart
-            top_10 = leaderboard.head(10)
-            fig_bar = px.bar(
-                top_10, 
-                x='name', 
-                y='total',
-                title="Top 10 Participants",
-                color='total',
-                color_continuous_scale='viridis'
-            )
-            fig_bar.update_xaxes(tickangle=45)
-            st.plotly_chart(fig_bar, use_container_width=True, key="leaderboard_bar_chart")
+            st.plotly_chart(view.bar_figure, use_container_width=True, key="leaderboard_bar_chart")
         
         with col2:
             # Gift distribution pie chart
-            gift_counts = leaderboard['gift_type'].value_counts()
-            fig_pie = px.pie(
-                values=gift_counts.values,
-                names=gift_counts.index,
-                title="Gift Distribution",
-                color_discrete_map={
-                    'Gold': '#FFD700',
-                    'Silver': '#C0C0C0',
-                    'Participation': '#87CEEB'
-                }
-            )
-            st.plotly_chart(fig_pie, use_container_width=True, key="leaderboard_pie_chart")
+            st.plotly_chart(view.pie_figure, use_container_width=True, key="leaderboard_pie_chart")
         
         # Statistics
         st.subheader("📊 Statistics")
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("Total Participants", len(leaderboard))
+            st.metric("Total Participants", view.stats['participants'])
         with col2:
-            st.metric("Average Score", f"{leaderboard['total'].mean():.1f}")
+            st.metric("Average Score", f"{view.stats['average']:.1f}")
         with col3:
-            st.metric("Highest Score", leaderboard['total'].max())
+            st.metric("Highest Score", view.stats['highest'])
         with col4:
-            st.metric("Gold Winners", len(leaderboard[leaderboard['gift_type'] == 'Gold']))
+            st.metric("Gold Winners", view.stats['gold'])
     
     else:
         st.info("No scores available yet. Check back after the games begin! 🎮")
@@ -379,6 +390,9 @@ def show_email_center(db, email_service):
     """Display email center for admins"""
     st.subheader("📧 Email Center")
     
+    outbox = get_outbox()
+    outbox_worker = get_outbox_worker(outbox, email_service)
+    
     col1, col2 = st.columns([2, 1])
     
     with col1:
@@ -391,12 +405,12 @@ def show_email_center(db, email_service):
         )
         
         if email_type == "Custom Selection":
-            participants = db.get_all_participants()
-            if not participants.empty:
+            registry = db.get_participant_registry()
+            if len(registry):
                 selected_participants = st.multiselect(
                     "Select Participants",
-                    options=participants['emp_id'].tolist(),
-                    format_func=lambda x: f"{x} - {participants[participants['emp_id']==x]['name'].iloc[0]}"
+                    options=registry.emp_ids,
+                    format_func=registry.id_label
                 )
             else:
                 st.warning("No participants found!")
@@ -406,7 +420,7 @@ def show_email_center(db, email_service):
         st.subheader("📝 Email Template")
         email_subject = st.text_input("Subject", value="🎮 Your Event Score Results!")
         email_body = st.text_area(
-            "Email Body (Use {name}, {total_score}, {gift_type} as placeholders)",
+            "Email Body (Use {name}, {total_score}, {gift_type}, {emp_id}, {department} as placeholders)",
             value="""Dear {name},
 
 Congratulations on participating in our exciting event! 🎉
@@ -425,7 +439,15 @@ Event Team""",
     with col2:
         st.subheader("📊 Email Preview")
         if st.button("Preview Email"):
-            st.info("Email preview will be shown here")
+            try:
+                preview_body = compile_template(email_body).render({
+                    'name': 'John Doe', 'total_score': 85, 'gift_type': 'Gold',
+                    'emp_id': 'EMP001', 'department': 'Engineering'
+                })
+                st.markdown(f"**Subject:** {email_subject}")
+                st.text(preview_body)
+            except TemplateError as e:
+                st.error(str(e))
         
         if st.button("🚀 Send Emails", type="primary"):
             with st.spinner("Sending emails..."):
@@ -441,23 +463,26 @@ Event Team""",
                         recipients = db.get_scores_by_emp_ids(selected_participants)
                     
                     if not recipients.empty:
-                        success_count = 0
-                        for _, participant in recipients.iterrows():
-                            # Customize email for each participant
-                            personalized_body = email_body.format(
-                                name=participant['name'],
-                                total_score=participant['total'],
-                                gift_type=participant['gift_type']
+                        # Render every body from column arrays in one pass
+                        bodies = compile_template(email_body).render_frame(recipients)
+                        outbox_recipients = [
+                            {'emp_id': emp_id, 'name': name, 'email': email, 'body': body}
+                            for emp_id, name, email, body in zip(
+                                recipients['emp_id'].tolist(), recipients['name'].tolist(),
+                                recipients['email'].tolist(), bodies
                             )
-                            
-                            # Here you would integrate with SendGrid or SMTP
-                            # For now, we'll simulate the email sending
-                            success_count += 1
+                        ]
                         
-                        st.success(f"✅ Successfully sent {success_count} emails!")
+                        # Queue in the outbox; the background worker sends it even if this tab closes
+                        campaign_name = f"{email_type} ({datetime.now().strftime('%Y-%m-%d %H:%M')})"
+                        campaign_id = outbox.create_campaign(campaign_name, email_subject, outbox_recipients)
+                        outbox_worker.wake()
+                        st.success(f"✅ Queued {len(outbox_recipients)} emails as campaign #{campaign_id}. Sending continues in the background.")
                     else:
                         st.warning("No recipients found for the selected criteria.")
-                        
+                
+                except TemplateError as e:
+                    st.error(str(e))
                 except Exception as e:
                     st.error(f"Error sending emails: {str(e)}")
         
@@ -471,6 +496,63 @@ Event Team""",
             if not scores.empty:
                 st.metric("Gold Winners", len(scores[scores['gift_type'] == 'Gold']))
                 st.metric("Silver Winners", len(scores[scores['gift_type'] == 'Silver']))
+    
+    show_email_campaigns(outbox, outbox_worker)
+
+def show_email_campaigns(outbox, outbox_worker):
+    """Display outbox campaigns with live progress, throughput and retry controls"""
+    st.subheader("📬 Email Campaigns")
+    
+    if st.button("🔄 Refresh", key="refresh_campaigns"):
+        st.rerun()
+    
+    if outbox_worker.last_error:
+        st.warning(f"Email worker error: {outbox_worker.last_error}")
+    
+    campaigns = outbox.list_campaigns()
+    if not campaigns:
+        st.info("No email campaigns yet.")
+        return
+    
+    for campaign in campaigns:
+        in_progress = campaign['pending'] + campaign['sending'] > 0
+        title = f"#{campaign['id']} {campaign['name']} - {campaign['sent']}/{campaign['total']} sent"
+        if campaign['status'] == 'paused':
+            title += " (paused)"
+        
+        with st.expander(title, expanded=in_progress):
+            done = campaign['sent'] + campaign['failed']
+            st.progress(done / campaign['total'] if campaign['total'] else 1.0)
+            
+            col1, col2, col3, col4, col5 = st.columns(5)
+            col1.metric("Pending", campaign['pending'])
+            col2.metric("Sending", campaign['sending'])
+            col3.metric("Sent", campaign['sent'])
+            col4.metric("Failed", campaign['failed'])
+            col5.metric("Per Minute", campaign['per_minute'])
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                if campaign['status'] == 'paused':
+                    if st.button("▶️ Resume", key=f"resume_campaign_{campaign['id']}"):
+                        outbox.set_status(campaign['id'], 'running')
+                        outbox_worker.wake()
+                        st.rerun()
+                elif in_progress:
+                    if st.button("⏸️ Pause", key=f"pause_campaign_{campaign['id']}"):
+                        outbox.set_status(campaign['id'], 'paused')
+                        st.rerun()
+            with col2:
+                if campaign['failed'] > 0:
+                    if st.button("🔁 Retry Failed", key=f"retry_campaign_{campaign['id']}"):
+                        retried = outbox.retry_failed(campaign['id'])
+                        outbox_worker.wake()
+                        st.success(f"Re-queued {retried} failed emails")
+                        st.rerun()
+            
+            if campaign['failed'] > 0:
+                failed = pd.DataFrame(outbox.failed_jobs(campaign['id']), columns=['Email', 'Error'])
+                st.dataframe(failed, use_container_width=True, hide_index=True)
 
 if __name__ == "__main__":
     main()
@@ -1,16 +1,99 @@
-import streamlit as st
 import yaml
 from yaml.loader import SafeLoader
-import streamlit_authenticator as stauth
-import bcrypt
+import copy
 import json
 import os
+import threading
+import time
+from errors import report_error
+from file_lock import atomic_write_json, file_lock
+from password_service import get_password_service
+from snapshot_cache import file_signature
+
+class UserDirectory:
+    """Process-wide in-memory copy of users.json
+    
+    Saves through Authentication replace the copy directly. Edits made
+    outside this process are picked up by a stat of the file at most every
+    check_interval seconds, so repeated lookups within a rerun do not touch
+    the disk. The version increases whenever the users change.
+    """
+    
+    def __init__(self, users_file, check_interval=2.0):
+        self.users_file = users_file
+        self.check_interval = check_interval
+        self.version = 0
+        self._lock = threading.Lock()
+        self._users = None
+        self._signature = None
+        self._checked = 0.0
+        self._credentials = None
+    
+    def users(self, fresh=False):
+        """Current users as {username: record}; shared, treat as read-only
+        
+        fresh=True checks the file now instead of after check_interval.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._users is None or fresh or now - self._checked >= self.check_interval:
+                signature = file_signature(self.users_file)
+                if self._users is None or signature != self._signature:
+                    with open(self.users_file, 'r') as file:
+                        self._set(json.load(file), signature)
+                self._checked = now
+            return self._users
+    
+    def replace(self, users):
+        """Record users just written to users_file"""
+        with self._lock:
+            self._set(copy.deepcopy(users), file_signature(self.users_file))
+            self._checked = time.monotonic()
+    
+    def _set(self, users, signature):
+        self._users = users
+        self._signature = signature
+        self._credentials = None
+        self.version += 1
+    
+    def credentials(self):
+        """Authenticator credentials for the current users (built once per version)"""
+        users = self.users()
+        with self._lock:
+            if self._credentials is None:
+                self._credentials = {
+                    'usernames': {
+                        username: {'name': user_data['name'], 'password': user_data['password']}
+                        for username, user_data in users.items()
+                    }
+                }
+            return self._credentials
+
+_directories = {}
+_directories_lock = threading.Lock()
+_cookie_settings = {}
+_ensured_files = set()
+
+def get_user_directory(users_file):
+    """Get the process-wide user directory for users_file"""
+    key = os.path.abspath(users_file)
+    with _directories_lock:
+        directory = _directories.get(key)
+        if directory is None:
+            directory = UserDirectory(users_file)
+            _directories[key] = directory
+        return directory
 
 class Authentication:
     def __init__(self):
         self.config_file = 'config.yaml'
         self.users_file = 'users.json'
-        self.ensure_config_exists()
+        # Authentication is created on every rerun; check the files once per process
+        files = (os.path.abspath(self.config_file), os.path.abspath(self.users_file))
+        if files not in _ensured_files:
+            self.ensure_config_exists()
+            _ensured_files.add(files)
+        self.directory = get_user_directory(self.users_file)
     
     def ensure_config_exists(self):
         """Ensure configuration files exist"""
@@ -40,13 +123,10 @@ class Authentication:
     
     def create_default_users(self):
         """Create default users file with admin user and game operators"""
-        # Create default admin user
+        # Default admin and game operator passwords, hashed in parallel
         admin_password = "admin123"
-        admin_hashed = bcrypt.hashpw(admin_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-        
-        # Create game operator password
         game_password = "game123"
-        game_hashed = bcrypt.hashpw(game_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        admin_hashed, game_hashed = get_password_service().hash_passwords([admin_password, game_password])
         
         users = {
             "admin": {
@@ -113,27 +193,35 @@ class Authentication:
                 config = yaml.load(file, Loader=SafeLoader)
             return config
         except Exception as e:
-            st.error(f"Error loading config: {str(e)}")
+            report_error(f"Error loading config: {str(e)}")
             return None
     
-    def load_users(self):
-        """Load users from file"""
+    def load_users(self, fresh=False):
+        """Load users (a private copy the caller may modify and save)
+        
+        Pass fresh=True under users_lock() so the copy includes every
+        save made by other processes.
+        """
         try:
-            with open(self.users_file, 'r') as file:
-                users = json.load(file)
-            return users
+            return copy.deepcopy(self.directory.users(fresh))
         except Exception as e:
-            st.error(f"Error loading users: {str(e)}")
+            report_error(f"Error loading users: {str(e)}")
             return {}
     
+    def users_lock(self):
+        """Cross-process lock to hold around a load_users(fresh=True) / save_users cycle"""
+        return file_lock(self.users_file)
+    
     def save_users(self, users):
         """Save users to file"""
         try:
-            with open(self.users_file, 'w') as file:
-                json.dump(users, file, indent=2)
+            with file_lock(self.users_file):
+                atomic_write_json(self.users_file, users)
+                self.directory.replace(users)
+            self.update_config_with_users()
             return True
         except Exception as e:
-            st.error(f"Error saving users: {str(e)}")
+            report_error(f"Error saving users: {str(e)}")
             return False
     
     def update_config_with_users(self):
@@ -153,74 +241,118 @@ class Authentication:
             with open(self.config_file, 'w') as file:
                 yaml.dump(config, file, default_flow_style=False)
     
+    def users_version(self):
+        """Changes whenever the users change; used to rebuild a stored authenticator"""
+        self.directory.users()
+        return self.directory.version
+    
+    def get_cookie_settings(self):
+        """Cookie settings from config.yaml, read once per process"""
+        key = os.path.abspath(self.config_file)
+        if key not in _cookie_settings:
+            config = self.load_config()
+            if not config:
+                return None
+            _cookie_settings[key] = config['cookie']
+        return _cookie_settings[key]
+    
     def get_authenticator(self):
-        """Get streamlit authenticator instance"""
-        self.update_config_with_users()
-        config = self.load_config()
+        """Get streamlit authenticator instance
+        
+        Built from the in-memory user directory; nothing is read from or
+        written to disk once the cookie settings are loaded.
+        """
+        # Imported here: streamlit_authenticator pulls in Streamlit, which
+        # headless users of Authentication do not need
+        import streamlit_authenticator as stauth
+        
+        cookie = self.get_cookie_settings()
         
-        if config:
+        if cookie:
+            try:
+                # The authenticator records login state in the credentials
+                credentials = copy.deepcopy(self.directory.credentials())
+            except Exception as e:
+                report_error(f"Error loading users: {str(e)}")
+                return None
             try:
                 # Try newer streamlit-authenticator API
                 authenticator = stauth.Authenticate(
-                    config['credentials'],
-                    config['cookie']['name'],
-                    config['cookie']['key'],
-                    config['cookie']['expiry_days'],
+                    credentials,
+                    cookie['name'],
+                    cookie['key'],
+                    cookie['expiry_days'],
                     preauthorized=None
                 )
             except TypeError:
                 # Fallback to older API
                 authenticator = stauth.Authenticate(
-                    config['credentials'],
-                    config['cookie']['name'],
-                    config['cookie']['key'],
-                    config['cookie']['expiry_days']
+                    credentials,
+                    cookie['name'],
+                    cookie['key'],
+                    cookie['expiry_days']
                 )
             return authenticator
         return None
     
     def register_user(self, username, name, emp_id, email, password):
         """Register a new user"""
-        users = self.load_users()
-        
         # Check if username or emp_id already exists
-        for existing_username, user_data in users.items():
-            if existing_username == username or user_data.get('emp_id') == emp_id:
-                return False
+        if self._user_exists(self.load_users(), username, emp_id):
+            return False
         
-        # Hash password
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        # Hash password (outside the lock; bcrypt is slow)
+        hashed_password = get_password_service().hash_password(password)
         
-        # Add new user
-        users[username] = {
-            'name': name,
-            'emp_id': emp_id,
-            'email': email,
-            'password': hashed_password,
-            'is_admin': False
-        }
-        
-        return self.save_users(users)
+        with self.users_lock():
+            # Re-check: another session may have registered them meanwhile
+            users = self.load_users(fresh=True)
+            if self._user_exists(users, username, emp_id):
+                return False
+            
+            # Add new user
+            users[username] = {
+                'name': name,
+                'emp_id': emp_id,
+                'email': email,
+                'password': hashed_password,
+                'is_admin': False
+            }
+            
+            return self.save_users(users)
+    
+    @staticmethod
+    def _user_exists(users, username, emp_id):
+        for existing_username, user_data in users.items():
+            if existing_username == username or user_data.get('emp_id') == emp_id:
+                return True
+        return False
     
     def get_user_info(self, username):
         """Get user information"""
-        users = self.load_users()
-        return users.get(username, {})
+        try:
+            users = self.directory.users()
+        except Exception as e:
+            report_error(f"Error loading users: {str(e)}")
+            return {}
+        return dict(users.get(username, {}))
     
     def make_admin(self, username):
         """Make a user admin"""
-        users = self.load_users()
-        if username in users:
-            users[username]['is_admin'] = True
-            return self.save_users(users)
+        with self.users_lock():
+            users = self.load_users(fresh=True)
+            if username in users:
+                users[username]['is_admin'] = True
+                return self.save_users(users)
         return False
     
     def remove_admin(self, username):
         """Remove admin privileges from a user"""
-        users = self.load_users()
-        if username in users and username != 'admin':  # Protect default admin
-            users[username]['is_admin'] = False
-            return self.save_users(users)
+        with self.users_lock():
+            users = self.load_users(fresh=True)
+            if username in users and username != 'admin':  # Protect default admin
+                users[username]['is_admin'] = False
+                return self.save_users(users)
         return False
     
     def get_all_users(self):
@@ -232,10 +364,11 @@ class Authentication:
         if username == 'admin':  # Protect default admin
             return False
         
-        users = self.load_users()
-        if username in users:
-            del users[username]
-            return self.save_users(users)
+        with self.users_lock():
+            users = self.load_users(fresh=True)
+            if username in users:
+                del users[username]
+                return self.save_users(users)
         return False
     
     def is_game_operator(self, username):
@@ -250,23 +383,24 @@ class Authentication:
     
     def recreate_game_operators(self):
         """Recreate game operator accounts with fresh passwords"""
-        users = self.load_users()
-        
         # Create game operator password
         game_password = "game123"
-        game_hashed = bcrypt.hashpw(game_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        game_hashed = get_password_service().hash_password(game_password)
         
-        # Add/update game operators
-        for i in range(1, 6):
-            username = f"game{i}_op"
-            users[username] = {
-                "name": f"Game {i} Operator",
-                "emp_id": f"GAME00{i}",
-                "email": f"game{i}@company.com",
-                "password": game_hashed,
-                "is_admin": False,
-                "role": "game_operator",
-                "assigned_game": i
-            }
-        
-        return self.save_users(users)
+        with self.users_lock():
+            users = self.load_users(fresh=True)
+            
+            # Add/update game operators
+            for i in range(1, 6):
+                username = f"game{i}_op"
+                users[username] = {
+                    "name": f"Game {i} Operator",
+                    "emp_id": f"GAME00{i}",
+                    "email": f"game{i}@company.com",
+                    "password": game_hashed,
+                    "is_admin": False,
+                    "role": "game_operator",
+                    "assigned_game": i
+                }
+            
+            return self.save_users(users)
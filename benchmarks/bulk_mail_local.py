@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Bulk email against a local SMTP stand-in
+
+Starts an in-process SMTP server on localhost (aiosmtpd if installed,
+otherwise the standard library smtpd), sends a batch through
+EmailService.send_bulk_emails and compares it with one connection per
+message. Every Nth message is refused with a temporary 451 reply on its
+first attempt to exercise the retry path.
+
+Usage:
+    python benchmarks/bulk_mail_local.py --recipients 500 --connections 4
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+class MailSink:
+    """Counts delivered messages; refuses every Nth recipient once with 451"""
+    
+    def __init__(self, fail_every):
+        self.fail_every = fail_every
+        self.lock = threading.Lock()
+        self.received = []
+        self.attempts = {}
+    
+    def accept(self, recipients, data):
+        with self.lock:
+            recipient = recipients[0]
+            self.attempts[recipient] = self.attempts.get(recipient, 0) + 1
+            number = int(recipient.split('@')[0].replace('user', ''))
+            if self.fail_every and number % self.fail_every == 0 and self.attempts[recipient] == 1:
+                return '451 Temporary failure, try again'
+            self.received.append(recipient)
+            return None
+
+def start_server(sink, port):
+    """Start an SMTP stand-in on localhost:port in a background thread"""
+    try:
+        from aiosmtpd.controller import Controller
+        
+        class Handler:
+            async def handle_DATA(self, server, session, envelope):
+                reply = sink.accept(envelope.rcpt_tos, envelope.content)
+                return reply or '250 OK'
+        
+        controller = Controller(Handler(), hostname='127.0.0.1', port=port)
+        controller.start()
+        return controller.stop
+    except ImportError:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DeprecationWarning)
+            import asyncore
+            import smtpd
+        
+        class Server(smtpd.SMTPServer):
+            def process_message(self, peer, mailfrom, rcpttos, data, **kwargs):
+                return sink.accept(rcpttos, data)
+        
+        server = Server(('127.0.0.1', port), None)
+        thread = threading.Thread(target=asyncore.loop, kwargs={'timeout': 0.01}, daemon=True)
+        thread.start()
+        return server.close
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Send bulk email to a local SMTP stand-in")
+    parser.add_argument('--recipients', type=int, default=300)
+    parser.add_argument('--connections', type=int, default=4)
+    parser.add_argument('--fail-every', type=int, default=25, help="Refuse every Nth recipient once (0 = never)")
+    parser.add_argument('--port', type=int, default=8025)
+    args = parser.parse_args()
+    
+    os.environ.update({
+        'SMTP_SERVER': '127.0.0.1',
+        'SMTP_PORT': str(args.port),
+        'SMTP_STARTTLS': 'false',
+        'SENDER_EMAIL': 'events@company.com',
+        'SENDER_PASSWORD': '',
+        'SMTP_CONNECTIONS': str(args.connections)
+    })
+    from email_service import EmailService
+    
+    sink = MailSink(args.fail_every)
+    stop = start_server(sink, args.port)
+    service = EmailService()
+    mailer = service.get_bulk_mailer()
+    mailer.retry_backoff = 0.05
+    service.get_bulk_mailer = lambda: mailer
+    
+    recipients = pd.DataFrame([
+        {'emp_id': f"EMP{number:05d}", 'name': f"User {number}", 'email': f"user{number}@company.com",
+         'total': number % 50, 'gift_type': 'Participation'}
+        for number in range(1, args.recipients + 1)
+    ])
+    template = service.get_email_templates()["Score Notification"]
+    progress_updates = []
+    
+    started = time.perf_counter()
+    sent, failed = service.send_bulk_emails(recipients, template['subject'], template['body'],
+                                            progress=lambda s, f, t: progress_updates.append((s, f)))
+    bulk_seconds = time.perf_counter() - started
+    retried = sum(1 for attempts in sink.attempts.values() if attempts > 1)
+    
+    # Baseline: one connection per message, as send_email does
+    baseline_count = min(50, args.recipients)
+    started = time.perf_counter()
+    for recipient in recipients.head(baseline_count).to_dict('records'):
+        service.send_email(recipient['email'], recipient['name'], template['subject'], "baseline")
+    baseline_seconds = time.perf_counter() - started
+    
+    stop()
+    result = {
+        'recipients': args.recipients,
+        'connections': args.connections,
+        'sent': sent,
+        'failed': len(failed),
+        'delivered_to_sink': len(set(sink.received)),
+        'retried': retried,
+        'progress_updates': len(progress_updates),
+        'bulk_messages_per_s': round(sent / bulk_seconds, 1),
+        'one_connection_per_message_per_s': round(baseline_count / baseline_seconds, 1)
+    }
+    print(json.dumps(result, indent=2))
+    if sent != args.recipients or failed:
+        print(f"❌ {len(failed)} messages failed")
+        sys.exit(1)
+    print(f"✅ Sent {sent} messages over {args.connections} connections")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Core import-time budget check
+
+Imports the headless core modules in a fresh interpreter several times
+and fails (exit code 1) if the median import time exceeds the budget or
+if any of them pulls in Streamlit. Prints the result as JSON.
+
+Usage:
+    python benchmarks/import_budget.py
+    python benchmarks/import_budget.py --budget-ms 600 --runs 7
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CORE_MODULES = [
+    'errors',
+    'storage',
+    'database',
+    'game_logger',
+    'game_config',
+    'auth',
+    'write_behind',
+    'leaderboard_index',
+    'score_stats'
+]
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {modules}
+elapsed = time.perf_counter() - started
+heavy = sorted(name for name in ('streamlit', 'streamlit_authenticator', 'plotly') if name in sys.modules)
+print(json.dumps({{'ms': elapsed * 1000, 'ui_modules': heavy}}))
+"""
+
+def probe(modules):
+    """Import modules in a fresh interpreter; returns {'ms', 'ui_modules'}"""
+    output = subprocess.check_output(
+        [sys.executable, '-c', PROBE.format(modules=', '.join(modules))],
+        cwd=REPO_ROOT, stderr=subprocess.DEVNULL
+    )
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Check the core modules' import time budget")
+    parser.add_argument('--budget-ms', type=float, default=800.0, help="Median import time allowed for all core modules")
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [probe(CORE_MODULES) for _ in range(args.runs)]
+    median_ms = statistics.median(run['ms'] for run in runs)
+    ui_modules = sorted({name for run in runs for name in run['ui_modules']})
+    per_module = {module: round(statistics.median(probe([module])['ms'] for _ in range(3)), 1) for module in CORE_MODULES}
+
+    result = {
+        'budget_ms': args.budget_ms,
+        'median_ms': round(median_ms, 1),
+        'runs_ms': [round(run['ms'], 1) for run in runs],
+        'per_module_ms': per_module,
+        'ui_modules_loaded': ui_modules,
+        'passed': median_ms <= args.budget_ms and not ui_modules
+    }
+    print(json.dumps(result, indent=2))
+
+    if ui_modules:
+        print(f"❌ Core import pulled in UI modules: {', '.join(ui_modules)}")
+    if median_ms > args.budget_ms:
+        print(f"❌ Core import took {median_ms:.0f} ms, budget is {args.budget_ms:.0f} ms")
+    if not result['passed']:
+        sys.exit(1)
+    print(f"✅ Core import {median_ms:.0f} ms (budget {args.budget_ms:.0f} ms), no Streamlit")
+
+if __name__ == "__main__":
+    main()
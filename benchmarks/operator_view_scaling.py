@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Operator "Current Scores" view scaling
+
+Builds the per-game score order behind the paged operator table
+(game_score_order.GameScoreOrder, built once per data version) for
+growing participant counts and reports the time per size. Also times
+the previous per-participant loop at the smaller sizes and checks both
+produce the same rows in the same score order. Fails (exit code 1) if doubling the participants
+more than triples the time, i.e. if scaling is no longer close to linear.
+
+Usage:
+    python benchmarks/operator_view_scaling.py
+    python benchmarks/operator_view_scaling.py --sizes 1000 2000 4000 8000 16000 --game 3
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+import synthetic
+
+def loop_view(assigned_game, participants_df, scores_df):
+    """The previous implementation: one boolean filter over scores per participant"""
+    game_column = f'game{assigned_game}'
+    display_data = []
+    for _, participant in participants_df.iterrows():
+        emp_id = participant['emp_id']
+        participant_scores = scores_df[scores_df['emp_id'] == emp_id]
+        if not participant_scores.empty:
+            game_score = participant_scores.iloc[0][game_column]
+            total_score = participant_scores.iloc[0]['total']
+        else:
+            game_score = 0
+            total_score = 0
+        display_data.append({
+            'Employee ID': emp_id,
+            'Name': participant['name'],
+            f'Game {assigned_game} Score': game_score,
+            'Total Score': total_score
+        })
+    display_df = pd.DataFrame(display_data)
+    return display_df.sort_values(f'Game {assigned_game} Score', ascending=False)
+
+def best_time(function, *args, repeats=3):
+    """Fastest of several runs, in seconds"""
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark the operator current-scores view")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 2000, 4000, 8000, 16000])
+    parser.add_argument('--loop-max', type=int, default=2000, help="Largest size to time the old loop at")
+    parser.add_argument('--game', type=int, default=1)
+    args = parser.parse_args()
+    
+    from database import Database
+    from game_score_order import GameScoreOrder
+    from storage import JSONStorage
+    
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            rng = random.Random(size)
+            participants = synthetic.make_participants(size, rng)
+            scores = synthetic.make_scores(participants, 0.7, rng)
+            storage = JSONStorage(os.path.join(workdir, f'participants_{size}.json'), os.path.join(workdir, f'scores_{size}.json'))
+            storage.save_participants(participants)
+            storage.save_scores(scores)
+            db = Database(storage)
+            participants_df = db.get_all_participants()
+            scores_df = db.get_all_scores()
+            
+            registry = db.get_participant_registry()
+            seconds, order = best_time(GameScoreOrder, args.game, registry, scores_df)
+            display_df = pd.DataFrame({
+                'Employee ID': order.emp_ids,
+                'Name': [registry.name(emp_id) for emp_id in order.emp_ids],
+                f'Game {args.game} Score': order.scores,
+                'Total Score': order.totals
+            })
+            result = {'participants': size, 'indexed_join_ms': round(seconds * 1000, 2)}
+            if size <= args.loop_max:
+                loop_seconds, loop_df = best_time(loop_view, args.game, participants_df, scores_df, repeats=1)
+                result['loop_ms'] = round(loop_seconds * 1000, 2)
+                # Tied scores may come out in a different order; compare row sets
+                key = ['Employee ID']
+                loop_rows = loop_df.sort_values(key).astype({loop_df.columns[2]: int, 'Total Score': int}).values.tolist()
+                view_rows = display_df.sort_values(key).astype({display_df.columns[2]: int, 'Total Score': int}).values.tolist()
+                result['same_table'] = loop_rows == view_rows and (
+                    loop_df.iloc[:, 2].astype(int).tolist() == display_df.iloc[:, 2].astype(int).tolist()
+                )
+            results.append(result)
+    
+    growth = [
+        later['indexed_join_ms'] / earlier['indexed_join_ms']
+        for earlier, later in zip(results, results[1:])
+        if later['participants'] == 2 * earlier['participants'] and earlier['indexed_join_ms'] >= 1
+    ]
+    print(json.dumps({'results': results, 'time_ratio_per_doubling': [round(ratio, 2) for ratio in growth]}, indent=2))
+    
+    if not all(result.get('same_table', True) for result in results):
+        print("❌ Indexed join and per-participant loop disagree")
+        sys.exit(1)
+    if growth and max(growth) > 3:
+        print(f"❌ Time grew {max(growth):.1f}x for 2x participants")
+        sys.exit(1)
+    print("✅ Operator view scales linearly with participants")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Paginated table queries
+
+Checks that every page from Database.query_participants,
+query_leaderboard and query_game_scores matches the same slice of the
+full table the views used to send, then reports the time per page and
+the JSON payload of one page next to the payload of the whole table.
+Fails (exit code 1) on any mismatch.
+
+Usage:
+    python benchmarks/paginated_queries.py
+    python benchmarks/paginated_queries.py --participants 20000 --page-size 50
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+import synthetic
+
+def best_time(function, *args, repeats=5):
+    """Fastest of several runs, in seconds"""
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def full_game_view(assigned_game, participants_df, scores_df):
+    """The whole operator table for one game and its summary, as the view used to send it
+    
+    Joins participants to scores on emp_id (participants without scores
+    get 0) and computes the summary with column operations. Returns
+    (display DataFrame sorted by game score, summary dict with entered,
+    pending, average and highest).
+    """
+    game_column = f'game{assigned_game}'
+    score_label = f'Game {assigned_game} Score'
+    
+    if game_column not in scores_df.columns:
+        scores_df = scores_df.assign(**{game_column: 0})
+    joined = participants_df[['emp_id', 'name']].merge(
+        scores_df[['emp_id', game_column, 'total']], on='emp_id', how='left'
+    )
+    # Unscored participants come back as NaN; restore the compact score dtypes
+    game_values = joined[game_column].fillna(0).astype(scores_df[game_column].dtype)
+    display_df = pd.DataFrame({
+        'Employee ID': joined['emp_id'],
+        'Name': joined['name'],
+        score_label: game_values,
+        'Total Score': joined['total'].fillna(0).astype(scores_df['total'].dtype)
+    }).sort_values(score_label, ascending=False, kind='stable')
+    
+    summary = {
+        'entered': int((game_values > 0).sum()),
+        'pending': int((game_values == 0).sum()),
+        'average': float(game_values.mean()) if len(game_values) else 0.0,
+        'highest': game_values.max().item() if len(game_values) else 0
+    }
+    return display_df, summary
+
+def payload_bytes(df):
+    return len(df.to_json(orient='split', index=False).encode('utf-8'))
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Check and time the paginated table queries")
+    parser.add_argument('--participants', type=int, default=10000)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--game', type=int, default=1)
+    args = parser.parse_args()
+    
+    from database import Database
+    from storage import JSONStorage
+    
+    rng = random.Random(args.participants)
+    participants = synthetic.make_participants(args.participants, rng)
+    scores = synthetic.make_scores(participants, 0.7, rng)
+    limit = args.page_size
+    mismatches = []
+    results = {}
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        storage = JSONStorage(os.path.join(workdir, 'participants.json'), os.path.join(workdir, 'scores.json'))
+        storage.save_participants(participants)
+        storage.save_scores(scores)
+        db = Database(storage)
+        participants_df = db.get_all_participants()
+        scores_df = db.get_all_scores()
+        offsets = [0, limit, 7 * limit + 3, args.participants - limit // 2]
+        
+        # Participants by name; ties fall back to emp_id
+        full = participants_df.assign(sort_name=participants_df['name'].str.lower()).sort_values(['sort_name', 'emp_id'])
+        for offset in offsets:
+            page = db.query_participants(offset, limit, sort_by='name')
+            if page.rows['emp_id'].tolist() != full['emp_id'].iloc[offset:offset + limit].tolist():
+                mismatches.append(('participants', offset))
+        seconds, page = best_time(db.query_participants, 7 * limit, limit, 'name')
+        results['participants'] = {
+            'page_ms': round(seconds * 1000, 3),
+            'page_bytes': payload_bytes(page.rows),
+            'full_table_bytes': payload_bytes(participants_df)
+        }
+        
+        # Leaderboard in rank order
+        ranked = db.get_rank_index().top_k()
+        for offset in offsets:
+            page = db.query_leaderboard(offset, limit)
+            expected = [(emp_id, total) for emp_id, total, _ in ranked[offset:offset + limit]]
+            if list(zip(page.rows['emp_id'], page.rows['total'])) != expected:
+                mismatches.append(('leaderboard', offset))
+        seconds, page = best_time(db.query_leaderboard, 7 * limit, limit)
+        results['leaderboard'] = {
+            'page_ms': round(seconds * 1000, 3),
+            'page_bytes': payload_bytes(page.rows),
+            'full_table_bytes': payload_bytes(scores_df[['name', 'total', 'gift_type']])
+        }
+        
+        # One game's scores, highest first, ties in registration order
+        display_df, summary = full_game_view(args.game, participants_df, scores_df)
+        order = db.get_game_score_order(args.game)
+        if order.summary != summary:
+            mismatches.append(('game summary', None))
+        for offset in offsets:
+            page = db.query_game_scores(args.game, offset, limit)
+            expected = display_df.iloc[offset:offset + limit]
+            if page.rows['emp_id'].tolist() != expected['Employee ID'].tolist():
+                mismatches.append(('game scores', offset))
+        seconds, page = best_time(db.query_game_scores, args.game, 7 * limit, limit)
+        results['game_scores'] = {
+            'page_ms': round(seconds * 1000, 3),
+            'page_bytes': payload_bytes(page.rows),
+            'full_table_bytes': payload_bytes(display_df)
+        }
+        
+        # Search narrows the rows before paging
+        query = participants_df['name'].iloc[0].split()[0]
+        matches = set(db.search_participants(query, limit=None))
+        page = db.query_participants(0, len(matches) + 1, search=query)
+        if set(page.rows['emp_id']) != matches or page.total != len(matches):
+            mismatches.append(('participant search', query))
+    
+    print(json.dumps({'participants': args.participants, 'page_size': limit, 'results': results}, indent=2))
+    if mismatches:
+        print(f"❌ Pages differ from the full table: {mismatches}")
+        sys.exit(1)
+    print("✅ Every page matches the full table")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Scoring pipeline benchmarks
+
+Generates a synthetic event (participants, scores and scoring log) in a
+temporary directory and drives the Database, GameScoringLogger,
+GameConfigManager and Authentication APIs directly, without a Streamlit
+session. Reports p50/p95/p99 latency and throughput per operation as
+JSON so runs can be compared across commits.
+
+Usage:
+    python benchmarks/run_benchmarks.py --participants 5000 --operators 5
+    python benchmarks/run_benchmarks.py --backend sqlite --output results.json
+    python benchmarks/run_benchmarks.py --backend events
+    python benchmarks/run_benchmarks.py --compare baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def summarize(latencies, wall_seconds):
+    """Latency percentiles (ms) and throughput (ops/s) for one operation"""
+    ordered = sorted(latencies)
+    return {
+        'count': len(ordered),
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+        'max_ms': round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        'throughput_per_s': round(len(ordered) / wall_seconds, 1) if wall_seconds else 0.0
+    }
+
+def timed(operation, arguments):
+    """Call operation(*args) for each args tuple; returns (latencies, wall seconds)"""
+    latencies = []
+    started = time.perf_counter()
+    for args in arguments:
+        before = time.perf_counter()
+        operation(*args)
+        latencies.append(time.perf_counter() - before)
+    return latencies, time.perf_counter() - started
+
+def timed_concurrent(operation, argument_lists):
+    """Run one thread per argument list at once; returns (all latencies, wall seconds)"""
+    results = [None] * len(argument_lists)
+    
+    def worker(slot, arguments):
+        results[slot] = timed(operation, arguments)[0]
+    
+    threads = [threading.Thread(target=worker, args=(slot, arguments)) for slot, arguments in enumerate(argument_lists)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    return [latency for latencies in results for latency in latencies], wall
+
+def git_commit():
+    """Short commit hash of the benchmarked tree, if available"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def make_database(backend):
+    from database import Database
+    from event_store import EventSourcedStorage
+    from storage import JSONStorage, SQLiteStorage
+    
+    if backend == 'sqlite':
+        storage = SQLiteStorage('event_tracker.db')
+        storage.import_json('participants.json', 'scores.json')
+        return Database(storage)
+    if backend == 'events':
+        storage = EventSourcedStorage(JSONStorage())
+        storage.import_json('scores.json')
+        return Database(storage)
+    return Database(JSONStorage())
+
+def run(args):
+    """Run every benchmark in the current directory; returns the results document"""
+    rng = random.Random(args.seed)
+    emp_ids = synthetic.generate('.', participants=args.participants, scored_fraction=args.scored_fraction,
+                                 log_entries=args.log_entries, seed=args.seed)
+    
+    from auth import Authentication
+    from game_config import GameConfigManager
+    from game_logger import GameScoringLogger
+    
+    db = make_database(args.backend)
+    logger = GameScoringLogger()
+    logger.entries_written_by_storage = args.backend == 'events'
+    auth = Authentication()
+    config_manager = GameConfigManager()
+    usernames = list(auth.load_users())
+    results = {}
+    
+    # Registration of new participants
+    new_ids = [synthetic.emp_id(len(emp_ids) + number) for number in range(1, args.registers + 1)]
+    latencies, wall = timed(db.register_participant, [(new_id, f"New Participant {new_id}", f"{new_id.lower()}@company.com") for new_id in new_ids])
+    results['register'] = summarize(latencies, wall)
+    
+    # Operators saving scores concurrently, one game each
+    def save_score(emp_id, game_number, score):
+        previous_score = db.set_game_score(emp_id, game_number, score, operator=f"game{game_number}_op")
+        logger.log_score_entry(game_number, f"game{game_number}_op", emp_id, emp_id, score, previous_score)
+    
+    argument_lists = [
+        [(rng.choice(emp_ids), game_number, rng.randint(0, 10)) for _ in range(args.saves)]
+        for game_number in range(1, args.operators + 1)
+    ]
+    latencies, wall = timed_concurrent(save_score, argument_lists)
+    results['score_save'] = summarize(latencies, wall)
+    
+    # Rank lookups as the dashboard does them
+    def rank_lookup(emp_id):
+        index = db.get_rank_index()
+        index.rank(emp_id)
+        index.percentile(emp_id)
+    
+    latencies, wall = timed(rank_lookup, [(rng.choice(emp_ids),) for _ in range(args.lookups)])
+    results['rank_lookup'] = summarize(latencies, wall)
+    
+    # Operator search box: partial names and emp_id numbers, as typed
+    queries = [rng.choice(synthetic.FIRST_NAMES)[:rng.randint(1, 4)] for _ in range(args.lookups // 2)]
+    queries += [str(int(rng.choice(emp_ids)[3:]))[:rng.randint(1, 4)] for _ in range(args.lookups // 2)]
+    db.search_participants("warm up")
+    latencies, wall = timed(db.search_participants, [(query,) for query in queries])
+    results['participant_search'] = summarize(latencies, wall)
+    
+    # Leaderboard viewers refreshing between writes, then after each write
+    from live_leaderboard import get_leaderboard_view
+    get_leaderboard_view(db)
+    latencies, wall = timed(get_leaderboard_view, [(db,) for _ in range(args.lookups)])
+    results['leaderboard_view'] = summarize(latencies, wall)
+    
+    def leaderboard_after_write(emp_id, score):
+        db.set_game_score(emp_id, 1, score)
+        before = time.perf_counter()
+        get_leaderboard_view(db)
+        return time.perf_counter() - before
+    
+    latencies = [leaderboard_after_write(rng.choice(emp_ids), rng.randint(0, 10)) for _ in range(max(1, args.statistics // 10))]
+    results['leaderboard_view_after_write'] = summarize(latencies, sum(latencies))
+    
+    latencies, wall = timed(db.get_statistics, [() for _ in range(args.statistics)])
+    results['statistics'] = summarize(latencies, wall)
+    
+    latencies, wall = timed(db.export_data_to_excel, [() for _ in range(args.exports)])
+    results['excel_export'] = summarize(latencies, wall)
+    
+    latencies, wall = timed(logger.get_recent_entries, [(50,) for _ in range(args.log_queries)])
+    results['log_recent_entries'] = summarize(latencies, wall)
+    
+    # Operator entry log tab: latest entries for a game and for the operator
+    latencies, wall = timed(logger.get_entries_by_game, [(rng.randint(1, synthetic.GAMES), 200) for _ in range(args.log_queries)])
+    results['log_entries_by_game'] = summarize(latencies, wall)
+    
+    latencies, wall = timed(logger.get_entries_by_operator, [(f"game{rng.randint(1, synthetic.GAMES)}_op", 10) for _ in range(args.log_queries)])
+    results['log_entries_by_operator'] = summarize(latencies, wall)
+    
+    latencies, wall = timed(auth.get_user_info, [(rng.choice(usernames),) for _ in range(args.lookups)])
+    results['user_lookup'] = summarize(latencies, wall)
+    
+    latencies, wall = timed(config_manager.get_active_games, [() for _ in range(args.lookups)])
+    results['active_games'] = summarize(latencies, wall)
+    
+    return results
+
+def compare(results, baseline):
+    """Print p50/p95 changes against a previous results document"""
+    print(f"\nCompared with {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}):")
+    for operation, current in results.items():
+        previous = baseline['results'].get(operation)
+        if not previous:
+            print(f"   {operation:20} (new)")
+            continue
+        changes = []
+        for metric in ('p50_ms', 'p95_ms', 'throughput_per_s'):
+            if previous[metric]:
+                changes.append(f"{metric} {previous[metric]} -> {current[metric]} ({current[metric] / previous[metric]:.3g}x)")
+        print(f"   {operation:20} " + ", ".join(changes))
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark the scoring pipeline on synthetic data")
+    parser.add_argument('--backend', choices=['json', 'sqlite', 'events'], default='json')
+    parser.add_argument('--participants', type=int, default=5000)
+    parser.add_argument('--scored-fraction', type=float, default=0.8, help="Share of participants with scores")
+    parser.add_argument('--log-entries', type=int, default=20000, help="Synthetic scoring log entries")
+    parser.add_argument('--operators', type=int, default=5, help="Concurrent operators saving scores")
+    parser.add_argument('--saves', type=int, default=100, help="Score saves per operator")
+    parser.add_argument('--registers', type=int, default=100)
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--statistics', type=int, default=200)
+    parser.add_argument('--exports', type=int, default=3)
+    parser.add_argument('--log-queries', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write the results JSON to this file")
+    parser.add_argument('--compare', help="Previous results JSON to compare against")
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix='event_bench_')
+    original_dir = os.getcwd()
+    os.chdir(workdir)
+    try:
+        results = run(args)
+    finally:
+        os.chdir(original_dir)
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    document = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'params': vars(args)
+        },
+        'results': results
+    }
+    
+    print(json.dumps(document, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            compare(results, json.load(f))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Concurrent write stress test
+
+Simulates several game operators saving scores at the same time from
+separate processes. Each worker owns one game and writes it for every
+participant, round after round. Afterwards every participant must hold
+the last round's score in every game, and the record version must equal
+the number of writes, so a single lost update fails the run.
+
+Usage:
+    python benchmarks/stress_concurrent_writes.py --workers 5 --participants 20 --rounds 10
+    python benchmarks/stress_concurrent_writes.py --backend sqlite
+    python benchmarks/stress_concurrent_writes.py --backend events
+    python benchmarks/stress_concurrent_writes.py --backend events --segment-max-bytes 2000
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def make_database(backend, workdir, segment_max_bytes=None):
+    from database import Database
+    from event_store import EventSourcedStorage
+    from score_log import get_log_writer
+    from storage import JSONStorage, SQLiteStorage
+    
+    if backend == 'sqlite':
+        storage = SQLiteStorage(os.path.join(workdir, 'event_tracker.db'))
+    elif backend == 'events':
+        if segment_max_bytes:
+            # Create the process-wide writer first, with small segments so writers rotate under each other
+            get_log_writer(os.path.join(workdir, 'log'), segment_max_bytes=segment_max_bytes)
+        participants = JSONStorage(os.path.join(workdir, 'participants.json'), os.path.join(workdir, 'scores.json'))
+        storage = EventSourcedStorage(participants, log_dir=os.path.join(workdir, 'log'), legacy_file=None,
+                                      snapshot_dir=os.path.join(workdir, 'snapshots'), snapshot_every=100)
+    else:
+        storage = JSONStorage(os.path.join(workdir, 'participants.json'), os.path.join(workdir, 'scores.json'))
+    return Database(storage)
+
+def operator_worker(backend, workdir, game_number, emp_ids, rounds, segment_max_bytes=None):
+    """Write game_number for every participant, rounds times"""
+    db = make_database(backend, workdir, segment_max_bytes)
+    for score in range(1, rounds + 1):
+        for emp_id in emp_ids:
+            db.set_game_score(emp_id, game_number, score)
+
+def run(args, workdir):
+    """Run the workers in workdir and check every record; exits 1 on failure"""
+    db = make_database(args.backend, workdir)
+    emp_ids = [f"EMP{i:05d}" for i in range(args.participants)]
+    for emp_id in emp_ids:
+        db.register_participant(emp_id, f"Participant {emp_id}", f"{emp_id.lower()}@company.com")
+    
+    context = multiprocessing.get_context('spawn')
+    workers = [
+        context.Process(target=operator_worker, args=(args.backend, workdir, game, emp_ids, args.rounds, args.segment_max_bytes))
+        for game in range(1, args.workers + 1)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    
+    failed_workers = [w.exitcode for w in workers if w.exitcode != 0]
+    if failed_workers:
+        print(f"❌ {len(failed_workers)} worker(s) crashed")
+        sys.exit(1)
+    
+    db = make_database(args.backend, workdir)
+    errors = []
+    expected_total = args.rounds * args.workers
+    expected_version = args.rounds * args.workers
+    for emp_id in emp_ids:
+        record = db.storage.get_score(emp_id)
+        for game in range(1, args.workers + 1):
+            if record.get(f'game{game}') != args.rounds:
+                errors.append(f"{emp_id}: game{game} = {record.get(f'game{game}')}, expected {args.rounds}")
+        if record['total'] != expected_total:
+            errors.append(f"{emp_id}: total = {record['total']}, expected {expected_total}")
+        if record.get('version') != expected_version:
+            errors.append(f"{emp_id}: version = {record.get('version')}, expected {expected_version}")
+    errors.extend(db.verify_statistics())
+    
+    writes = args.participants * args.rounds * args.workers
+    if errors:
+        print(f"❌ {len(errors)} lost or inconsistent updates after {writes} concurrent writes:")
+        for error in errors[:20]:
+            print(f"   {error}")
+        sys.exit(1)
+    
+    rotated = ""
+    if args.backend == 'events':
+        from score_log import list_segments
+        rotated = f", {len(list_segments(os.path.join(workdir, 'log')))} log segments"
+    print(f"✅ {writes} concurrent writes from {args.workers} processes, no lost updates ({args.backend}{rotated})")
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Concurrent score write stress test")
+    parser.add_argument('--backend', choices=['json', 'sqlite', 'events'], default='json')
+    parser.add_argument('--workers', type=int, default=5, help="Concurrent operator processes (one game each)")
+    parser.add_argument('--participants', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--segment-max-bytes', type=int, help="Scoring-log segment size (events backend), to force rotation")
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix='stress_')
+    try:
+        run(args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
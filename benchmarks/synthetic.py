@@ -0,0 +1,97 @@
+"""
+Synthetic event data for benchmarks
+
+Writes participants.json, scores.json and scoring log segments in the
+same shape the app produces, at any size.
+"""
+
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+from score_log import ScoreLogWriter
+
+FIRST_NAMES = ["John", "Jane", "Mike", "Sarah", "David", "Priya", "Arjun", "Maria", "Chen", "Fatima"]
+LAST_NAMES = ["Doe", "Smith", "Johnson", "Wilson", "Kumar", "Garcia", "Wang", "Khan", "Brown", "Patel"]
+GAMES = 5
+
+def emp_id(number):
+    """Synthetic employee ID"""
+    return f"EMP{number:06d}"
+
+def gift_type(total):
+    """Gift tier for a total, using the default thresholds"""
+    if total >= 40:
+        return "Gold"
+    elif total >= 30:
+        return "Silver"
+    return "Participation"
+
+def make_participants(count, rng):
+    """{emp_id: participant record}"""
+    start = datetime(2025, 7, 1)
+    participants = {}
+    for number in range(1, count + 1):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        participants[emp_id(number)] = {
+            'name': name,
+            'email': f"{name.lower().replace(' ', '.')}{number}@company.com",
+            'registration_date': (start + timedelta(minutes=number)).isoformat()
+        }
+    return participants
+
+def make_scores(participants, scored_fraction, rng):
+    """{emp_id: score record} for a random share of participants"""
+    scores = {}
+    for participant_id, participant in participants.items():
+        if rng.random() >= scored_fraction:
+            continue
+        games = {f'game{game}': rng.randint(0, 10) for game in range(1, GAMES + 1)}
+        total = sum(games.values())
+        scores[participant_id] = {
+            'name': participant['name'],
+            'email': participant['email'],
+            **games,
+            'total': total,
+            'gift_type': gift_type(total),
+            'last_updated': datetime.now().isoformat(),
+            'version': 1
+        }
+    return scores
+
+def write_log(log_dir, scores, entries, rng):
+    """Write the given number of synthetic operator log entries as JSONL segments"""
+    writer = ScoreLogWriter(log_dir, fsync_batch_size=1024)
+    emp_ids = list(scores)
+    start = datetime(2025, 7, 28, 9, 0)
+    for number in range(entries):
+        participant_id = rng.choice(emp_ids)
+        game = rng.randint(1, GAMES)
+        writer.append({
+            "timestamp": (start + timedelta(seconds=number)).isoformat(),
+            "game_number": game,
+            "operator": f"game{game}_op",
+            "participant_emp_id": participant_id,
+            "participant_name": scores[participant_id]['name'],
+            "new_score": rng.randint(0, 10),
+            "old_score": None,
+            "action": "create"
+        })
+    writer.close()
+
+def generate(workdir, participants=5000, scored_fraction=0.8, log_entries=20000, seed=42):
+    """Write a synthetic data set into workdir; returns the generated emp_ids"""
+    rng = random.Random(seed)
+    os.makedirs(workdir, exist_ok=True)
+    participant_data = make_participants(participants, rng)
+    score_data = make_scores(participant_data, scored_fraction, rng)
+    
+    with open(os.path.join(workdir, 'participants.json'), 'w') as f:
+        json.dump(participant_data, f, indent=2)
+    with open(os.path.join(workdir, 'scores.json'), 'w') as f:
+        json.dump(score_data, f, indent=2)
+    if log_entries and score_data:
+        write_log(os.path.join(workdir, 'logs', 'scoring'), score_data, log_entries, rng)
+    
+    return list(participant_data)
@@ -0,0 +1,185 @@
+import queue
+import smtplib
+import ssl
+import threading
+import time
+
+# SMTP replies in this range are temporary (greylisting, rate limits, busy server)
+TRANSIENT_SMTP_CODES = range(400, 500)
+
+SKIPPED_ERROR = "Not sent: skipped by the sender"
+
+def is_transient(error):
+    """Whether a send failure is worth retrying on a fresh connection"""
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code in TRANSIENT_SMTP_CODES for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code in TRANSIENT_SMTP_CODES
+    if isinstance(error, smtplib.SMTPException):
+        return False
+    # Network errors: timeouts, resets, refused connections
+    return isinstance(error, OSError)
+
+def session_usable(error):
+    """Whether the SMTP session can carry on after error (the server replied and smtplib reset it)"""
+    return isinstance(error, (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException)) and not is_transient(error)
+
+class RateLimiter:
+    """Token bucket shared by all connections; rate is messages per second"""
+    
+    def __init__(self, rate):
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._tokens = 1.0
+        self._last = time.monotonic()
+    
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(1.0, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+class BulkMailer:
+    """Sends many messages over a small pool of authenticated SMTP sessions
+    
+    Each of `connections` worker threads logs in once and reuses its
+    session for up to `max_messages_per_connection` messages before
+    reconnecting. Sends across all workers are limited to `rate_limit`
+    messages per second (None for no limit). Transient failures (4xx
+    replies, dropped connections) are retried on a fresh session with
+    exponential backoff; permanent failures (5xx) are reported at once.
+    """
+    
+    def __init__(self, host, port, username="", password="", use_tls=True, connections=4,
+                 max_messages_per_connection=100, rate_limit=None, max_retries=3,
+                 retry_backoff=1.0, timeout=30, smtp_factory=smtplib.SMTP):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.connections = connections
+        self.max_messages_per_connection = max_messages_per_connection
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.timeout = timeout
+        self.smtp_factory = smtp_factory
+        self.rate_limiter = RateLimiter(rate_limit)
+    
+    def connect(self):
+        """Open one SMTP session (STARTTLS and login when configured)"""
+        server = self.smtp_factory(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls(context=ssl.create_default_context())
+            if self.password:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        return server
+    
+    def send_all(self, messages, progress=None, on_result=None, before_send=None):
+        """Send messages, a list of (sender, recipient, message string)
+        
+        progress(sent, failed, total) and on_result(index, error) are called
+        after every message, from the worker threads; index is the message's
+        position in messages and error is None on success. before_send(index)
+        is called just before a message is sent; if it returns False the
+        message is reported as failed with SKIPPED_ERROR and not sent.
+        Returns (sent_count, [(recipient, error)]).
+        """
+        total = len(messages)
+        pending = queue.Queue()
+        for index, message in enumerate(messages):
+            pending.put((index, message))
+        
+        lock = threading.Lock()
+        abort = threading.Event()
+        counts = {'sent': 0, 'failed': 0}
+        failures = []
+        
+        def record(index, recipient, error=None):
+            if on_result:
+                on_result(index, error)
+            with lock:
+                if error is None:
+                    counts['sent'] += 1
+                else:
+                    counts['failed'] += 1
+                    failures.append((recipient, error))
+                sent, failed = counts['sent'], counts['failed']
+            if progress:
+                progress(sent, failed, total)
+        
+        workers = [
+            threading.Thread(target=self._worker, args=(pending, record, abort, before_send), name=f"smtp-{number}", daemon=True)
+            for number in range(min(self.connections, total))
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        
+        return counts['sent'], failures
+    
+    def _worker(self, pending, record, abort, before_send=None):
+        server = None
+        sent_on_connection = 0
+        try:
+            while True:
+                try:
+                    index, (sender, recipient, message) = pending.get_nowait()
+                except queue.Empty:
+                    return
+                if abort.is_set():
+                    record(index, recipient, "Not sent: SMTP login failed")
+                    continue
+                if before_send and before_send(index) is False:
+                    record(index, recipient, SKIPPED_ERROR)
+                    continue
+                
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        if server is None or sent_on_connection >= self.max_messages_per_connection:
+                            self._close(server)
+                            server = None
+                            server = self.connect()
+                            sent_on_connection = 0
+                        self.rate_limiter.acquire()
+                        server.sendmail(sender, recipient, message)
+                        sent_on_connection += 1
+                        record(index, recipient)
+                        break
+                    except Exception as e:
+                        if not session_usable(e):
+                            self._close(server)
+                            server = None
+                        if isinstance(e, smtplib.SMTPAuthenticationError):
+                            # Bad credentials fail every message; stop all workers
+                            abort.set()
+                        if abort.is_set() or not is_transient(e) or attempt == self.max_retries:
+                            record(index, recipient, str(e))
+                            break
+                        time.sleep(self.retry_backoff * (2 ** attempt))
+        finally:
+            self._close(server)
+    
+    @staticmethod
+    def _close(server):
+        if server is None:
+            return
+        try:
+            server.quit()
+        except Exception:
+            server.close()
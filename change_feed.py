@@ -0,0 +1,102 @@
+import threading
+from collections import namedtuple
+
+# One score write: the record before and after (None when missing/deleted)
+ScoreChange = namedtuple('ScoreChange', ['version', 'emp_id', 'old', 'new'])
+
+class Subscription:
+    """A subscriber's queue of changes published since its last poll"""
+    
+    def __init__(self, feed):
+        self._feed = feed
+        self._changes = []
+        self._reset = True
+    
+    def poll(self):
+        """(version, changes) since the last poll; changes is None if a full refresh is needed
+        
+        A full refresh is needed on the first poll and after writes this
+        process did not see (another process changed the store).
+        """
+        with self._feed._condition:
+            changes = None if self._reset else self._changes
+            self._changes = []
+            self._reset = False
+            return self._feed.version, changes
+
+class ChangeFeed:
+    """In-process publish/subscribe feed of score writes with a version counter
+    
+    Database publishes every score write it makes. Each write bumps
+    version, so readers can tell whether anything changed with one
+    comparison, and subscribers receive the changed records as deltas.
+    Writes made by other processes only show up as a changed storage
+    signature; get_change_feed() turns that into a reset, which tells
+    subscribers to rebuild from storage.
+    """
+    
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._subscriptions = []
+        self.version = 0
+        self.signature = None
+    
+    def subscribe(self):
+        """Start a subscription; its first poll asks for a full refresh"""
+        subscription = Subscription(self)
+        with self._condition:
+            self._subscriptions.append(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription):
+        with self._condition:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+    
+    def publish(self, changes, signature=None):
+        """Record [(emp_id, old, new)] written to storage; returns the new version"""
+        with self._condition:
+            for emp_id, old, new in changes:
+                self.version += 1
+                change = ScoreChange(self.version, emp_id, old, new)
+                for subscription in self._subscriptions:
+                    subscription._changes.append(change)
+            if signature is not None:
+                self.signature = signature
+            self._condition.notify_all()
+            return self.version
+    
+    def reset(self, signature=None):
+        """Storage changed outside this feed; subscribers must refresh fully"""
+        with self._condition:
+            self.version += 1
+            for subscription in self._subscriptions:
+                subscription._changes = []
+                subscription._reset = True
+            self.signature = signature
+            self._condition.notify_all()
+            return self.version
+    
+    def wait(self, version, timeout=None):
+        """Block until the version moves past version (or timeout); returns the current version"""
+        with self._condition:
+            self._condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+_feeds = {}
+_feeds_lock = threading.Lock()
+
+def get_change_feed(storage):
+    """Get the process-wide change feed for storage, resetting it if scores changed elsewhere"""
+    key = storage.scores_cache_key()
+    with _feeds_lock:
+        feed = _feeds.get(key)
+        if feed is None:
+            feed = ChangeFeed()
+            _feeds[key] = feed
+    
+    signature = storage.scores_signature()
+    with feed._condition:
+        if feed.signature != signature:
+            feed.reset(signature)
+    return feed
@@ -1,5 +1,6 @@
 import streamlit as st
 from auth import Authentication
+from figure_cache import figure_cache
 
 class UserDashboard:
     def __init__(self, database):
@@ -93,11 +94,23 @@ class UserDashboard:
         # Performance visualization
         st.subheader("📊 Your Performance")
         
-        # Create performance chart
+        # Performance chart, shared by everyone with the same scores
+        game_scores = [scores['game1'], scores['game2'], scores['game3'], scores['game4'], scores['game5']]
+        fig = figure_cache.get('user_performance', tuple(game_scores), lambda: self.performance_figure(game_scores))
+        st.plotly_chart(fig, use_container_width=True, key="user_performance_chart")
+        
+        # Achievement badges
+        self.show_achievement_badges(scores)
+        
+        # Performance insights
+        self.show_performance_insights(scores)
+    
+    @staticmethod
+    def performance_figure(game_scores):
+        """Bar chart of one participant's game scores against the maximum"""
         import plotly.graph_objects as go
         
         game_names = ['Game 1', 'Game 2', 'Game 3', 'Game 4', 'Game 5']
-        game_scores = [scores['game1'], scores['game2'], scores['game3'], scores['game4'], scores['game5']]
         
         fig = go.Figure()
         
@@ -128,14 +141,7 @@ class UserDashboard:
             barmode='overlay',
             height=400
         )
-        
-        st.plotly_chart(fig, use_container_width=True, key="user_performance_chart")
-        
-        # Achievement badges
-        self.show_achievement_badges(scores)
-        
-        # Performance insights
-        self.show_performance_insights(scores)
+        return fig
     
     def show_no_scores_message(self):
         """Display message when user has no scores"""
@@ -178,13 +184,11 @@ class UserDashboard:
     
     def show_user_rank(self, emp_id):
         """Show user's current rank"""
-        all_scores = self.db.get_all_scores()
+        index = self.db.get_rank_index()
+        user_rank = index.rank(emp_id)
         
-        if not all_scores.empty and emp_id in all_scores['emp_id'].values:
-            # Sort by total score and find user's rank
-            sorted_scores = all_scores.sort_values('total', ascending=False).reset_index(drop=True)
-            user_rank = sorted_scores[sorted_scores['emp_id'] == emp_id].index[0] + 1
-            total_participants = len(sorted_scores)
+        if user_rank is not None:
+            total_participants = len(index)
             
             st.subheader("🏅 Your Ranking")
             
@@ -197,7 +201,7 @@ class UserDashboard:
                 st.metric("Out of", f"{total_participants} participants")
             
             with col3:
-                percentile = (total_participants - user_rank + 1) / total_participants * 100
+                percentile = index.percentile(emp_id)
                 st.metric("Percentile", f"{percentile:.1f}%")
             
             # Rank visualization
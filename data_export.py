@@ -0,0 +1,152 @@
+import csv
+import io
+import tempfile
+
+# Rows pulled from storage at a time
+EXPORT_CHUNK_SIZE = 1000
+
+# Sheet (and CSV/Parquet table) name -> storage iterator
+EXPORT_TABLES = {
+    'Participants': 'iter_participants',
+    'Scores': 'iter_scores'
+}
+
+def export_columns(storage, table):
+    """Column order matching the DataFrame exports: record keys as first seen, then emp_id"""
+    columns = {}
+    for _, record in getattr(storage, EXPORT_TABLES[table])(EXPORT_CHUNK_SIZE):
+        columns.update(dict.fromkeys(record))
+    columns.pop('emp_id', None)
+    return list(columns) + ['emp_id']
+
+def iter_rows(storage, table, columns):
+    """Yield one list of cell values per record, in columns order"""
+    for emp_id, record in getattr(storage, EXPORT_TABLES[table])(EXPORT_CHUNK_SIZE):
+        row = [record.get(column) for column in columns[:-1]]
+        row.append(emp_id)
+        yield [value if value is None or isinstance(value, (str, int, float, bool)) else str(value) for value in row]
+
+def summary_rows(aggregate):
+    """Summary sheet rows from the running score aggregate"""
+    return [
+        ['Total Participants', aggregate.count],
+        ['Average Score', aggregate.average_total],
+        ['Highest Score', aggregate.max_total],
+        ['Lowest Score', aggregate.min_total],
+        ['Gold Winners', aggregate.gift_counts.get('Gold', 0)],
+        ['Silver Winners', aggregate.gift_counts.get('Silver', 0)],
+        ['Participation Gifts', aggregate.gift_counts.get('Participation', 0)]
+    ]
+
+def write_excel(storage, aggregate, output):
+    """Stream Participants, Scores and Summary sheets into output (a binary file)
+    
+    Uses openpyxl's write-only mode, so rows go straight to the sheet's
+    XML instead of being held as cells; memory stays flat as the event
+    grows. Empty tables get no sheet, as before.
+    """
+    # Imported here so loading the database layer does not pay for openpyxl
+    from openpyxl import Workbook
+    
+    workbook = Workbook(write_only=True)
+    for table in EXPORT_TABLES:
+        columns = export_columns(storage, table)
+        if columns == ['emp_id']:
+            continue
+        sheet = workbook.create_sheet(table)
+        sheet.append(columns)
+        for row in iter_rows(storage, table, columns):
+            sheet.append(row)
+    
+    if aggregate.count:
+        sheet = workbook.create_sheet('Summary')
+        sheet.append(['Metric', 'Value'])
+        for row in summary_rows(aggregate):
+            sheet.append(row)
+    
+    if not workbook.worksheets:
+        workbook.create_sheet('Participants').append(['emp_id'])
+    workbook.save(output)
+
+def write_csv(storage, table, output):
+    """Stream one table as CSV into output (a binary file)"""
+    text = io.TextIOWrapper(output, encoding='utf-8', newline='', write_through=True)
+    try:
+        writer = csv.writer(text)
+        columns = export_columns(storage, table)
+        writer.writerow(columns)
+        batch = []
+        for row in iter_rows(storage, table, columns):
+            batch.append(row)
+            if len(batch) >= EXPORT_CHUNK_SIZE:
+                writer.writerows(batch)
+                batch = []
+        writer.writerows(batch)
+    finally:
+        # Leave output open for the caller
+        text.detach()
+
+def write_parquet(storage, table, output):
+    """Stream one table as Parquet into output (needs pyarrow)
+    
+    Each chunk of rows becomes one row group. Columns are written as
+    strings when their values mix types.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    columns = export_columns(storage, table)
+    writer = None
+    schema = None
+    
+    def flush(batch):
+        nonlocal writer, schema
+        arrays = {column: [row[i] for row in batch] for i, column in enumerate(columns)}
+        if schema is None:
+            fields = []
+            for column, values in arrays.items():
+                try:
+                    fields.append(pa.field(column, pa.array(values).type))
+                except (pa.ArrowInvalid, pa.ArrowTypeError):
+                    fields.append(pa.field(column, pa.string()))
+            schema = pa.schema([
+                field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                for field in fields
+            ])
+            writer = pq.ParquetWriter(output, schema)
+        for column, values in arrays.items():
+            if pa.types.is_string(schema.field(column).type):
+                arrays[column] = [None if value is None else str(value) for value in values]
+        writer.write_table(pa.table(arrays, schema=schema))
+    
+    batch = []
+    for row in iter_rows(storage, table, columns):
+        batch.append(row)
+        if len(batch) >= EXPORT_CHUNK_SIZE:
+            flush(batch)
+            batch = []
+    if batch or writer is None:
+        flush(batch)
+    writer.close()
+
+def spooled_export(write, *args):
+    """Run write(*args, output) into an anonymous temp file and return it rewound
+    
+    The file lives on disk rather than in RAM and is deleted when closed.
+    """
+    output = tempfile.TemporaryFile(suffix='.export')
+    try:
+        write(*args, output)
+    except BaseException:
+        output.close()
+        raise
+    output.seek(0)
+    return output
+
+def export_bytes(output):
+    """Contents of a spooled export as bytes (what st.download_button accepts); closes the file"""
+    try:
+        output.seek(0)
+        return output.read()
+    finally:
+        output.close()
@@ -1,84 +1,95 @@
 import pandas as pd
-import json
-import os
+from collections import namedtuple
 from datetime import datetime
-import streamlit as st
-from io import BytesIO
+from change_feed import get_change_feed
+from data_export import spooled_export, write_csv, write_excel, write_parquet
+from errors import ParticipantNotRegistered, report_error
+from game_score_order import get_game_score_order
+from storage import VersionConflict, get_storage_backend, record_version
+from leaderboard_index import get_rank_index
+from participant_registry import get_participant_registry
+from participant_search import get_participant_search
+from score_table import get_score_table
+from score_stats import GAME_KEY, ScoreAggregate, gift_type_for_total
+
+# Attempts for a versioned score write before giving up
+SCORE_WRITE_RETRIES = 5
+
+# Rows per page of the paginated queries
+PAGE_SIZE = 50
+
+# One page of a query: rows is a DataFrame, total the number of matching rows
+Page = namedtuple('Page', ['rows', 'total', 'offset', 'limit'])
+
+PARTICIPANT_COLUMNS = ['emp_id', 'name', 'email', 'registration_date']
+LEADERBOARD_COLUMNS = ['rank', 'emp_id', 'name', 'total', 'gift_type']
 
 class Database:
-    def __init__(self):
-        self.participants_file = 'participants.json'
-        self.scores_file = 'scores.json'
-        self.ensure_files_exist()
-    
-    def ensure_files_exist(self):
-        """Ensure database files exist"""
-        if not os.path.exists(self.participants_file):
-            with open(self.participants_file, 'w') as f:
-                json.dump({}, f)
-        
-        if not os.path.exists(self.scores_file):
-            with open(self.scores_file, 'w') as f:
-                json.dump({}, f)
+    def __init__(self, storage=None):
+        self.storage = storage if storage is not None else get_storage_backend()
     
     def load_participants(self):
-        """Load participants from file"""
+        """Load participants from storage"""
         try:
-            with open(self.participants_file, 'r') as f:
-                return json.load(f)
+            return self.storage.load_participants()
         except Exception as e:
-            st.error(f"Error loading participants: {str(e)}")
+            report_error(f"Error loading participants: {str(e)}")
             return {}
     
     def save_participants(self, participants):
-        """Save participants to file"""
+        """Save participants to storage"""
         try:
-            with open(self.participants_file, 'w') as f:
-                json.dump(participants, f, indent=2)
+            self.storage.save_participants(participants)
             return True
         except Exception as e:
-            st.error(f"Error saving participants: {str(e)}")
+            report_error(f"Error saving participants: {str(e)}")
             return False
     
     def load_scores(self):
-        """Load scores from file"""
+        """Load scores from storage"""
         try:
-            with open(self.scores_file, 'r') as f:
-                return json.load(f)
+            return self.storage.load_scores()
         except Exception as e:
-            st.error(f"Error loading scores: {str(e)}")
+            report_error(f"Error loading scores: {str(e)}")
             return {}
     
     def save_scores(self, scores):
-        """Save scores to file"""
+        """Save scores to storage"""
         try:
-            with open(self.scores_file, 'w') as f:
-                json.dump(scores, f, indent=2)
+            self.storage.save_scores(scores)
             return True
         except Exception as e:
-            st.error(f"Error saving scores: {str(e)}")
+            report_error(f"Error saving scores: {str(e)}")
             return False
     
     def register_participant(self, emp_id, name, email):
         """Register a new participant"""
-        participants = self.load_participants()
-        
-        # Check if participant already exists
-        if emp_id in participants:
+        try:
+            with self.storage.write_lock():
+                # Check if participant already exists
+                if self.storage.get_participant(emp_id):
+                    return False
+                
+                record = {
+                    'name': name,
+                    'email': email,
+                    'registration_date': datetime.now().isoformat()
+                }
+                search = self.get_participant_search()
+                self.storage.upsert_participant(emp_id, record)
+                search.add(emp_id, record, signature=self.storage.participants_signature())
+            return True
+        except Exception as e:
+            report_error(f"Error saving participant: {str(e)}")
             return False
-        
-        participants[emp_id] = {
-            'name': name,
-            'email': email,
-            'registration_date': datetime.now().isoformat()
-        }
-        
-        return self.save_participants(participants)
     
     def get_participant(self, emp_id):
         """Get participant by emp_id"""
-        participants = self.load_participants()
-        return participants.get(emp_id)
+        try:
+            return self.storage.get_participant(emp_id)
+        except Exception as e:
+            report_error(f"Error loading participant: {str(e)}")
+            return None
     
     def get_all_participants(self):
         """Get all participants as DataFrame"""
@@ -97,13 +108,11 @@ class Database:
         if not participant:
             return False
         
-        scores = self.load_scores()
-        
         # Calculate total and gift type
         total = game1 + game2 + game3 + game4 + game5
         gift_type = self.calculate_gift_type(total)
         
-        scores[emp_id] = {
+        record = {
             'name': participant['name'],
             'email': participant['email'],
             'game1': game1,
@@ -116,30 +125,351 @@ class Database:
             'last_updated': datetime.now().isoformat()
         }
         
-        return self.save_scores(scores)
+        try:
+            self.save_score_record(emp_id, record)
+            return True
+        except Exception as e:
+            report_error(f"Error saving scores: {str(e)}")
+            return False
+    
+    def set_game_score(self, emp_id, game_number, score, operator=None):
+        """Set a single game score, recomputing total and gift type
+        
+        Returns the previous score for that game (None if it was never
+        entered). Raises ParticipantNotRegistered for an unknown emp_id.
+        operator, if given, is recorded as the record's updated_by.
+        """
+        old_record, _ = self.write_score(emp_id, lambda current: self.build_game_record(emp_id, current, game_number, score, operator))
+        return old_record.get(f'game{game_number}') if old_record else None
+    
+    def set_game_scores(self, updates):
+        """Apply several single-game updates in one storage write
+        
+        updates is a list of (emp_id, game_number, score[, operator]),
+        applied in order; several updates to the same participant collapse
+        into one record write. Returns the previous score for each update.
+        Raises ParticipantNotRegistered, before anything is written, for an
+        unknown emp_id.
+        """
+        previous_scores = []
+        with self.storage.write_lock():
+            originals = {}
+            records = {}
+            for emp_id, game_number, score, *operator in updates:
+                if emp_id in records:
+                    current = records[emp_id]
+                else:
+                    current = originals[emp_id] = self.storage.get_score(emp_id)
+                previous_scores.append(current.get(f'game{game_number}') if current else None)
+                records[emp_id] = self.build_game_record(emp_id, current, game_number, score, *operator)
+            
+            if not records:
+                return previous_scores
+            
+            for emp_id, record in records.items():
+                record['version'] = record_version(originals[emp_id]) + 1
+            
+            index = self.get_rank_index()
+            table = self.get_score_table()
+            aggregate = self.get_score_aggregate()
+            feed = self.get_change_feed()
+            old_records = self.storage.upsert_scores(records)
+            signature = self.storage.scores_signature()
+            for emp_id, record in records.items():
+                index.update(emp_id, record['total'], signature=signature)
+                table.update(emp_id, record, signature=signature)
+                aggregate.apply(old_records[emp_id], record)
+            self.storage.save_aggregate(aggregate.to_dict())
+            feed.publish([(emp_id, old_records[emp_id], record) for emp_id, record in records.items()], signature=signature)
+        return previous_scores
+    
+    def build_game_record(self, emp_id, current, game_number, score, operator=None):
+        """Score record for emp_id with one game set, starting from current (or a blank record)"""
+        if current is None:
+            participant = self.get_participant(emp_id)
+            if not participant:
+                raise ParticipantNotRegistered(f"Participant {emp_id} is not registered")
+            record = {
+                'name': participant['name'],
+                'email': participant['email'],
+                'game1': 0,
+                'game2': 0,
+                'game3': 0,
+                'game4': 0,
+                'game5': 0
+            }
+        else:
+            record = dict(current)
+        
+        record[f'game{game_number}'] = score
+        total = sum(value for key, value in record.items() if GAME_KEY.match(key))
+        record['total'] = total
+        record['gift_type'] = self.calculate_gift_type(total)
+        record['last_updated'] = datetime.now().isoformat()
+        if operator:
+            record['updated_by'] = operator
+        return record
+    
+    def save_score_record(self, emp_id, record):
+        """Write one complete score record"""
+        self.write_score(emp_id, lambda current: dict(record))
+    
+    def write_score(self, emp_id, build_record):
+        """Read-modify-write one score record with optimistic versioning
+        
+        build_record(current) returns the new record. The write only lands if
+        the stored version is unchanged since the read; otherwise the record
+        is rebuilt from the fresh copy and retried. The leaderboard index,
+        aggregate and change feed are updated under the same lock. Returns
+        (old, new).
+        """
+        for attempt in range(SCORE_WRITE_RETRIES):
+            current = self.storage.get_score(emp_id)
+            record = build_record(current)
+            expected_version = record_version(current)
+            record['version'] = expected_version + 1
+            
+            with self.storage.write_lock():
+                index = self.get_rank_index()
+                table = self.get_score_table()
+                aggregate = self.get_score_aggregate()
+                feed = self.get_change_feed()
+                try:
+                    old_record = self.storage.upsert_score(emp_id, record, expected_version=expected_version)
+                except VersionConflict:
+                    continue
+                signature = self.storage.scores_signature()
+                index.update(emp_id, record['total'], signature=signature)
+                table.update(emp_id, record, signature=signature)
+                aggregate.apply(old_record, record)
+                self.storage.save_aggregate(aggregate.to_dict())
+                feed.publish([(emp_id, old_record, record)], signature=signature)
+            return old_record, record
+        
+        raise VersionConflict(f"Scores for {emp_id} kept changing; gave up after {SCORE_WRITE_RETRIES} attempts")
+    
+    def remove_score_record(self, emp_id):
+        """Delete one score record and keep the leaderboard index and aggregate in step"""
+        with self.storage.write_lock():
+            old_record = self.storage.get_score(emp_id)
+            if old_record is None:
+                return
+            index = self.get_rank_index()
+            table = self.get_score_table()
+            aggregate = self.get_score_aggregate()
+            feed = self.get_change_feed()
+            self.storage.delete_score(emp_id)
+            signature = self.storage.scores_signature()
+            index.remove(emp_id, signature=signature)
+            table.remove(emp_id, signature=signature)
+            aggregate.apply(old_record, None)
+            self.storage.save_aggregate(aggregate.to_dict())
+            feed.publish([(emp_id, old_record, None)], signature=signature)
+    
+    def get_score_aggregate(self):
+        """Get the running score aggregate, recomputing it if missing or stale"""
+        data = self.storage.load_aggregate()
+        if data is not None:
+            return ScoreAggregate(data)
+        # Recompute under the write lock so no score write lands between
+        # reading the scores and storing the aggregate stamped as current
+        with self.storage.write_lock():
+            data = self.storage.load_aggregate()
+            if data is not None:
+                return ScoreAggregate(data)
+            aggregate = ScoreAggregate.from_scores(self.storage.load_scores())
+            self.storage.save_aggregate(aggregate.to_dict())
+        return aggregate
+    
+    def verify_statistics(self):
+        """Recompute the aggregate from scratch and compare; returns a list of differences"""
+        with self.storage.write_lock():
+            data = self.storage.load_aggregate()
+            scores = self.storage.load_scores()
+            if data is None:
+                differences = ["Stored aggregate is missing or stale"]
+            else:
+                differences = ScoreAggregate(data).verify(scores)
+            if differences:
+                # Repair the stored aggregate
+                self.storage.save_aggregate(ScoreAggregate.from_scores(scores).to_dict())
+            return differences
+    
+    def get_rank_index(self):
+        """Get the shared leaderboard index (rank, top K, percentile)"""
+        return get_rank_index(self.storage)
+    
+    def get_score_table(self):
+        """Get the shared compact score table"""
+        return get_score_table(self.storage)
+    
+    def get_change_feed(self):
+        """Get the shared feed of score writes (version counter and deltas)"""
+        return get_change_feed(self.storage)
+    
+    def scores_version(self):
+        """Value that changes with every score write, for keying cached views of the scores"""
+        return (self.storage.scores_cache_key(), self.get_change_feed().version)
+    
+    def get_participant_registry(self):
+        """Get the emp_id -> record/label registry for the current participants"""
+        return get_participant_registry(self.storage)
+    
+    def get_participant_search(self):
+        """Get the shared participant search index"""
+        return get_participant_search(self.storage)
+    
+    def search_participants(self, query, limit=20):
+        """emp_ids whose name, emp_id or email words start with each word of query"""
+        try:
+            return self.get_participant_search().search(query, limit)
+        except Exception as e:
+            report_error(f"Error searching participants: {str(e)}")
+            return []
+    
+    def query_participants(self, offset=0, limit=PAGE_SIZE, sort_by='emp_id', descending=False, search=None):
+        """One page of participants, sorted by a record field and optionally filtered by search
+        
+        The sort order is computed once per participants version by the
+        registry and search goes through the search index, so only the
+        page's rows are built.
+        """
+        try:
+            registry = self.get_participant_registry()
+            if search and search.strip():
+                emp_ids = registry.sorted(self.get_participant_search().search(search, limit=None), sort_by, descending)
+            else:
+                emp_ids = registry.order(sort_by, descending)
+        except Exception as e:
+            report_error(f"Error loading participants: {str(e)}")
+            return Page(pd.DataFrame(columns=PARTICIPANT_COLUMNS), 0, offset, limit)
+        
+        rows = []
+        for emp_id in emp_ids[offset:offset + limit]:
+            record = registry.get(emp_id) or {}
+            rows.append({
+                'emp_id': emp_id,
+                'name': record.get('name', ''),
+                'email': record.get('email', ''),
+                'registration_date': record.get('registration_date', '')
+            })
+        return Page(pd.DataFrame(rows, columns=PARTICIPANT_COLUMNS), len(emp_ids), offset, limit)
+    
+    def query_leaderboard(self, offset=0, limit=PAGE_SIZE, search=None):
+        """One page of the leaderboard (rank, emp_id, name, total, gift_type), best first
+        
+        Without search the page comes straight from the rank index, which
+        skips whole score buckets before offset; with search the matches
+        are taken in rank order. Records are read only for the page's rows.
+        """
+        try:
+            index = self.get_rank_index()
+            if search and search.strip():
+                matches = set(self.get_participant_search().search(search, limit=None))
+                ranked = [entry for entry in index.top_k() if entry[0] in matches]
+                total_rows = len(ranked)
+                ranked = ranked[offset:offset + limit]
+            else:
+                total_rows = len(index)
+                ranked = index.page(offset, limit)
+            rows = []
+            for emp_id, total, rank in ranked:
+                record = self.storage.get_score(emp_id) or {}
+                rows.append({
+                    'rank': rank,
+                    'emp_id': emp_id,
+                    'name': record.get('name', ''),
+                    'total': total,
+                    'gift_type': record.get('gift_type', gift_type_for_total(total))
+                })
+        except Exception as e:
+            report_error(f"Error loading leaderboard: {str(e)}")
+            return Page(pd.DataFrame(columns=LEADERBOARD_COLUMNS), 0, offset, limit)
+        return Page(pd.DataFrame(rows, columns=LEADERBOARD_COLUMNS), total_rows, offset, limit)
+    
+    def get_game_score_order(self, game_number):
+        """Get the shared per-game score order (every participant, highest first) and its summary"""
+        registry = self.get_participant_registry()
+        stamp = (self.scores_version(), registry.signature)
+        return get_game_score_order(self.storage, game_number, registry, self.get_score_table(), stamp)
+    
+    def query_game_scores(self, game_number, offset=0, limit=PAGE_SIZE, search=None):
+        """One page of a game's scores for every participant, highest first
+        
+        Rows have emp_id, name, the game score and total. Unscored
+        participants count as 0. The order is built once per data version
+        and shared, so a page is a slice of it.
+        """
+        game_column = f'game{game_number}'
+        columns = ['emp_id', 'name', game_column, 'total']
+        try:
+            order = self.get_game_score_order(game_number)
+            if search and search.strip():
+                positions = order.positions(self.get_participant_search().search(search, limit=None))
+                total_rows = len(positions)
+                positions = positions[offset:offset + limit]
+            else:
+                total_rows = len(order)
+                positions = slice(offset, offset + limit)
+            registry = self.get_participant_registry()
+            emp_ids = order.emp_ids[positions]
+            rows = pd.DataFrame({
+                'emp_id': emp_ids,
+                'name': [registry.name(emp_id) for emp_id in emp_ids],
+                game_column: order.scores[positions],
+                'total': order.totals[positions]
+            }, columns=columns)
+        except Exception as e:
+            report_error(f"Error loading scores: {str(e)}")
+            return Page(pd.DataFrame(columns=columns), 0, offset, limit)
+        return Page(rows, total_rows, offset, limit)
     
     def calculate_gift_type(self, total_score):
         """Calculate gift type based on total score"""
-        if total_score >= 40:
-            return "Gold"
-        elif total_score >= 30:
-            return "Silver"
-        else:
-            return "Participation"
+        return gift_type_for_total(total_score)
     
     def get_user_scores(self, emp_id):
         """Get scores for a specific user"""
-        scores = self.load_scores()
-        return scores.get(emp_id)
+        try:
+            return self.storage.get_score(emp_id)
+        except Exception as e:
+            report_error(f"Error loading scores: {str(e)}")
+            return None
     
     def get_all_scores(self):
-        """Get all scores as DataFrame"""
-        scores = self.load_scores()
+        """Get all scores as DataFrame
+        
+        Served from the shared compact score table (int8 games, int16
+        totals, categorical gift_type), so it is not rebuilt per call.
+        Treat the result as read-only; copy it before assigning into it.
+        """
+        try:
+            table = self.get_score_table()
+        except Exception as e:
+            report_error(f"Error loading scores: {str(e)}")
+            return pd.DataFrame()
+        if len(table):
+            return table.frame()
+        return pd.DataFrame()
+    
+    def supports_point_in_time(self):
+        """Whether scores can be rebuilt as of a past time (event-sourced storage)"""
+        return hasattr(self.storage, 'scores_as_of')
+    
+    def get_scores_as_of(self, as_of):
+        """Scores as they stood at as_of (datetime or ISO string), rebuilt from the scoring log"""
+        if not self.supports_point_in_time():
+            report_error("Point-in-time scores need EVENT_TRACKER_STORAGE=events")
+            return pd.DataFrame()
+        try:
+            scores = self.storage.scores_as_of(as_of)
+        except Exception as e:
+            report_error(f"Error rebuilding scores: {str(e)}")
+            return pd.DataFrame()
         if scores:
             df = pd.DataFrame.from_dict(scores, orient='index')
             df['emp_id'] = df.index
-            df = df.reset_index(drop=True)
-            return df
+            return df.reset_index(drop=True)
         return pd.DataFrame()
     
     def get_scores_by_gift_type(self, gift_type):
@@ -158,82 +488,55 @@ class Database:
     
     def delete_participant(self, emp_id):
         """Delete a participant and their scores"""
-        # Delete from participants
-        participants = self.load_participants()
-        if emp_id in participants:
-            del participants[emp_id]
-            self.save_participants(participants)
-        
-        # Delete from scores
-        scores = self.load_scores()
-        if emp_id in scores:
-            del scores[emp_id]
-            self.save_scores(scores)
-        
-        return True
+        try:
+            with self.storage.write_lock():
+                search = self.get_participant_search()
+                self.storage.delete_participant(emp_id)
+                search.remove(emp_id, signature=self.storage.participants_signature())
+            self.remove_score_record(emp_id)
+            return True
+        except Exception as e:
+            report_error(f"Error deleting participant: {str(e)}")
+            return False
     
     def export_data_to_excel(self):
-        """Export all data to Excel format"""
+        """Export all data to Excel format
+        
+        Rows stream from storage into a write-only workbook spooled to a
+        temporary file; the Summary sheet comes from the score aggregate.
+        Returns the rewound file (closed when garbage collected).
+        """
         try:
-            # Get all data
-            participants_df = self.get_all_participants()
-            scores_df = self.get_all_scores()
-            
-            # Create Excel buffer
-            output = BytesIO()
-            
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                if not participants_df.empty:
-                    participants_df.to_excel(writer, sheet_name='Participants', index=False)
-                
-                if not scores_df.empty:
-                    scores_df.to_excel(writer, sheet_name='Scores', index=False)
-                
-                # Create summary sheet
-                if not scores_df.empty:
-                    summary_data = {
-                        'Metric': [
-                            'Total Participants',
-                            'Average Score',
-                            'Highest Score',
-                            'Lowest Score',
-                            'Gold Winners',
-                            'Silver Winners',
-                            'Participation Gifts'
-                        ],
-                        'Value': [
-                            len(scores_df),
-                            round(scores_df['total'].mean(), 2),
-                            scores_df['total'].max(),
-                            scores_df['total'].min(),
-                            len(scores_df[scores_df['gift_type'] == 'Gold']),
-                            len(scores_df[scores_df['gift_type'] == 'Silver']),
-                            len(scores_df[scores_df['gift_type'] == 'Participation'])
-                        ]
-                    }
-                    summary_df = pd.DataFrame(summary_data)
-                    summary_df.to_excel(writer, sheet_name='Summary', index=False)
-            
-            output.seek(0)
-            return output
-            
+            return spooled_export(write_excel, self.storage, self.get_score_aggregate())
         except Exception as e:
-            st.error(f"Error exporting data: {str(e)}")
+            report_error(f"Error exporting data: {str(e)}")
+            return None
+    
+    def export_data_to_csv(self, table='Scores'):
+        """Export one table ('Participants' or 'Scores') as CSV, streamed to a temporary file"""
+        try:
+            return spooled_export(write_csv, self.storage, table)
+        except Exception as e:
+            report_error(f"Error exporting data: {str(e)}")
+            return None
+    
+    def export_data_to_parquet(self, table='Scores'):
+        """Export one table as Parquet, streamed to a temporary file (needs pyarrow)"""
+        try:
+            return spooled_export(write_parquet, self.storage, table)
+        except ImportError:
+            report_error("Parquet export needs pyarrow (pip install pyarrow)")
+            return None
+        except Exception as e:
+            report_error(f"Error exporting data: {str(e)}")
             return None
     
     def get_statistics(self):
         """Get database statistics"""
-        participants = self.get_all_participants()
-        scores = self.get_all_scores()
-        
-        stats = {
-            'total_participants': len(participants) if not participants.empty else 0,
-            'total_scored': len(scores) if not scores.empty else 0,
-            'average_score': round(scores['total'].mean(), 2) if not scores.empty else 0,
-            'highest_score': scores['total'].max() if not scores.empty else 0,
-            'gold_winners': len(scores[scores['gift_type'] == 'Gold']) if not scores.empty else 0,
-            'silver_winners': len(scores[scores['gift_type'] == 'Silver']) if not scores.empty else 0,
-            'participation_gifts': len(scores[scores['gift_type'] == 'Participation']) if not scores.empty else 0
-        }
+        try:
+            aggregate = self.get_score_aggregate()
+        except Exception as e:
+            report_error(f"Error loading statistics: {str(e)}")
+            aggregate = ScoreAggregate()
         
-        return stats
+        return aggregate.statistics(total_participants=len(self.load_participants()))
@@ -0,0 +1,348 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# A job another process left in 'sending' this long belongs to a worker that died mid-send
+STALE_SENDING_SECONDS = 300
+
+# Identifies this process's claims, so its own in-flight jobs are never "recovered"
+PROCESS_TOKEN = f"{socket.gethostname()}:{os.getpid()}:{time.time():.0f}"
+
+INTERRUPTED_ERROR = "Interrupted while sending; it may have been delivered. Retry to send again."
+
+class EmailOutbox:
+    """On-disk queue of email campaigns and their recipient jobs (SQLite)
+    
+    A job moves pending -> sending -> sent/failed. It is claimed
+    ('sending') before the SMTP call and marked 'sent' right after it,
+    so a job is never picked up twice automatically. A job found still
+    'sending' after a crash may or may not have been delivered; it is
+    marked failed with a note and is only sent again when an admin
+    retries failed jobs. Each message carries a Message-ID derived from
+    the job, so a deliberate resend threads with the original.
+    """
+    
+    def __init__(self, db_file='email_outbox.db'):
+        self.db_file = db_file
+        self._local = threading.local()
+        self.ensure_schema()
+    
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def ensure_schema(self):
+        """Create the outbox tables if they do not exist"""
+        conn = self._connect()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS campaigns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'running',
+                created_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                campaign_id INTEGER NOT NULL REFERENCES campaigns(id),
+                emp_id TEXT,
+                name TEXT,
+                email TEXT NOT NULL,
+                body TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                claimed_at REAL,
+                claimed_by TEXT,
+                sent_at REAL,
+                UNIQUE (campaign_id, email)
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, campaign_id);
+        """)
+    
+    def create_campaign(self, name, subject, recipients):
+        """Queue a campaign; recipients are dicts with email, body and optional emp_id/name
+        
+        A recipient email appears at most once per campaign. Returns the
+        campaign id.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.execute(
+                "INSERT INTO campaigns (name, subject, status, created_at) VALUES (?, ?, 'running', ?)",
+                (name, subject, datetime.now().isoformat())
+            )
+            campaign_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs (campaign_id, emp_id, name, email, body) VALUES (?, ?, ?, ?, ?)",
+                [(campaign_id, r.get('emp_id'), r.get('name'), r['email'], r['body']) for r in recipients if r.get('email')]
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return campaign_id
+    
+    def claim_jobs(self, limit=50):
+        """Mark up to limit pending jobs of running campaigns as 'sending' and return them"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute("""
+                SELECT jobs.*, campaigns.subject FROM jobs
+                JOIN campaigns ON campaigns.id = jobs.campaign_id
+                WHERE jobs.status = 'pending' AND campaigns.status = 'running'
+                ORDER BY jobs.id LIMIT ?
+            """, (limit,)).fetchall()
+            now = time.time()
+            conn.executemany(
+                "UPDATE jobs SET status = 'sending', claimed_at = ?, claimed_by = ?, attempts = attempts + 1 WHERE id = ?",
+                [(now, PROCESS_TOKEN, row['id']) for row in rows]
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return [dict(row) for row in rows]
+    
+    def refresh_claim(self, job_id):
+        """Renew this process's claim on a job just before sending it
+        
+        Returns False when the job is no longer ours to send (another
+        process recovered it as interrupted), so it must not be sent.
+        """
+        cursor = self._connect().execute(
+            "UPDATE jobs SET claimed_at = ? WHERE id = ? AND status = 'sending' AND claimed_by = ?",
+            (time.time(), job_id, PROCESS_TOKEN)
+        )
+        return cursor.rowcount == 1
+    
+    def mark_sent(self, job_id):
+        """Record a delivered job"""
+        self._connect().execute(
+            "UPDATE jobs SET status = 'sent', error = NULL, sent_at = ? WHERE id = ?", (time.time(), job_id)
+        )
+    
+    def mark_failed(self, job_id, error):
+        """Record a job that could not be sent"""
+        self._connect().execute("UPDATE jobs SET status = 'failed', error = ? WHERE id = ?", (error, job_id))
+    
+    def recover_interrupted(self, stale_after=STALE_SENDING_SECONDS):
+        """Mark jobs a dead worker left in 'sending' as failed (never resent automatically)
+        
+        This process's own claims are never touched; claims made by other
+        processes (or an earlier run) count as interrupted once they are
+        stale_after seconds old. Returns the count.
+        """
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = 'failed', error = ? "
+            "WHERE status = 'sending' AND claimed_by IS NOT ? AND claimed_at < ?",
+            (INTERRUPTED_ERROR, PROCESS_TOKEN, time.time() - stale_after)
+        )
+        return cursor.rowcount
+    
+    def retry_failed(self, campaign_id):
+        """Queue a campaign's failed jobs again; returns the count"""
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = 'pending' WHERE campaign_id = ? AND status = 'failed'", (campaign_id,)
+        )
+        self.set_status(campaign_id, 'running')
+        return cursor.rowcount
+    
+    def set_status(self, campaign_id, status):
+        """Pause ('paused') or resume ('running') a campaign"""
+        self._connect().execute("UPDATE campaigns SET status = ? WHERE id = ?", (status, campaign_id))
+    
+    def campaign_stats(self, campaign_id, window=60):
+        """Job counts by state and the send rate over the last window seconds"""
+        conn = self._connect()
+        counts = {'pending': 0, 'sending': 0, 'sent': 0, 'failed': 0}
+        for row in conn.execute("SELECT status, COUNT(*) FROM jobs WHERE campaign_id = ? GROUP BY status", (campaign_id,)):
+            counts[row[0]] = row[1]
+        recent = conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE campaign_id = ? AND status = 'sent' AND sent_at >= ?",
+            (campaign_id, time.time() - window)
+        ).fetchone()[0]
+        counts['total'] = sum(counts.values())
+        counts['per_minute'] = round(recent * 60 / window, 1)
+        return counts
+    
+    def list_campaigns(self, limit=20):
+        """Most recent campaigns, newest first, with their stats"""
+        rows = self._connect().execute("SELECT * FROM campaigns ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [{**dict(row), **self.campaign_stats(row['id'])} for row in rows]
+    
+    def has_unfinished_jobs(self):
+        """Whether any running campaign has pending jobs, or any job is still 'sending'"""
+        row = self._connect().execute("""
+            SELECT 1 FROM jobs JOIN campaigns ON campaigns.id = jobs.campaign_id
+            WHERE (jobs.status = 'pending' AND campaigns.status = 'running') OR jobs.status = 'sending'
+            LIMIT 1
+        """).fetchone()
+        return row is not None
+    
+    def failed_jobs(self, campaign_id):
+        """(email, error) for a campaign's failed jobs"""
+        return [tuple(row) for row in self._connect().execute(
+            "SELECT email, error FROM jobs WHERE campaign_id = ? AND status = 'failed' ORDER BY id", (campaign_id,)
+        )]
+
+class OutboxWorker:
+    """Background thread that sends pending outbox jobs through EmailService
+    
+    Runs in the server process, independent of any browser session, so a
+    campaign keeps going when the admin closes the tab and picks up where
+    it left off after a restart.
+    """
+    
+    def __init__(self, outbox, email_service, batch_size=50, poll_interval=2.0):
+        self.outbox = outbox
+        self.email_service = email_service
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self.last_error = None
+        self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+        self._thread.start()
+    
+    def wake(self):
+        """Check for new jobs now instead of at the next poll"""
+        self._wake.set()
+    
+    def stop(self, timeout=10.0):
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join(timeout)
+    
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self.outbox.recover_interrupted()
+                jobs = self.outbox.claim_jobs(self.claim_size())
+                if jobs:
+                    self.send_jobs(jobs)
+                    continue
+            except Exception as e:
+                self.last_error = str(e)
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+    
+    def claim_size(self):
+        """Jobs per batch: batch_size, capped so a rate-limited batch takes
+        at most a quarter of STALE_SENDING_SECONDS"""
+        rate = self.email_service.bulk_rate_limit
+        if not rate:
+            return self.batch_size
+        return max(1, min(self.batch_size, int(rate * STALE_SENDING_SECONDS / 4)))
+    
+    def send_jobs(self, jobs):
+        """Send claimed jobs and record each outcome as it happens
+        
+        Each job's claim is refreshed just before it is sent; a job another
+        process has meanwhile recovered as interrupted is skipped, not sent.
+        recover_interrupted() skips this process's own claims, so any job
+        still unresolved when sending stops (a send or status update
+        raised) is marked failed here rather than left in 'sending'.
+        """
+        unresolved = {job['id'] for job in jobs}
+        skipped = set()
+        
+        def before_send(index):
+            job_id = jobs[index]['id']
+            if self.outbox.refresh_claim(job_id):
+                return True
+            # Already marked failed elsewhere; leave that record alone
+            skipped.add(job_id)
+            unresolved.discard(job_id)
+            return False
+        
+        def on_result(index, error):
+            job_id = jobs[index]['id']
+            if job_id in skipped:
+                return
+            if error is None:
+                self.outbox.mark_sent(job_id)
+            else:
+                self.outbox.mark_failed(job_id, error)
+            unresolved.discard(job_id)
+        
+        try:
+            sender = self.email_service.sender_email
+            messages = []
+            for job in jobs:
+                message = self.email_service.build_message(
+                    job['email'], job['subject'], job['body'],
+                    message_id=f"<campaign{job['campaign_id']}.job{job['id']}@event-tracker>"
+                )
+                messages.append((sender, job['email'], message.as_string()))
+            
+            self.email_service.get_bulk_mailer().send_all(messages, on_result=on_result, before_send=before_send)
+        finally:
+            for job_id in list(unresolved):
+                try:
+                    self.outbox.mark_failed(job_id, INTERRUPTED_ERROR)
+                except Exception as e:
+                    self.last_error = str(e)
+
+_outboxes = {}
+_workers = {}
+_resume_checked = set()
+_workers_lock = threading.Lock()
+
+def outbox_file(db_file=None):
+    """Outbox path: db_file, else EVENT_TRACKER_OUTBOX_DB (default email_outbox.db)"""
+    return db_file or os.getenv("EVENT_TRACKER_OUTBOX_DB", "email_outbox.db")
+
+def get_outbox(db_file=None):
+    """Get the process-wide outbox at EVENT_TRACKER_OUTBOX_DB (default email_outbox.db)"""
+    db_file = outbox_file(db_file)
+    key = os.path.abspath(db_file)
+    with _workers_lock:
+        outbox = _outboxes.get(key)
+        if outbox is None:
+            outbox = EmailOutbox(db_file)
+            _outboxes[key] = outbox
+        return outbox
+
+def get_outbox_worker(outbox, email_service):
+    """Get the process-wide worker for this outbox, starting it if needed"""
+    key = os.path.abspath(outbox.db_file)
+    with _workers_lock:
+        worker = _workers.get(key)
+        if worker is None:
+            worker = OutboxWorker(outbox, email_service)
+            _workers[key] = worker
+        return worker
+
+def resume_outbox_worker(email_service, db_file=None):
+    """Start the worker at app start if it has something to do; returns it or None
+    
+    Starts when email_service has credentials, or when an existing outbox
+    still has unfinished jobs, so a campaign resumes after a restart. The
+    check runs once per process and never creates the outbox file;
+    otherwise the worker starts when the Email Center is opened.
+    """
+    db_file = outbox_file(db_file)
+    key = os.path.abspath(db_file)
+    with _workers_lock:
+        if key in _workers:
+            return _workers[key]
+        if key in _resume_checked:
+            return None
+        _resume_checked.add(key)
+    
+    if not email_service.is_configured():
+        if not os.path.exists(db_file) or not get_outbox(db_file).has_unfinished_jobs():
+            return None
+    return get_outbox_worker(get_outbox(db_file), email_service)
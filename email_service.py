@@ -4,103 +4,132 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import streamlit as st
 import os
+from bulk_mailer import BulkMailer
+from email_templates import TemplateError, compile_template
+
+# Static HTML wrapper around each message body, built once
+HTML_HEAD = """
+        <html>
+          <body>
+            <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+              <h2 style="color: #1f77b4;">🎮 Event Results</h2>
+              <div style="white-space: pre-line;">"""
+HTML_TAIL = """</div>
+              <br>
+              <div style="background-color: #f0f0f0; padding: 20px; border-radius: 10px; margin-top: 20px;">
+                <p style="margin: 0; color: #666; font-size: 14px;">
+                  This email was sent from the Event Tracker System.<br>
+                  Thank you for participating! 🎉
+                </p>
+              </div>
+            </div>
+          </body>
+        </html>
+        """
 
 class EmailService:
     def __init__(self):
         # Email configuration - these should be set in Streamlit secrets or environment variables
-        self.smtp_server = "smtp.gmail.com"
-        self.port = 587  # For starttls
+        self.smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+        self.port = int(os.getenv("SMTP_PORT", "587"))  # For starttls
+        self.use_tls = os.getenv("SMTP_STARTTLS", "true").lower() not in ("0", "false", "no", "off")
         self.sender_email = os.getenv("SENDER_EMAIL", "")
         self.sender_password = os.getenv("SENDER_PASSWORD", "")
+        # Bulk sending: concurrent SMTP sessions, messages per session, messages per second (0 = no limit)
+        self.bulk_connections = int(os.getenv("SMTP_CONNECTIONS", "4"))
+        self.bulk_messages_per_connection = int(os.getenv("SMTP_MESSAGES_PER_CONNECTION", "100"))
+        self.bulk_rate_limit = float(os.getenv("SMTP_RATE_LIMIT", "0")) or None
+    
+    def get_bulk_mailer(self):
+        """Bulk mailer using this service's SMTP settings"""
+        return BulkMailer(
+            self.smtp_server,
+            self.port,
+            username=self.sender_email,
+            password=self.sender_password,
+            use_tls=self.use_tls,
+            connections=self.bulk_connections,
+            max_messages_per_connection=self.bulk_messages_per_connection,
+            rate_limit=self.bulk_rate_limit
+        )
+    
+    def build_message(self, recipient_email, subject, body, message_id=None):
+        """Build the plain text and HTML message for one recipient"""
+        message = MIMEMultipart("alternative")
+        message["Subject"] = subject
+        message["From"] = self.sender_email
+        message["To"] = recipient_email
+        if message_id:
+            message["Message-ID"] = message_id
+        
+        # Create HTML and plain text versions
+        text = body
+        html = HTML_HEAD + body + HTML_TAIL
+        
+        # Turn these into plain/html MIMEText objects
+        part1 = MIMEText(text, "plain")
+        part2 = MIMEText(html, "html")
+        
+        # Add HTML/plain-text parts to MIMEMultipart message
+        message.attach(part1)
+        message.attach(part2)
+        return message
     
     def send_email(self, recipient_email, recipient_name, subject, body):
         """Send an email to a recipient"""
         try:
-            # Create message
-            message = MIMEMultipart("alternative")
-            message["Subject"] = subject
-            message["From"] = self.sender_email
-            message["To"] = recipient_email
-            
-            # Create HTML and plain text versions
-            text = body
-            html = f"""
-            <html>
-              <body>
-                <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-                  <h2 style="color: #1f77b4;">🎮 Event Results</h2>
-                  <div style="white-space: pre-line;">{body}</div>
-                  <br>
-                  <div style="background-color: #f0f0f0; padding: 20px; border-radius: 10px; margin-top: 20px;">
-                    <p style="margin: 0; color: #666; font-size: 14px;">
-                      This email was sent from the Event Tracker System.<br>
-                      Thank you for participating! 🎉
-                    </p>
-                  </div>
-                </div>
-              </body>
-            </html>
-            """
-            
-            # Turn these into plain/html MIMEText objects
-            part1 = MIMEText(text, "plain")
-            part2 = MIMEText(html, "html")
-            
-            # Add HTML/plain-text parts to MIMEMultipart message
-            message.attach(part1)
-            message.attach(part2)
+            message = self.build_message(recipient_email, subject, body)
             
             # Create secure connection and send email
             context = ssl.create_default_context()
             with smtplib.SMTP(self.smtp_server, self.port) as server:
-                server.starttls(context=context)
-                server.login(self.sender_email, self.sender_password)
+                if self.use_tls:
+                    server.starttls(context=context)
+                if self.sender_password:
+                    server.login(self.sender_email, self.sender_password)
                 server.sendmail(self.sender_email, recipient_email, message.as_string())
             
             return True
-            
+        
         except Exception as e:
             st.error(f"Error sending email to {recipient_email}: {str(e)}")
             return False
     
-    def send_bulk_emails(self, recipients_df, subject, body_template):
-        """Send emails to multiple recipients"""
-        success_count = 0
-        failed_emails = []
+    def send_bulk_emails(self, recipients_df, subject, body_template, progress=None):
+        """Send emails to multiple recipients
         
-        for _, recipient in recipients_df.iterrows():
-            # Personalize the email body
-            personalized_body = body_template.format(
-                name=recipient.get('name', 'Participant'),
-                total_score=recipient.get('total', 0),
-                gift_type=recipient.get('gift_type', 'Participation'),
-                emp_id=recipient.get('emp_id', ''),
-                department=recipient.get('department', '')
-            )
-            
-            # Send email
-            if self.send_email(
-                recipient.get('email', ''),
-                recipient.get('name', ''),
-                subject,
-                personalized_body
-            ):
-                success_count += 1
-            else:
-                failed_emails.append(recipient.get('email', ''))
+        Messages go out over a small pool of reused SMTP sessions (see
+        BulkMailer). progress(sent, failed, total) is called as messages
+        complete, from worker threads.
+        """
+        # Raises TemplateError for an unknown placeholder before anything is sent
+        bodies = compile_template(body_template).render_frame(recipients_df)
+        emails = recipients_df['email'].fillna('').tolist() if 'email' in recipients_df.columns else [''] * len(bodies)
+        messages = []
+        for email, personalized_body in zip(emails, bodies):
+            message = self.build_message(email, subject, personalized_body)
+            messages.append((self.sender_email, email, message.as_string()))
+        
+        success_count, failures = self.get_bulk_mailer().send_all(messages, progress)
+        failed_emails = [email for email, _ in failures]
         
         return success_count, failed_emails
     
+    def is_configured(self):
+        """Whether sender credentials are set (no connection is made)"""
+        return bool(self.sender_email and self.sender_password)
+    
     def validate_email_config(self):
         """Validate email configuration"""
-        if not self.sender_email or not self.sender_password:
+        if not self.is_configured():
             return False, "Email credentials not configured. Please set SENDER_EMAIL and SENDER_PASSWORD in environment variables or Streamlit secrets."
         
         try:
             # Test connection
             context = ssl.create_default_context()
             with smtplib.SMTP(self.smtp_server, self.port) as server:
-                server.starttls(context=context)
+                if self.use_tls:
+                    server.starttls(context=context)
                 server.login(self.sender_email, self.sender_password)
             return True, "Email configuration is valid."
         
@@ -192,10 +221,10 @@ Event Organizing Team"""
         """Preview an email with sample data"""
         try:
             subject = template["subject"]
-            body = template["body"].format(**sample_data)
+            body = compile_template(template["body"]).render(sample_data)
             
             return subject, body
-        except KeyError as e:
-            return None, f"Template error: Missing placeholder {str(e)}"
+        except TemplateError as e:
+            return None, str(e)
         except Exception as e:
             return None, f"Preview error: {str(e)}"
@@ -0,0 +1,109 @@
+import string
+from functools import lru_cache
+from errors import EventTrackerError
+
+# Template placeholder -> (recipients DataFrame column, value when the column is missing)
+PLACEHOLDER_COLUMNS = {
+    'name': ('name', 'Participant'),
+    'total_score': ('total', 0),
+    'gift_type': ('gift_type', 'Participation'),
+    'emp_id': ('emp_id', ''),
+    'department': ('department', '')
+}
+
+class TemplateError(EventTrackerError, ValueError):
+    """An email template has a malformed or unknown placeholder"""
+
+class CompiledTemplate:
+    """An email template parsed once and rendered for many recipients
+    
+    Uses str.format syntax ({name}, {total_score:>3}, {{ for a literal
+    brace). Placeholders are checked against PLACEHOLDER_COLUMNS when the
+    template is compiled, so a typo fails before any email is queued.
+    """
+    
+    def __init__(self, template, placeholders=PLACEHOLDER_COLUMNS):
+        self.template = template
+        self.placeholders = placeholders
+        self._parts = []
+        try:
+            parsed = list(string.Formatter().parse(template))
+        except ValueError as e:
+            raise TemplateError(f"Template error: {str(e)}")
+        
+        unknown = []
+        for literal, field, format_spec, conversion in parsed:
+            if field is None:
+                self._parts.append((literal, None, None, None))
+                continue
+            if field not in placeholders:
+                unknown.append(f"{{{field}}}")
+                continue
+            if format_spec and ('{' in format_spec):
+                raise TemplateError(f"Template error: nested placeholder in {{{field}:{format_spec}}}")
+            self._parts.append((literal, field, format_spec, conversion))
+        if unknown:
+            allowed = ', '.join(f"{{{name}}}" for name in placeholders)
+            raise TemplateError(f"Template error: unknown placeholder(s) {', '.join(unknown)}; use {allowed}")
+        
+        self.fields = [field for _, field, _, _ in self._parts if field]
+        # The template with every placeholder reduced to a bare {} slot
+        self._pattern = ''.join(
+            literal.replace('{', '{{').replace('}', '}}') + ('{}' if field else '')
+            for literal, field, _, _ in self._parts
+        )
+    
+    @staticmethod
+    def _format(value, format_spec, conversion):
+        if conversion == 'r':
+            value = repr(value)
+        elif conversion == 's':
+            value = str(value)
+        elif conversion == 'a':
+            value = ascii(value)
+        if format_spec:
+            return format(value, format_spec)
+        if isinstance(value, float) and value.is_integer():
+            # Integer columns become float when a value is missing
+            value = int(value)
+        return value if isinstance(value, str) else str(value)
+    
+    def render(self, values):
+        """Render for one recipient given {placeholder: value}"""
+        pieces = []
+        for literal, field, format_spec, conversion in self._parts:
+            pieces.append(literal)
+            if field:
+                value = values.get(field, self.placeholders[field][1])
+                pieces.append(self._format(value, format_spec, conversion))
+        return ''.join(pieces)
+    
+    def render_frame(self, recipients_df):
+        """Render one body per row of a recipients DataFrame, in row order
+        
+        Each placeholder's column is converted to text once as a whole
+        array; rows are then filled into the precompiled pattern.
+        """
+        count = len(recipients_df)
+        text_columns = []
+        for _, field, format_spec, conversion in self._parts:
+            if not field:
+                continue
+            column, default = self.placeholders[field]
+            if column in recipients_df.columns:
+                # Fill gaps in Python; Series.where rejects new values in categorical columns
+                values = [default if value is None or value != value else value
+                          for value in recipients_df[column].tolist()]
+            else:
+                values = [default] * count
+            text_columns.append([self._format(value, format_spec, conversion) for value in values])
+        
+        if not text_columns:
+            return [self._pattern.format()] * count
+        pattern = self._pattern
+        return [pattern.format(*row) for row in zip(*text_columns)]
+
+@lru_cache(maxsize=32)
+def compile_template(template):
+    """Compile a template, reusing the result for repeated identical templates"""
+    return CompiledTemplate(template)
@@ -0,0 +1,24 @@
+import logging
+
+logger = logging.getLogger("event_tracker")
+
+class EventTrackerError(Exception):
+    """Base class for errors raised by the event tracker core"""
+
+class ParticipantNotRegistered(EventTrackerError, ValueError):
+    """A score was written for an emp_id with no participant record"""
+
+def log_error(message):
+    """Default reporter: write to the event_tracker logger"""
+    logger.error(message)
+
+_reporter = log_error
+
+def set_error_reporter(reporter):
+    """Route core error messages to reporter(message); None restores logging"""
+    global _reporter
+    _reporter = reporter if reporter is not None else log_error
+
+def report_error(message):
+    """Report an error the core has handled (the operation returns a failure value)"""
+    _reporter(message)
@@ -0,0 +1,399 @@
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+from file_lock import atomic_write_json, file_lock
+from score_log import get_log_writer, list_segments, load_legacy_entries, segment_name, segment_number
+from score_stats import GAME_KEY, ScoreAggregate, gift_type_for_total
+from storage import StorageBackend, VersionConflict, record_version
+
+SNAPSHOT_PATTERN = re.compile(r'^snapshot-(\d+)-(\d+)\.json$')
+
+# Snapshot the projection after this many new events
+SNAPSHOT_EVERY = 1000
+
+# Snapshots kept on disk; older ones only serve point-in-time rebuilds
+SNAPSHOTS_KEPT = 48
+
+# Entries can land in the log slightly out of timestamp order (the timestamp
+# is taken before the write lock), so a point-in-time replay reads this far
+# past the cutoff before stopping
+REPLAY_SLACK = timedelta(seconds=60)
+
+def event_sourcing_enabled():
+    """Whether EVENT_TRACKER_STORAGE selects the event-sourced store"""
+    return os.getenv("EVENT_TRACKER_STORAGE", "json").lower() == "events"
+
+def compact_timestamp(timestamp):
+    """Digits of an ISO timestamp, for snapshot file names"""
+    return re.sub(r'\D', '', timestamp or '')
+
+def parse_as_of(as_of):
+    """A datetime from a datetime or an ISO string"""
+    return as_of if isinstance(as_of, datetime) else datetime.fromisoformat(as_of)
+
+class ScoreProjection:
+    """Score records folded from scoring-log entries
+    
+    Game entries set one game score and recompute total and gift type,
+    the same way Database.build_game_record does; 'delete' entries drop
+    the record. Entries carrying a version (written by the event store)
+    set it, older operator entries bump it by one. The score aggregate is
+    kept in step with every entry.
+    """
+    
+    def __init__(self, scores=None, events=0, last_timestamp=None, aggregate=None):
+        self.scores = scores if scores is not None else {}
+        self.events = events
+        self.last_timestamp = last_timestamp
+        if aggregate is not None:
+            self.aggregate = ScoreAggregate(aggregate)
+        else:
+            self.aggregate = ScoreAggregate.from_scores(self.scores)
+    
+    def apply(self, entry):
+        emp_id = entry['participant_emp_id']
+        current = self.scores.get(emp_id)
+        if entry.get('action') == 'delete':
+            self.scores.pop(emp_id, None)
+            self.aggregate.apply(current, None)
+        else:
+            if current is None:
+                record = {
+                    'name': entry.get('participant_name', ''),
+                    'email': entry.get('participant_email', ''),
+                    'game1': 0,
+                    'game2': 0,
+                    'game3': 0,
+                    'game4': 0,
+                    'game5': 0
+                }
+            else:
+                record = dict(current)
+            record[f"game{entry['game_number']}"] = entry['new_score']
+            total = sum(value for key, value in record.items() if GAME_KEY.match(key))
+            record['total'] = total
+            record['gift_type'] = gift_type_for_total(total)
+            record['last_updated'] = entry['timestamp']
+            if entry.get('operator'):
+                record['updated_by'] = entry['operator']
+            record['version'] = entry.get('version', record_version(current) + 1)
+            # Records are replaced, never modified, so handed-out copies stay valid
+            self.scores[emp_id] = record
+            self.aggregate.apply(current, record)
+        self.events += 1
+        self.last_timestamp = entry['timestamp']
+
+def record_events(emp_id, old_record, new_record):
+    """Log entries that turn old_record into new_record (either may be None)
+    
+    One entry per game whose score changed, or a single 'delete' entry. A
+    new record with no non-zero game is logged as a zero for every game.
+    """
+    if new_record is None:
+        if old_record is None:
+            return []
+        return [{
+            "timestamp": datetime.now().isoformat(),
+            "game_number": None,
+            "operator": None,
+            "participant_emp_id": emp_id,
+            "participant_name": old_record.get('name', ''),
+            "new_score": None,
+            "old_score": None,
+            "action": "delete"
+        }]
+    
+    games = [key for key in new_record if GAME_KEY.match(key)]
+    if old_record is None:
+        changed = [key for key in games if new_record[key]] or games
+    else:
+        changed = [key for key in games if old_record.get(key) != new_record[key]]
+    
+    timestamp = new_record.get('last_updated') or datetime.now().isoformat()
+    entries = []
+    for key in changed:
+        old_score = old_record.get(key) if old_record else None
+        entry = {
+            "timestamp": timestamp,
+            "game_number": int(key[len('game'):]),
+            "operator": new_record.get('updated_by'),
+            "participant_emp_id": emp_id,
+            "participant_name": new_record.get('name', ''),
+            "new_score": new_record[key],
+            "old_score": old_score,
+            "action": "update" if old_score is not None else "create",
+            "version": record_version(new_record)
+        }
+        if old_record is None:
+            entry["participant_email"] = new_record.get('email', '')
+        entries.append(entry)
+    return entries
+
+class EventSourcedStorage(StorageBackend):
+    """Scores as a projection of the append-only scoring log
+    
+    A score write appends its log entries and nothing else; the scores
+    are whatever replaying the log gives. The projection is kept in memory
+    and caught up by reading only the bytes appended since the last read
+    (including other processes' writes). Every SNAPSHOT_EVERY events it is
+    saved with its log position, so a restart loads the newest snapshot
+    and replays the tail. scores_as_of() rebuilds the scores at a past
+    time from the nearest earlier snapshot. Participants are delegated to
+    another backend.
+    
+    Score writes append under the log directory lock, the same one the
+    log writer takes, which also serves as write_lock().
+    """
+    
+    def __init__(self, participants, log_dir='logs/scoring', legacy_file='game_scoring_log.json',
+                 snapshot_dir='logs/snapshots', snapshot_every=SNAPSHOT_EVERY):
+        self.participants = participants
+        self.log_dir = log_dir
+        self.legacy_file = legacy_file
+        self.snapshot_dir = snapshot_dir
+        self.snapshot_every = snapshot_every
+        self.writer = get_log_writer(log_dir)
+        self._lock = threading.RLock()
+        self._projection = None
+        self._segment = 0
+        self._offset = 0
+        self._snapshot_events = 0
+        os.makedirs(snapshot_dir, exist_ok=True)
+    
+    def load_participants(self):
+        return self.participants.load_participants()
+    
+    def save_participants(self, participants):
+        self.participants.save_participants(participants)
+    
+    def get_participant(self, emp_id):
+        return self.participants.get_participant(emp_id)
+    
+    def upsert_participant(self, emp_id, record):
+        self.participants.upsert_participant(emp_id, record)
+    
+    def delete_participant(self, emp_id):
+        self.participants.delete_participant(emp_id)
+    
+    def iter_participants(self, chunk_size=1000):
+        return self.participants.iter_participants(chunk_size)
+    
+    def participants_cache_key(self):
+        return self.participants.participants_cache_key()
+    
+    def participants_signature(self):
+        return self.participants.participants_signature()
+    
+    def _snapshots(self):
+        """(events, compact timestamp, path) for each snapshot, oldest first"""
+        snapshots = []
+        for name in os.listdir(self.snapshot_dir):
+            match = SNAPSHOT_PATTERN.match(name)
+            if match:
+                snapshots.append((int(match.group(1)), match.group(2), os.path.join(self.snapshot_dir, name)))
+        return sorted(snapshots)
+    
+    def _load_snapshot(self, path):
+        """Snapshot data, or None if unreadable or ahead of the log"""
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data['segment']:
+            segment = os.path.join(self.log_dir, segment_name(data['segment']))
+            if not os.path.exists(segment) or os.path.getsize(segment) < data['offset']:
+                # Taken from a different log
+                return None
+        return data
+    
+    def _save_snapshot(self):
+        projection = self._projection
+        name = f"snapshot-{projection.events:09d}-{compact_timestamp(projection.last_timestamp) or '0'}.json"
+        atomic_write_json(os.path.join(self.snapshot_dir, name), {
+            'events': projection.events,
+            'last_timestamp': projection.last_timestamp,
+            'segment': self._segment,
+            'offset': self._offset,
+            'scores': projection.scores,
+            'aggregate': projection.aggregate.to_dict()
+        }, indent=None)
+        self._snapshot_events = projection.events
+        for _, _, path in self._snapshots()[:-SNAPSHOTS_KEPT]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Pruned by another process
+                pass
+    
+    def _start(self):
+        """Load the newest usable snapshot, or replay the legacy log"""
+        for events, _, path in reversed(self._snapshots()):
+            data = self._load_snapshot(path)
+            if data is not None:
+                self._projection = ScoreProjection(data['scores'], data['events'], data['last_timestamp'], data.get('aggregate'))
+                self._segment, self._offset = data['segment'], data['offset']
+                self._snapshot_events = events
+                return
+        self._projection = ScoreProjection()
+        for entry in load_legacy_entries(self.legacy_file):
+            self._projection.apply(entry)
+    
+    def _replay(self, projection, segment, offset, until=None):
+        """Apply complete entries after (segment, offset); returns the new position
+        
+        With until=(cutoff, give_up) as ISO strings, entries later than
+        cutoff are skipped and the replay ends at the first one later than
+        give_up.
+        """
+        for path in list_segments(self.log_dir):
+            number = segment_number(path)
+            if number < segment:
+                continue
+            start = offset if number == segment else 0
+            with open(path, 'rb') as f:
+                f.seek(start)
+                data = f.read()
+            end = data.rfind(b'\n') + 1
+            position = start
+            for line in data[:end].split(b'\n')[:-1]:
+                if line.strip():
+                    entry = json.loads(line)
+                    if until is None or entry['timestamp'] <= until[0]:
+                        projection.apply(entry)
+                    elif entry['timestamp'] > until[1]:
+                        return number, position
+                position += len(line) + 1
+            segment, offset = number, position
+            if end < len(data):
+                # Torn final line: wait here until it is completed or repaired
+                break
+        return segment, offset
+    
+    def _catch_up(self):
+        """Apply entries appended since the last read; returns the projection"""
+        with self._lock:
+            if self._projection is None:
+                self._start()
+            self._segment, self._offset = self._replay(self._projection, self._segment, self._offset)
+            if self._projection.events - self._snapshot_events >= self.snapshot_every:
+                self._save_snapshot()
+            return self._projection
+    
+    def snapshot(self):
+        """Save a snapshot of the current projection now"""
+        with self._lock:
+            self._catch_up()
+            self._save_snapshot()
+    
+    def scores_as_of(self, as_of):
+        """{emp_id: record} as they stood at as_of (datetime or ISO string)
+        
+        Starts from the newest snapshot taken at or before as_of (or from
+        the beginning of the log) and replays the entries up to as_of.
+        """
+        cutoff = parse_as_of(as_of)
+        until = (cutoff.isoformat(), (cutoff + REPLAY_SLACK).isoformat())
+        
+        for _, timestamp, path in reversed(self._snapshots()):
+            if timestamp <= compact_timestamp(until[0]):
+                data = self._load_snapshot(path)
+                if data is not None:
+                    projection = ScoreProjection(data['scores'], data['events'], data['last_timestamp'], data.get('aggregate'))
+                    self._replay(projection, data['segment'], data['offset'], until)
+                    return projection.scores
+        
+        projection = ScoreProjection()
+        for entry in load_legacy_entries(self.legacy_file):
+            if entry['timestamp'] <= until[0]:
+                projection.apply(entry)
+        self._replay(projection, 0, 0, until)
+        return projection.scores
+    
+    def load_scores(self):
+        with self._lock:
+            # A copy, so callers can iterate it while later events are applied
+            return dict(self._catch_up().scores)
+    
+    def save_scores(self, scores):
+        self._replace_scores(scores)
+    
+    def _replace_scores(self, scores):
+        """Append the entries that make the projection equal scores; returns how many"""
+        with self.write_lock():
+            current = self._catch_up().scores
+            entries = []
+            for emp_id in list(current):
+                if emp_id not in scores:
+                    entries.extend(record_events(emp_id, current[emp_id], None))
+            for emp_id, record in scores.items():
+                entries.extend(record_events(emp_id, current.get(emp_id), record))
+            self._append(entries)
+            return len(entries)
+    
+    def import_json(self, scores_file='scores.json'):
+        """Bring the log in line with a scores JSON file; returns the number of entries appended
+        
+        Used once when switching an existing event over to this store: each
+        record's games become entries, so the projection matches the file.
+        """
+        with open(scores_file, 'r') as f:
+            scores = json.load(f)
+        return self._replace_scores(scores)
+    
+    def export_json(self, scores_file='scores.json'):
+        """Write the current projection to a scores JSON file"""
+        atomic_write_json(scores_file, self.load_scores())
+    
+    def get_score(self, emp_id):
+        return self._catch_up().scores.get(emp_id)
+    
+    def upsert_score(self, emp_id, record, expected_version=None):
+        with self.write_lock():
+            old_record = self._catch_up().scores.get(emp_id)
+            if expected_version is not None and record_version(old_record) != expected_version:
+                raise VersionConflict(f"Scores for {emp_id} changed (version {record_version(old_record)}, expected {expected_version})")
+            self._append(record_events(emp_id, old_record, record))
+            return old_record
+    
+    def upsert_scores(self, records):
+        with self.write_lock():
+            current = self._catch_up().scores
+            old_records = {emp_id: current.get(emp_id) for emp_id in records}
+            entries = []
+            for emp_id, record in records.items():
+                entries.extend(record_events(emp_id, old_records[emp_id], record))
+            self._append(entries)
+            return old_records
+    
+    def delete_score(self, emp_id):
+        with self.write_lock():
+            self._append(record_events(emp_id, self._catch_up().scores.get(emp_id), None))
+    
+    def _append(self, entries):
+        """Append entries to the log (the only write) and fold them in"""
+        self.writer.append_many(entries)
+        self.writer.flush()
+        self._catch_up()
+    
+    def write_lock(self):
+        return file_lock(self.log_dir)
+    
+    def scores_cache_key(self):
+        return ('events', os.path.abspath(self.log_dir))
+    
+    def scores_signature(self):
+        with self._lock:
+            self._catch_up()
+            return (self._segment, self._offset, self._projection.events)
+    
+    def load_aggregate(self):
+        # The projection keeps the aggregate current, including other processes' writes
+        with self._lock:
+            return self._catch_up().aggregate.to_dict()
+    
+    def save_aggregate(self, aggregate):
+        # Derived from the log like the scores; nothing to store
+        pass
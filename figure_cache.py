@@ -0,0 +1,88 @@
+import threading
+from collections import OrderedDict
+import plotly.io as pio
+from score_stats import GIFT_THRESHOLDS
+
+# Total serialized size of cached figures before the least recently used are dropped
+FIGURE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+class FigureCache:
+    """Process-wide LRU cache of built Plotly figures shared across sessions
+    
+    Figures are keyed by (kind, data version, threshold config), so every
+    viewer of the same data gets the figure built once for that version;
+    concurrent misses on one key wait for a single build. Each entry is
+    charged its serialized JSON size, and the least recently used entries
+    are evicted to stay under max_bytes. The cached figure objects are
+    handed to st.plotly_chart as they are (Streamlit re-validates figures
+    passed as JSON), so treat them as read-only.
+    """
+    
+    def __init__(self, max_bytes=FIGURE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._building = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, kind, version, build, config=GIFT_THRESHOLDS):
+        """Figure for (kind, version, config), calling build() on a miss"""
+        key = (kind, version, config)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            build_lock = self._building.setdefault(key, threading.Lock())
+        
+        with build_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    # Built by another session while we waited
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                self.misses += 1
+            try:
+                figure = build()
+                size = len(pio.to_json(figure, validate=False))
+            except Exception:
+                with self._lock:
+                    self._building.pop(key, None)
+                raise
+            
+            with self._lock:
+                self._entries[key] = (figure, size)
+                self._bytes += size
+                while self._bytes > self.max_bytes and len(self._entries) > 1:
+                    _, (_, evicted_size) = self._entries.popitem(last=False)
+                    self._bytes -= evicted_size
+                    self.evictions += 1
+                self._building.pop(key, None)
+        return figure
+    
+    def clear(self):
+        """Drop every cached figure"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def stats(self):
+        """Hit/miss counters and memory use"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total * 100, 1) if total else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'evictions': self.evictions
+            }
+
+figure_cache = FigureCache()
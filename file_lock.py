@@ -0,0 +1,75 @@
+import json
+import os
+import stat
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+_local = threading.local()
+_process_locks = {}
+_process_locks_guard = threading.Lock()
+
+def _process_lock(lock_path):
+    with _process_locks_guard:
+        lock = _process_locks.get(lock_path)
+        if lock is None:
+            lock = threading.RLock()
+            _process_locks[lock_path] = lock
+        return lock
+
+@contextmanager
+def file_lock(path):
+    """Exclusive cross-process lock on path (via path + '.lock')
+    
+    Re-entrant within a thread. Uses fcntl.flock where available and an
+    in-process lock otherwise.
+    """
+    lock_path = os.path.abspath(path) + '.lock'
+    held = getattr(_local, 'held', None)
+    if held is None:
+        held = _local.held = {}
+    
+    if lock_path in held:
+        yield
+        return
+    
+    process_lock = _process_lock(lock_path)
+    process_lock.acquire()
+    lock_file = None
+    try:
+        if fcntl is not None:
+            lock_file = open(lock_path, 'a')
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        held[lock_path] = lock_file
+        try:
+            yield
+        finally:
+            del held[lock_path]
+    finally:
+        if lock_file is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            lock_file.close()
+        process_lock.release()
+
+def atomic_write_json(path, data, indent=2):
+    """Write JSON to a temp file in the same directory and rename it over path"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates 0600 files; keep the original file's permissions
+        mode = stat.S_IMODE(os.stat(path).st_mode) if os.path.exists(path) else 0o644
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
@@ -1,8 +1,10 @@
 import json
 import os
-import streamlit as st
 from datetime import datetime
+from errors import report_error
 import secrets
+from file_lock import atomic_write_json, file_lock
+from password_service import get_password_service
 import string
 
 class GameConfigManager:
@@ -86,18 +88,18 @@ class GameConfigManager:
             with open(self.config_file, 'r') as f:
                 return json.load(f)
         except Exception as e:
-            st.error(f"Error loading game config: {str(e)}")
+            report_error(f"Error loading game config: {str(e)}")
             return self.create_default_config()
     
     def save_config(self, config):
         """Save game configuration"""
         try:
             config['last_updated'] = datetime.now().isoformat()
-            with open(self.config_file, 'w') as f:
-                json.dump(config, f, indent=2)
+            with file_lock(self.config_file):
+                atomic_write_json(self.config_file, config)
             return True
         except Exception as e:
-            st.error(f"Error saving game config: {str(e)}")
+            report_error(f"Error saving game config: {str(e)}")
             return False
     
     def get_game_config(self, game_number):
@@ -107,54 +109,58 @@ class GameConfigManager:
     
     def update_game_config(self, game_number, game_config):
         """Update configuration for a specific game"""
-        config = self.load_config()
-        config['games'][str(game_number)] = game_config
-        return self.save_config(config)
+        with file_lock(self.config_file):
+            config = self.load_config()
+            config['games'][str(game_number)] = game_config
+            return self.save_config(config)
     
     def add_new_game(self, game_number, name, scoring_type, max_points=10, win_points=10, lose_points=0, description=""):
         """Add a new game configuration"""
-        config = self.load_config()
-        
-        config['games'][str(game_number)] = {
-            "name": name,
-            "scoring_type": scoring_type,
-            "max_points": max_points,
-            "win_points": win_points,
-            "lose_points": lose_points,
-            "description": description,
-            "active": True
-        }
-        
-        # Update total games count
-        config['total_games'] = max(config['total_games'], game_number)
-        
-        return self.save_config(config)
+        with file_lock(self.config_file):
+            config = self.load_config()
+            
+            config['games'][str(game_number)] = {
+                "name": name,
+                "scoring_type": scoring_type,
+                "max_points": max_points,
+                "win_points": win_points,
+                "lose_points": lose_points,
+                "description": description,
+                "active": True
+            }
+            
+            # Update total games count
+            config['total_games'] = max(config['total_games'], game_number)
+            
+            return self.save_config(config)
     
     def remove_game(self, game_number):
         """Remove a game configuration"""
-        config = self.load_config()
-        
-        if str(game_number) in config['games']:
-            del config['games'][str(game_number)]
+        with file_lock(self.config_file):
+            config = self.load_config()
             
-            # Update total games count
-            if config['games']:
-                config['total_games'] = max([int(k) for k in config['games'].keys()])
-            else:
-                config['total_games'] = 0
+            if str(game_number) in config['games']:
+                del config['games'][str(game_number)]
                 
-            return self.save_config(config)
-        return False
+                # Update total games count
+                if config['games']:
+                    config['total_games'] = max([int(k) for k in config['games'].keys()])
+                else:
+                    config['total_games'] = 0
+                
+                return self.save_config(config)
+            return False
     
     def update_gift_thresholds(self, gold_threshold, silver_threshold):
         """Update gift thresholds"""
-        config = self.load_config()
-        config['gift_thresholds'] = {
-            "gold": gold_threshold,
-            "silver": silver_threshold,
-            "participation": 0
-        }
-        return self.save_config(config)
+        with file_lock(self.config_file):
+            config = self.load_config()
+            config['gift_thresholds'] = {
+                "gold": gold_threshold,
+                "silver": silver_threshold,
+                "participation": 0
+            }
+            return self.save_config(config)
     
     def get_active_games(self):
         """Get list of active games"""
@@ -163,19 +169,21 @@ class GameConfigManager:
     
     def toggle_game_status(self, game_number):
         """Toggle active/inactive status of a game"""
-        config = self.load_config()
-        game_key = str(game_number)
-        
-        if game_key in config['games']:
-            config['games'][game_key]['active'] = not config['games'][game_key].get('active', True)
-            return self.save_config(config)
-        return False
+        with file_lock(self.config_file):
+            config = self.load_config()
+            game_key = str(game_number)
+            
+            if game_key in config['games']:
+                config['games'][game_key]['active'] = not config['games'][game_key].get('active', True)
+                return self.save_config(config)
+            return False
 
 class GameOperatorManager:
     """Manages game operators and their assignments"""
     
-    def __init__(self, auth_system):
+    def __init__(self, auth_system, password_service=None):
         self.auth = auth_system
+        self.passwords = password_service if password_service is not None else get_password_service()
     
     def generate_secure_password(self, length=8):
         """Generate a secure password for game operators"""
@@ -184,27 +192,19 @@ class GameOperatorManager:
     
     def create_game_operator(self, game_number, operator_name=None, custom_password=None):
         """Create a new game operator"""
-        users = self.auth.load_users()
-        
-        # Generate username
-        username = f"game{game_number}_op"
-        
-        # Check if operator already exists
-        if username in users:
-            return False, f"Game operator for Game {game_number} already exists"
-        
-        # Generate operator details
-        if not operator_name:
-            operator_name = f"Game {game_number} Operator"
-        
-        password = custom_password if custom_password else self.generate_secure_password()
-        
-        # Hash password
-        import bcrypt
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-        
-        # Add operator to users
-        users[username] = {
+        results = self.bulk_create_operators(
+            [game_number],
+            {game_number: custom_password} if custom_password else None,
+            {game_number: operator_name} if operator_name else None
+        )
+        result = results[0]
+        if result['success']:
+            return True, {"username": result['username'], "password": result['password'], "name": result['name']}
+        return False, result['error']
+    
+    def operator_record(self, game_number, operator_name, hashed_password):
+        """User record for a game operator"""
+        return {
             "name": operator_name,
             "emp_id": f"GAME{game_number:03d}",
             "email": f"game{game_number}@company.com",
@@ -215,34 +215,31 @@ class GameOperatorManager:
             "assigned_game": game_number,
             "created_date": datetime.now().isoformat()
         }
-        
-        # Save users
-        if self.auth.save_users(users):
-            return True, {"username": username, "password": password, "name": operator_name}
-        
-        return False, "Failed to create game operator"
     
     def remove_game_operator(self, game_number):
         """Remove a game operator"""
-        users = self.auth.load_users()
         username = f"game{game_number}_op"
-        
-        if username in users:
-            del users[username]
-            return self.auth.save_users(users)
+        with self.auth.users_lock():
+            users = self.auth.load_users(fresh=True)
+            if username in users:
+                del users[username]
+                return self.auth.save_users(users)
         
         return False
     
     def update_operator_password(self, game_number, new_password):
         """Update game operator password"""
-        users = self.auth.load_users()
         username = f"game{game_number}_op"
+        if username not in self.auth.load_users():
+            return False
         
-        if username in users:
-            import bcrypt
-            hashed_password = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-            users[username]['password'] = hashed_password
-            return self.auth.save_users(users)
+        # Hash outside the lock; bcrypt is slow
+        hashed_password = self.passwords.hash_password(new_password)
+        with self.auth.users_lock():
+            users = self.auth.load_users(fresh=True)
+            if username in users:
+                users[username]['password'] = hashed_password
+                return self.auth.save_users(users)
         
         return False
     
@@ -263,53 +260,121 @@ class GameOperatorManager:
         username = f"game{game_number}_op"
         return users.get(username)
     
-    def bulk_create_operators(self, game_numbers, custom_passwords=None):
-        """Create multiple game operators at once"""
+    def bulk_create_operators(self, game_numbers, custom_passwords=None, operator_names=None):
+        """Create multiple game operators at once
+        
+        Passwords are hashed in parallel (operators given the same password
+        share one hash) and the users file is saved once.
+        """
         results = []
         custom_passwords = custom_passwords or {}
+        operator_names = operator_names or {}
+        users = self.auth.load_users()
         
+        new_operators = []
+        seen = set()
         for game_num in game_numbers:
-            password = custom_passwords.get(game_num)
-            success, data = self.create_game_operator(game_num, custom_password=password)
-            
-            if success:
+            username = f"game{game_num}_op"
+            if username in seen:
                 results.append({
                     "game": game_num,
-                    "success": True,
-                    "username": data["username"],
-                    "password": data["password"],
-                    "name": data["name"]
+                    "success": False,
+                    "error": f"Game {game_num} is listed more than once"
                 })
-            else:
+                continue
+            seen.add(username)
+            if username in users:
                 results.append({
                     "game": game_num,
                     "success": False,
-                    "error": data
+                    "error": f"Game operator for Game {game_num} already exists"
                 })
+                continue
+            
+            password = custom_passwords.get(game_num) or self.generate_secure_password()
+            name = operator_names.get(game_num) or f"Game {game_num} Operator"
+            new_operators.append((game_num, username, name, password))
+            results.append({
+                "game": game_num,
+                "success": True,
+                "username": username,
+                "password": password,
+                "name": name
+            })
+        
+        if not new_operators:
+            return results
+        
+        hashes = self.passwords.hash_passwords([password for _, _, _, password in new_operators])
+        with self.auth.users_lock():
+            # Re-check on the current users: another session may have created some meanwhile
+            users = self.auth.load_users(fresh=True)
+            created = set()
+            for (game_num, username, name, _), hashed_password in zip(new_operators, hashes):
+                if username not in users:
+                    users[username] = self.operator_record(game_num, name, hashed_password)
+                    created.add(game_num)
+            results = [
+                {"game": result['game'], "success": False,
+                 "error": f"Game operator for Game {result['game']} already exists"}
+                if result['success'] and result['game'] not in created else result
+                for result in results
+            ]
+            saved = not created or self.auth.save_users(users)
+        
+        if not saved:
+            results = [
+                {"game": result['game'], "success": False, "error": "Failed to create game operator"}
+                if result['success'] else result
+                for result in results
+            ]
         
         return results
     
-    def reset_all_operator_passwords(self):
-        """Reset passwords for all game operators"""
-        operators = self.get_all_game_operators()
-        results = []
+    def reset_all_operator_passwords(self, shared_password=None):
+        """Reset passwords for all game operators
         
-        for username, operator_data in operators.items():
-            game_number = operator_data.get('assigned_game')
-            if game_number:
-                new_password = self.generate_secure_password()
-                if self.update_operator_password(game_number, new_password):
-                    results.append({
-                        "username": username,
-                        "game": game_number,
-                        "new_password": new_password,
-                        "success": True
-                    })
-                else:
-                    results.append({
-                        "username": username, 
-                        "game": game_number,
-                        "success": False
-                    })
+        Each operator gets a new random password unless shared_password is
+        given, in which case it is hashed once for all of them. Hashing runs
+        in parallel and the users file is saved once.
+        """
+        users = self.auth.load_users()
+        operators = [
+            (username, user_data['assigned_game'])
+            for username, user_data in users.items()
+            if user_data.get('role') == 'game_operator' and user_data.get('assigned_game')
+        ]
+        if not operators:
+            return []
+        
+        if shared_password:
+            new_passwords = [shared_password] * len(operators)
+        else:
+            new_passwords = [self.generate_secure_password() for _ in operators]
+        hashes = self.passwords.hash_passwords(new_passwords)
+        
+        with self.auth.users_lock():
+            # Apply to the current users so concurrent edits are kept
+            users = self.auth.load_users(fresh=True)
+            for (username, _), hashed_password in zip(operators, hashes):
+                if username in users:
+                    users[username]['password'] = hashed_password
+            success = self.auth.save_users(users)
+        
+        results = []
+        for (username, game_number), new_password in zip(operators, new_passwords):
+            if success:
+                results.append({
+                    "username": username,
+                    "game": game_number,
+                    "new_password": new_password,
+                    "success": True
+                })
+            else:
+                results.append({
+                    "username": username, 
+                    "game": game_number,
+                    "success": False
+                })
         
         return results
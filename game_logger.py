@@ -1,29 +1,27 @@
-import json
-import os
 from datetime import datetime
-import streamlit as st
+from errors import report_error
+from event_store import event_sourcing_enabled
+from score_log import ScoreLogReader, get_log_index, get_log_writer
 
 class GameScoringLogger:
-    def __init__(self):
-        self.log_file = 'game_scoring_log.json'
-        self.ensure_log_exists()
+    def __init__(self, log_dir='logs/scoring', legacy_file='game_scoring_log.json'):
+        self.log_dir = log_dir
+        self.log_file = legacy_file
+        self.writer = get_log_writer(log_dir)
+        self.reader = ScoreLogReader(log_dir, legacy_file)
+        self.index = get_log_index(log_dir, legacy_file)
+        # The event-sourced store writes score entries itself
+        self.entries_written_by_storage = event_sourcing_enabled()
     
-    def ensure_log_exists(self):
-        """Ensure log file exists"""
-        if not os.path.exists(self.log_file):
-            log_data = {
-                "entries": [],
-                "created": datetime.now().isoformat()
-            }
-            with open(self.log_file, 'w') as f:
-                json.dump(log_data, f, indent=2)
+    def load_entries(self):
+        """Load all log entries (legacy file and JSONL segments)"""
+        return list(self.reader.iter_entries())
     
     def log_score_entry(self, game_number, operator_username, participant_emp_id, participant_name, score, old_score=None):
         """Log a score entry"""
+        if self.entries_written_by_storage:
+            return True
         try:
-            with open(self.log_file, 'r') as f:
-                log_data = json.load(f)
-            
             entry = {
                 "timestamp": datetime.now().isoformat(),
                 "game_number": game_number,
@@ -35,49 +33,49 @@ class GameScoringLogger:
                 "action": "update" if old_score is not None else "create"
             }
             
-            log_data["entries"].append(entry)
-            
-            with open(self.log_file, 'w') as f:
-                json.dump(log_data, f, indent=2)
+            self.writer.append(entry)
             
             return True
         except Exception as e:
-            st.error(f"Error logging score entry: {str(e)}")
+            report_error(f"Error logging score entry: {str(e)}")
             return False
     
     def get_recent_entries(self, limit=50):
-        """Get recent log entries"""
+        """Get recent log entries, newest first (read from the end of the log)"""
         try:
-            with open(self.log_file, 'r') as f:
-                log_data = json.load(f)
-            
-            # Sort by timestamp descending and limit
-            entries = sorted(log_data["entries"], key=lambda x: x["timestamp"], reverse=True)
-            return entries[:limit]
+            return self.index.recent(limit)
         except Exception as e:
-            st.error(f"Error reading log entries: {str(e)}")
+            report_error(f"Error reading log entries: {str(e)}")
             return []
     
-    def get_entries_by_game(self, game_number):
-        """Get log entries for a specific game"""
+    def get_entries_by_game(self, game_number, limit=None):
+        """Get log entries for a specific game, newest first"""
         try:
-            with open(self.log_file, 'r') as f:
-                log_data = json.load(f)
-            
-            game_entries = [entry for entry in log_data["entries"] if entry["game_number"] == game_number]
-            return sorted(game_entries, key=lambda x: x["timestamp"], reverse=True)
+            return self.index.lookup('game', game_number, limit)
         except Exception as e:
-            st.error(f"Error reading game entries: {str(e)}")
+            report_error(f"Error reading game entries: {str(e)}")
             return []
     
-    def get_entries_by_operator(self, operator_username):
-        """Get log entries for a specific operator"""
+    def get_entries_by_operator(self, operator_username, limit=None):
+        """Get log entries for a specific operator, newest first"""
         try:
-            with open(self.log_file, 'r') as f:
-                log_data = json.load(f)
-            
-            operator_entries = [entry for entry in log_data["entries"] if entry["operator"] == operator_username]
-            return sorted(operator_entries, key=lambda x: x["timestamp"], reverse=True)
+            return self.index.lookup('operator', operator_username, limit)
         except Exception as e:
-            st.error(f"Error reading operator entries: {str(e)}")
+            report_error(f"Error reading operator entries: {str(e)}")
             return []
+    
+    def get_entries_by_participant(self, emp_id, limit=None):
+        """Get log entries for a specific participant, newest first"""
+        try:
+            return self.index.lookup('emp_id', emp_id, limit)
+        except Exception as e:
+            report_error(f"Error reading participant entries: {str(e)}")
+            return []
+    
+    def count_entries_by_game(self, game_number):
+        """Number of log entries for a specific game"""
+        try:
+            return self.index.count('game', game_number)
+        except Exception as e:
+            report_error(f"Error reading game entries: {str(e)}")
+            return 0
@@ -1,12 +1,21 @@
 import streamlit as st
 import pandas as pd
+import queue
 from database import Database
 from game_logger import GameScoringLogger
+from streamlit_tables import paginated_table
+
+# Most matches offered in the participant picker for a search
+PARTICIPANT_SEARCH_LIMIT = 20
+
+# Most entries shown in the game entry log
+ENTRY_LOG_LIMIT = 200
 
 class GameOperatorPanel:
-    def __init__(self, database, game_logger):
+    def __init__(self, database, game_logger, write_behind=None):
         self.db = database
         self.logger = game_logger
+        self.write_behind = write_behind
     
     def show_game_operator_panel(self, assigned_game, operator_username):
         """Show the game operator panel for score entry"""
@@ -15,10 +24,7 @@ class GameOperatorPanel:
         # Game operator info
         st.info(f"Logged in as: **{operator_username}** - Game {assigned_game} Operator")
         
-        # Get all participants
-        participants_df = self.db.get_all_participants()
-        
-        if participants_df.empty:
+        if len(self.db.get_participant_registry()) == 0:
             st.warning("No participants registered yet!")
             return
         
@@ -26,52 +32,52 @@ class GameOperatorPanel:
         tab1, tab2, tab3 = st.tabs(["📝 Score Entry", "📊 Current Scores", "📋 Entry Log"])
         
         with tab1:
-            self.show_score_entry_form(assigned_game, operator_username, participants_df)
+            self.show_score_entry_form(assigned_game, operator_username)
         
         with tab2:
-            self.show_current_scores(assigned_game, participants_df)
+            self.show_current_scores(assigned_game)
         
         with tab3:
             self.show_entry_log(assigned_game, operator_username)
     
-    def show_score_entry_form(self, assigned_game, operator_username, participants_df):
+    def show_score_entry_form(self, assigned_game, operator_username):
         """Show score entry form"""
         st.subheader(f"Enter Scores for Game {assigned_game}")
         
+        if self.write_behind:
+            self.show_write_behind_failures(assigned_game)
+        
         # Search for participant
-        search_term = st.text_input("🔍 Search participant", placeholder="Search by name or employee ID")
+        search_term = st.text_input("🔍 Search participant", placeholder="Search by name, employee ID or email")
         
+        registry = self.db.get_participant_registry()
         if search_term:
-            mask = (
-                participants_df['name'].str.contains(search_term, case=False, na=False) |
-                participants_df['emp_id'].str.contains(search_term, case=False, na=False)
-            )
-            filtered_participants = participants_df[mask]
+            participant_ids = self.db.search_participants(search_term, limit=PARTICIPANT_SEARCH_LIMIT)
         else:
-            filtered_participants = participants_df
+            participant_ids = registry.emp_ids
         
-        if not filtered_participants.empty:
+        if participant_ids:
             # Select participant
-            participant_options = []
-            for _, row in filtered_participants.iterrows():
-                participant_options.append(f"{row['name']} ({row['emp_id']})")
-            
-            selected_participant = st.selectbox(
+            emp_id = st.selectbox(
                 "Select Participant",
-                participant_options,
+                participant_ids,
+                format_func=registry.label,
                 key=f"game{assigned_game}_participant_select"
             )
             
-            if selected_participant:
-                # Extract emp_id from selection
-                emp_id = selected_participant.split("(")[1].split(")")[0]
-                participant_name = selected_participant.split(" (")[0]
+            if emp_id:
+                participant_name = registry.name(emp_id)
                 
                 # Get current scores
                 current_scores = self.db.get_user_scores(emp_id)
                 current_game_score = 0
                 if current_scores:
                     current_game_score = current_scores.get(f'game{assigned_game}', 0)
+                if self.write_behind:
+                    # Show a score that is queued but not yet written
+                    pending_score = self.write_behind.pending_score(emp_id, assigned_game)
+                    if pending_score is not None:
+                        current_game_score = pending_score
                 
                 # Score entry form
                 with st.form(f"game{assigned_game}_score_form"):
@@ -106,45 +112,34 @@ class GameOperatorPanel:
         else:
             st.warning("No participants found matching your search.")
     
+    def show_write_behind_failures(self, assigned_game):
+        """Show queued entries for this game that the background writer failed to save"""
+        seen_key = f"game{assigned_game}_write_failures_seen"
+        failures = self.write_behind.failures_since(st.session_state.get(seen_key, 0), assigned_game)
+        if not failures:
+            return
+        
+        for failure in failures:
+            if failure['stage'] == 'store':
+                st.error(f"❌ Game {failure['game_number']} score ({failure['score']}) for {failure['participant_name']} "
+                         f"({failure['emp_id']}) was NOT saved: {failure['error']}. Please enter it again.")
+            else:
+                st.warning(f"⚠️ Game {failure['game_number']} score ({failure['score']}) for {failure['participant_name']} "
+                           f"({failure['emp_id']}) was saved but not written to the scoring log: {failure['error']}")
+        if st.button("Dismiss", key=f"game{assigned_game}_dismiss_write_failures"):
+            st.session_state[seen_key] = failures[-1]['id']
+            st.rerun()
+    
     def save_game_score(self, emp_id, participant_name, game_number, new_score, old_score, operator_username):
         """Save score for a specific game"""
         try:
-            # Get current scores
-            current_scores = self.db.get_user_scores(emp_id)
-            
-            if current_scores:
-                # Update existing scores
-                game_scores = {
-                    'game1': current_scores.get('game1', 0),
-                    'game2': current_scores.get('game2', 0),
-                    'game3': current_scores.get('game3', 0),
-                    'game4': current_scores.get('game4', 0),
-                    'game5': current_scores.get('game5', 0)
-                }
+            if self.write_behind:
+                # Queue the write; the background writer saves and logs it
+                self.write_behind.submit(emp_id, participant_name, game_number, new_score, operator_username)
             else:
-                # Initialize all games to 0
-                game_scores = {
-                    'game1': 0,
-                    'game2': 0,
-                    'game3': 0,
-                    'game4': 0,
-                    'game5': 0
-                }
-            
-            # Update the specific game score
-            game_scores[f'game{game_number}'] = new_score
-            
-            # Save to database
-            success = self.db.update_scores(
-                emp_id,
-                game_scores['game1'],
-                game_scores['game2'],
-                game_scores['game3'],
-                game_scores['game4'],
-                game_scores['game5']
-            )
-            
-            if success:
+                # Update just this game's score
+                previous_score = self.db.set_game_score(emp_id, game_number, new_score, operator=operator_username)
+                
                 # Log the entry
                 self.logger.log_score_entry(
                     game_number, 
@@ -152,84 +147,72 @@ class GameOperatorPanel:
                     emp_id, 
                     participant_name, 
                     new_score, 
-                    old_score
+                    previous_score
                 )
-                
+            
+            if self.write_behind:
+                # Only queued so far; a failed write shows up in show_write_behind_failures
                 if new_score == 0:
-                    st.success(f"✅ Cleared Game {game_number} score for {participant_name}")
+                    st.success(f"✅ Queued clearing Game {game_number} score for {participant_name}")
                 else:
-                    st.success(f"✅ Saved Game {game_number} score ({new_score}) for {participant_name}")
-                st.rerun()
+                    st.success(f"✅ Queued Game {game_number} score ({new_score}) for {participant_name}")
+            elif new_score == 0:
+                st.success(f"✅ Cleared Game {game_number} score for {participant_name}")
             else:
-                st.error("❌ Failed to save score. Please try again.")
-                
+                st.success(f"✅ Saved Game {game_number} score ({new_score}) for {participant_name}")
+            st.rerun()
+        
+        except queue.Full:
+            st.error("❌ Too many scores are waiting to be saved. Please try again in a moment.")
         except Exception as e:
             st.error(f"❌ Error saving score: {str(e)}")
     
-    def show_current_scores(self, assigned_game, participants_df):
-        """Show current scores for the assigned game"""
+    def show_current_scores(self, assigned_game):
+        """Show current scores for the assigned game, one page at a time"""
         st.subheader(f"Current Game {assigned_game} Scores")
         
-        scores_df = self.db.get_all_scores()
-        
-        if not scores_df.empty:
-            # Filter and prepare data for display
-            game_column = f'game{assigned_game}'
-            display_data = []
-            
-            for _, participant in participants_df.iterrows():
-                emp_id = participant['emp_id']
-                name = participant['name']
-                
-                # Get score for this participant
-                participant_scores = scores_df[scores_df['emp_id'] == emp_id]
-                if not participant_scores.empty:
-                    game_score = participant_scores.iloc[0][game_column]
-                    total_score = participant_scores.iloc[0]['total']
-                else:
-                    game_score = 0
-                    total_score = 0
-                
-                display_data.append({
-                    'Employee ID': emp_id,
-                    'Name': name,
-                    f'Game {assigned_game} Score': game_score,
-                    'Total Score': total_score
-                })
-            
-            # Convert to DataFrame and display
-            display_df = pd.DataFrame(display_data)
-            display_df = display_df.sort_values(f'Game {assigned_game} Score', ascending=False)
-            
-            st.dataframe(display_df, use_container_width=True, height=400)
-            
-            # Summary stats
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                total_entries = len([d for d in display_data if d[f'Game {assigned_game} Score'] > 0])
-                st.metric("Scores Entered", total_entries)
-            with col2:
-                pending_entries = len([d for d in display_data if d[f'Game {assigned_game} Score'] == 0])
-                st.metric("Pending Entries", pending_entries)
-            with col3:
-                if total_entries > 0:
-                    avg_score = sum([d[f'Game {assigned_game} Score'] for d in display_data]) / len(display_data)
-                    st.metric("Average Score", f"{avg_score:.2f}")
-            with col4:
-                if total_entries > 0:
-                    max_score = max([d[f'Game {assigned_game} Score'] for d in display_data])
-                    st.metric("Highest Score", max_score)
-        else:
+        if len(self.db.get_rank_index()) == 0:
             st.info("No scores entered yet.")
+            return
+        
+        summary = self.db.get_game_score_order(assigned_game).summary
+        search_term = st.text_input("🔍 Filter scores", placeholder="Search by name, employee ID or email",
+                                    key=f"game_{assigned_game}_scores_search")
+        score_label = f'Game {assigned_game} Score'
+        paginated_table(
+            lambda offset, limit: self.db.query_game_scores(assigned_game, offset, limit, search=search_term),
+            key=f"game_{assigned_game}_scores_page",
+            reset_on=search_term,
+            prepare=lambda rows: rows.rename(columns={
+                'emp_id': 'Employee ID', 'name': 'Name',
+                f'game{assigned_game}': score_label, 'total': 'Total Score'
+            })
+        )
+        
+        # Summary stats
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Scores Entered", summary['entered'])
+        with col2:
+            st.metric("Pending Entries", summary['pending'])
+        with col3:
+            if summary['entered'] > 0:
+                st.metric("Average Score", f"{summary['average']:.2f}")
+        with col4:
+            if summary['entered'] > 0:
+                st.metric("Highest Score", summary['highest'])
     
     def show_entry_log(self, assigned_game, operator_username):
         """Show entry log for the game operator"""
         st.subheader(f"Game {assigned_game} Entry Log")
         
-        # Get entries for this game
-        entries = self.logger.get_entries_by_game(assigned_game)
+        # Get the latest entries for this game from the log index
+        entries = self.logger.get_entries_by_game(assigned_game, limit=ENTRY_LOG_LIMIT)
         
         if entries:
+            total_entries = self.logger.count_entries_by_game(assigned_game)
+            if total_entries > len(entries):
+                st.caption(f"Showing the latest {len(entries)} of {total_entries} entries")
             # Convert to DataFrame for display
             log_data = []
             for entry in entries:
@@ -247,10 +230,10 @@ class GameOperatorPanel:
             
             # Show only this operator's entries
             st.write("#### Your Recent Entries")
-            operator_entries = self.logger.get_entries_by_operator(operator_username)
+            operator_entries = self.logger.get_entries_by_operator(operator_username, limit=10)
             if operator_entries:
                 recent_operator_data = []
-                for entry in operator_entries[:10]:  # Last 10 entries
+                for entry in operator_entries:
                     recent_operator_data.append({
                         'Time': entry['timestamp'][:19].replace('T', ' '),
                         'Participant': entry['participant_name'],
@@ -0,0 +1,63 @@
+import threading
+import numpy as np
+import pandas as pd
+
+class GameScoreOrder:
+    """One game's score for every participant, highest first, built once per data version
+    
+    Participants without a score count as 0. Ties keep registration
+    order. The arrays are aligned: emp_ids[i] scored scores[i] in the
+    game and totals[i] overall, so a page of the operator table is a
+    slice. summary holds entered, pending, average and highest. Built
+    from the shared score table and participant registry; do not modify.
+    """
+    
+    def __init__(self, game_number, registry, scores_df, stamp=None):
+        self.game_number = game_number
+        self.stamp = stamp
+        game_column = f'game{game_number}'
+        participants = pd.Index(registry.emp_ids)
+        if scores_df.empty:
+            scores_df = pd.DataFrame({'emp_id': [], game_column: [], 'total': []})
+        elif game_column not in scores_df.columns:
+            scores_df = scores_df.assign(**{game_column: 0})
+        scored = scores_df.set_index('emp_id')
+        game_values = scored[game_column].reindex(participants, fill_value=0).to_numpy()
+        totals = scored['total'].reindex(participants, fill_value=0).to_numpy()
+        
+        order = np.argsort(-game_values.astype(np.int64), kind='stable')
+        self.emp_ids = participants.to_numpy()[order]
+        self.scores = game_values[order]
+        self.totals = totals[order]
+        self._index = pd.Index(self.emp_ids)
+        
+        entered = int((game_values > 0).sum())
+        self.summary = {
+            'entered': entered,
+            'pending': len(game_values) - entered,
+            'average': float(game_values.mean()) if len(game_values) else 0.0,
+            'highest': game_values.max().item() if len(game_values) else 0
+        }
+    
+    def __len__(self):
+        return len(self.emp_ids)
+    
+    def positions(self, emp_ids):
+        """Positions of emp_ids in the order (unknown ones dropped), ascending"""
+        positions = self._index.get_indexer(list(emp_ids))
+        return np.sort(positions[positions >= 0])
+
+_orders = {}
+_orders_lock = threading.Lock()
+
+def get_game_score_order(storage, game_number, registry, table, stamp):
+    """Get the process-wide order for one game, rebuilt when stamp (the data version) changes"""
+    key = (storage.scores_cache_key(), storage.participants_cache_key(), game_number)
+    with _orders_lock:
+        order = _orders.get(key)
+        if order is not None and order.stamp == stamp:
+            return order
+    order = GameScoreOrder(game_number, registry, table.frame(), stamp)
+    with _orders_lock:
+        _orders[key] = order
+    return order
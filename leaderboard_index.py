@@ -0,0 +1,163 @@
+import threading
+
+class RankIndex:
+    """Leaderboard index over total scores backed by a Fenwick tree
+    
+    Keeps a count of participants per total score so rank, top-K and
+    percentile queries never sort the full score table. Totals must be
+    non-negative integers; the tree grows as higher totals appear.
+    Ranks use competition ranking: tied totals share a rank.
+    """
+    
+    def __init__(self, capacity=64):
+        self._lock = threading.RLock()
+        self._capacity = capacity
+        self._tree = [0] * (capacity + 1)
+        self._totals = {}
+        self._buckets = {}
+        self.signature = None
+    
+    def __len__(self):
+        return len(self._totals)
+    
+    def _add(self, total, delta):
+        i = total + 1
+        while i <= self._capacity:
+            self._tree[i] += delta
+            i += i & -i
+    
+    def _count_at_most(self, total):
+        """Number of participants with a total <= total"""
+        i = min(total + 1, self._capacity)
+        count = 0
+        while i > 0:
+            count += self._tree[i]
+            i -= i & -i
+        return count
+    
+    def _grow(self, total):
+        capacity = self._capacity
+        while total >= capacity:
+            capacity *= 2
+        self._capacity = capacity
+        self._tree = [0] * (capacity + 1)
+        for bucket_total, bucket in self._buckets.items():
+            self._add(bucket_total, len(bucket))
+    
+    def build(self, scores):
+        """Rebuild from {emp_id: score record}"""
+        with self._lock:
+            self._tree = [0] * (self._capacity + 1)
+            self._totals = {}
+            self._buckets = {}
+            for emp_id, record in scores.items():
+                self._insert(emp_id, int(record.get('total', 0)))
+    
+    def _insert(self, emp_id, total):
+        if total < 0:
+            raise ValueError(f"Negative total score for {emp_id}: {total}")
+        if total >= self._capacity:
+            self._grow(total)
+        self._totals[emp_id] = total
+        self._buckets.setdefault(total, {})[emp_id] = None
+        self._add(total, 1)
+    
+    def _discard(self, emp_id):
+        total = self._totals.pop(emp_id, None)
+        if total is None:
+            return
+        bucket = self._buckets[total]
+        del bucket[emp_id]
+        if not bucket:
+            del self._buckets[total]
+        self._add(total, -1)
+    
+    def update(self, emp_id, total, signature=None):
+        """Set the total for emp_id, optionally recording the store signature it matches"""
+        with self._lock:
+            self._discard(emp_id)
+            self._insert(emp_id, int(total))
+            if signature is not None:
+                self.signature = signature
+    
+    def remove(self, emp_id, signature=None):
+        """Remove emp_id from the index"""
+        with self._lock:
+            self._discard(emp_id)
+            if signature is not None:
+                self.signature = signature
+    
+    def rank(self, emp_id):
+        """1-based rank of emp_id, or None if not scored"""
+        with self._lock:
+            total = self._totals.get(emp_id)
+            if total is None:
+                return None
+            return len(self._totals) - self._count_at_most(total) + 1
+    
+    def percentile(self, emp_id):
+        """Percentage of participants ranked at or below emp_id"""
+        with self._lock:
+            rank = self.rank(emp_id)
+            if rank is None:
+                return None
+            count = len(self._totals)
+            return (count - rank + 1) / count * 100
+    
+    def top_k(self, k=None):
+        """[(emp_id, total, rank)] for the k highest totals, best first"""
+        with self._lock:
+            results = []
+            rank = 1
+            for total in sorted(self._buckets, reverse=True):
+                bucket = self._buckets[total]
+                for emp_id in bucket:
+                    if k is not None and len(results) >= k:
+                        return results
+                    results.append((emp_id, total, rank))
+                rank += len(bucket)
+            return results
+    
+    def page(self, offset=0, limit=50):
+        """[(emp_id, total, rank)] for ranks offset+1 .. offset+limit, best first
+        
+        Whole buckets before offset are skipped by their size, so the cost
+        depends on the number of distinct totals and limit, not on offset.
+        """
+        with self._lock:
+            results = []
+            rank = 1
+            for total in sorted(self._buckets, reverse=True):
+                bucket = self._buckets[total]
+                if offset >= len(bucket):
+                    offset -= len(bucket)
+                    rank += len(bucket)
+                    continue
+                for position, emp_id in enumerate(bucket):
+                    if position < offset:
+                        continue
+                    if len(results) >= limit:
+                        return results
+                    results.append((emp_id, total, rank))
+                offset = 0
+                rank += len(bucket)
+            return results
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_rank_index(storage):
+    """Get the process-wide rank index for storage, rebuilding it if scores changed"""
+    key = storage.scores_cache_key()
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = RankIndex()
+            _indexes[key] = index
+    
+    signature = storage.scores_signature()
+    with index._lock:
+        if index.signature != signature:
+            index.build(storage.load_scores())
+            index.signature = signature
+    return index
@@ -0,0 +1,139 @@
+import threading
+from collections import deque
+import pandas as pd
+import plotly.express as px
+from figure_cache import figure_cache
+
+# Rank moves kept for the "recent moves" line under the table
+MOVEMENTS_SHOWN = 5
+
+GIFT_COLORS = {
+    'Gold': '#FFD700',
+    'Silver': '#C0C0C0',
+    'Participation': '#87CEEB'
+}
+
+def rank_icon(rank):
+    """Medal for the top three ranks, the number otherwise"""
+    if rank == 1:
+        return "🥇"
+    elif rank == 2:
+        return "🥈"
+    elif rank == 3:
+        return "🥉"
+    else:
+        return f"{rank}"
+
+def top_10_figure(top_10):
+    """Bar chart of the ten highest totals"""
+    figure = px.bar(
+        top_10,
+        x='name',
+        y='total',
+        title="Top 10 Participants",
+        color='total',
+        color_continuous_scale='viridis'
+    )
+    figure.update_xaxes(tickangle=45)
+    return figure
+
+def gift_figure(gift_counts):
+    """Pie chart of participants per gift tier"""
+    return px.pie(
+        values=gift_counts.values,
+        names=gift_counts.index,
+        title="Gift Distribution",
+        color_discrete_map=GIFT_COLORS
+    )
+
+class LeaderboardView:
+    """Leaderboard charts, statistics and rank moves shared by every viewer
+    
+    refresh() compares the change feed's version with the one the view
+    was built at and returns at once if nothing was written. Otherwise the
+    view is brought up to date once for all viewers: ranks come from the
+    rank index, statistics and gift counts from the score aggregate, and
+    rank moves of the rows in the feed's deltas are recorded. The table
+    itself is not kept here; viewers page through it with
+    Database.query_leaderboard. Charts come from the shared figure cache,
+    keyed by the rows they plot, so they are rebuilt only when those
+    change. The figures are shared; do not modify them.
+    """
+    
+    def __init__(self, feed):
+        self._lock = threading.Lock()
+        self._subscription = feed.subscribe()
+        self.version = None
+        self.stats = {}
+        self.bar_figure = None
+        self.pie_figure = None
+        self.movements = deque(maxlen=MOVEMENTS_SHOWN)
+        self._ranks = {}
+    
+    def refresh(self, db):
+        """Bring the view up to date with db's scores; returns self"""
+        feed = db.get_change_feed()
+        if feed.version == self.version:
+            return self
+        with self._lock:
+            version, changes = self._subscription.poll()
+            if version == self.version:
+                # Another viewer refreshed while we waited for the lock
+                return self
+            self._rebuild(db, changes)
+            self.version = version
+        return self
+    
+    def _rebuild(self, db, changes):
+        ranked = db.get_rank_index().top_k()
+        if not ranked:
+            self.stats = {}
+            self._ranks = {}
+            return
+        
+        ranks = {emp_id: rank for emp_id, _, rank in ranked}
+        if changes is None:
+            self.movements.clear()
+        else:
+            latest = {change.emp_id: change for change in changes}
+            for emp_id, change in latest.items():
+                old_rank, new_rank = self._ranks.get(emp_id), ranks.get(emp_id)
+                if new_rank is not None and old_rank != new_rank:
+                    self.movements.appendleft((change.new.get('name', emp_id), old_rank, new_rank))
+        self._ranks = ranks
+        
+        aggregate = db.get_score_aggregate()
+        self.stats = {
+            'participants': aggregate.count,
+            'average': aggregate.average_total,
+            'highest': aggregate.max_total,
+            'gold': aggregate.gift_counts.get('Gold', 0)
+        }
+        
+        top_10 = db.query_leaderboard(0, 10).rows
+        self.bar_figure = figure_cache.get(
+            'leaderboard_top_10',
+            tuple(zip(top_10['name'], top_10['total'].tolist())),
+            lambda: top_10_figure(top_10)
+        )
+        
+        gift_counts = pd.Series(aggregate.gift_counts, dtype='int64')
+        gift_counts = gift_counts[gift_counts > 0].sort_values(ascending=False, kind='stable')
+        self.pie_figure = figure_cache.get(
+            'leaderboard_gifts',
+            tuple(gift_counts.items()),
+            lambda: gift_figure(gift_counts)
+        )
+
+_views = {}
+_views_lock = threading.Lock()
+
+def get_leaderboard_view(db):
+    """Get the process-wide leaderboard view for db's storage, up to date"""
+    key = db.storage.scores_cache_key()
+    with _views_lock:
+        view = _views.get(key)
+        if view is None:
+            view = LeaderboardView(db.get_change_feed())
+            _views[key] = view
+    return view.refresh(db)
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Event Tracker Event-Sourcing Migration
+Seed the scoring log from scores.json so the event-sourced store starts
+from the current scores, or write the projected scores back to scores.json.
+
+Usage:
+    python migrate_to_events.py                 # scores.json -> scoring log
+    python migrate_to_events.py --export        # scoring log -> scores.json
+    EVENT_TRACKER_STORAGE=events streamlit run app.py
+"""
+
+import argparse
+import sys
+
+from event_store import EventSourcedStorage
+from storage import JSONStorage
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Move Event Tracker scores between scores.json and the scoring log")
+    parser.add_argument('--participants', default='participants.json', help="Participants JSON file")
+    parser.add_argument('--scores', default='scores.json', help="Scores JSON file")
+    parser.add_argument('--log-dir', default='logs/scoring', help="Scoring log directory")
+    parser.add_argument('--snapshot-dir', default='logs/snapshots', help="Projection snapshot directory")
+    parser.add_argument('--export', action='store_true', help="Write the projected scores back to the scores file")
+    args = parser.parse_args()
+    
+    storage = EventSourcedStorage(JSONStorage(args.participants, args.scores), log_dir=args.log_dir, snapshot_dir=args.snapshot_dir)
+    
+    try:
+        if args.export:
+            storage.export_json(args.scores)
+            print(f"✅ Exported the projected scores to {args.scores}")
+        else:
+            appended = storage.import_json(args.scores)
+            storage.snapshot()
+            print(f"✅ Appended {appended} entries to {args.log_dir}; the projection now matches {args.scores}")
+            print("   Set EVENT_TRACKER_STORAGE=events to run the app on the event-sourced store")
+    except Exception as e:
+        print(f"❌ Migration failed: {str(e)}")
+        sys.exit(1)
+    finally:
+        storage.writer.close()
+
+if __name__ == "__main__":
+    main()
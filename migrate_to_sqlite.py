@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Event Tracker Storage Migration
+Ingest participants.json / scores.json into the SQLite storage backend,
+or export the SQLite database back to the JSON file format.
+
+Usage:
+    python migrate_to_sqlite.py                 # JSON -> SQLite
+    python migrate_to_sqlite.py --export        # SQLite -> JSON
+    EVENT_TRACKER_STORAGE=sqlite streamlit run app.py
+"""
+
+import argparse
+import os
+import sys
+
+from storage import SQLiteStorage
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Migrate Event Tracker data between JSON files and SQLite")
+    parser.add_argument('--db', default=os.getenv("EVENT_TRACKER_DB", "event_tracker.db"), help="SQLite database file")
+    parser.add_argument('--participants', default='participants.json', help="Participants JSON file")
+    parser.add_argument('--scores', default='scores.json', help="Scores JSON file")
+    parser.add_argument('--export', action='store_true', help="Export SQLite data back to the JSON files")
+    args = parser.parse_args()
+    
+    storage = SQLiteStorage(args.db)
+    
+    try:
+        if args.export:
+            storage.export_json(args.participants, args.scores)
+            print(f"✅ Exported {args.db} to {args.participants} and {args.scores}")
+        else:
+            counts = storage.import_json(args.participants, args.scores)
+            print(f"✅ Imported {counts['participants']} participants and {counts['scores']} scores into {args.db}")
+            print("   Set EVENT_TRACKER_STORAGE=sqlite to run the app on the SQLite backend")
+    except Exception as e:
+        print(f"❌ Migration failed: {str(e)}")
+        sys.exit(1)
+    finally:
+        storage.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import threading
+
+class ParticipantRegistry:
+    """emp_id -> participant record and display label, built once per data version
+    
+    Selectors take emp_ids as their options and format them with label(),
+    so rendering N options is N dict lookups and the chosen value is the
+    emp_id itself; nothing is parsed back out of a label. records is the
+    storage snapshot and must not be modified.
+    """
+    
+    def __init__(self, participants, signature=None):
+        self.records = participants
+        self.emp_ids = list(participants)
+        self.signature = signature
+        self._labels = None
+        self._id_labels = None
+        self._orders = {}
+    
+    def __len__(self):
+        return len(self.records)
+    
+    def __contains__(self, emp_id):
+        return emp_id in self.records
+    
+    def get(self, emp_id):
+        """Participant record for emp_id, or None"""
+        return self.records.get(emp_id)
+    
+    def name(self, emp_id):
+        """Participant name for emp_id ('' if unknown)"""
+        record = self.records.get(emp_id)
+        return record.get('name', '') if record else ''
+    
+    def label(self, emp_id):
+        """Label like 'Name (EMP001)', for the operator pickers"""
+        if self._labels is None:
+            self._labels = {key: f"{record.get('name', '')} ({key})" for key, record in self.records.items()}
+        return self._labels.get(emp_id, emp_id)
+    
+    def id_label(self, emp_id):
+        """Label like 'EMP001 - Name', for the admin and email selectors"""
+        if self._id_labels is None:
+            self._id_labels = {key: f"{key} - {record.get('name', '')}" for key, record in self.records.items()}
+        return self._id_labels.get(emp_id, emp_id)
+    
+    def order(self, sort_by='emp_id', descending=False):
+        """emp_ids sorted by a record field (ties by emp_id), computed once per field"""
+        key = (sort_by, descending)
+        ordered = self._orders.get(key)
+        if ordered is None:
+            ordered = self.sorted(self.emp_ids, sort_by, descending)
+            self._orders[key] = ordered
+        return ordered
+    
+    def sorted(self, emp_ids, sort_by='emp_id', descending=False):
+        """The given emp_ids sorted by a record field (ties by emp_id)"""
+        if sort_by == 'emp_id':
+            return sorted(emp_ids, reverse=descending)
+        records = self.records
+        return sorted(
+            emp_ids,
+            key=lambda emp_id: (str(records.get(emp_id, {}).get(sort_by) or '').lower(), emp_id),
+            reverse=descending
+        )
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+def get_participant_registry(storage):
+    """Get the process-wide registry for storage's current participants"""
+    key = storage.participants_cache_key()
+    signature = storage.participants_signature()
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None or registry.signature != signature:
+            registry = ParticipantRegistry(storage.load_participants(), signature)
+            _registries[key] = registry
+        return registry
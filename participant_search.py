@@ -0,0 +1,152 @@
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+
+# Sorts after any character that appears in a token, to bound a prefix range
+PREFIX_END = '\U0010ffff'
+
+# Unicode words, so accented and non-Latin names are searchable
+WORD = re.compile(r'\w+')
+
+def normalize(text):
+    """Case-folded text with accents removed ("José" -> "jose")"""
+    decomposed = unicodedata.normalize('NFKD', str(text or '').casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+def query_words(query):
+    """Normalized words of a search query"""
+    return WORD.findall(normalize(query))
+
+def search_tokens(emp_id, name, email):
+    """Normalized tokens a participant can be found by
+    
+    Each word of the name, the emp_id and its number (with and without
+    leading zeros, so EMP000123 is found by "123"), and the email: the
+    full address, the local part and domain, and their words.
+    """
+    tokens = set(WORD.findall(normalize(name)))
+    emp_id_lower = normalize(emp_id)
+    tokens.add(emp_id_lower)
+    for digits in re.findall(r'\d+', emp_id_lower):
+        tokens.add(digits)
+        tokens.add(digits.lstrip('0') or '0')
+    email = normalize(email).strip()
+    if email:
+        tokens.add(email)
+        tokens.update(part for part in email.split('@') if part)
+        tokens.update(WORD.findall(email))
+    return tokens
+
+class ParticipantSearchIndex:
+    """Prefix search over participant names, emp_ids and emails
+    
+    Every token is kept in one sorted list of (token, emp_id), a flattened
+    prefix trie: the participants whose tokens start with a prefix form a
+    contiguous range found by binary search. A query matches a participant
+    when every word of the query is a prefix of one of its tokens, so
+    "jo do" finds John Doe. Register and delete update the list in place.
+    """
+    
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = []
+        self._records = {}
+        self.signature = None
+    
+    def __len__(self):
+        return len(self._records)
+    
+    def build(self, participants):
+        """Rebuild from {emp_id: participant record}"""
+        with self._lock:
+            self._records = {}
+            entries = []
+            for emp_id, record in participants.items():
+                tokens = search_tokens(emp_id, record.get('name'), record.get('email'))
+                self._records[emp_id] = (tokens, self._packed(tokens))
+                entries.extend((token, emp_id) for token in tokens)
+            entries.sort()
+            self._entries = entries
+    
+    def add(self, emp_id, record, signature=None):
+        """Index (or re-index) one participant"""
+        with self._lock:
+            self._discard(emp_id)
+            tokens = search_tokens(emp_id, record.get('name'), record.get('email'))
+            self._records[emp_id] = (tokens, self._packed(tokens))
+            for token in tokens:
+                insort(self._entries, (token, emp_id))
+            if signature is not None:
+                self.signature = signature
+    
+    def remove(self, emp_id, signature=None):
+        """Drop one participant from the index"""
+        with self._lock:
+            self._discard(emp_id)
+            if signature is not None:
+                self.signature = signature
+    
+    def _discard(self, emp_id):
+        existing = self._records.pop(emp_id, None)
+        if existing is None:
+            return
+        for token in existing[0]:
+            position = bisect_left(self._entries, (token, emp_id))
+            if position < len(self._entries) and self._entries[position] == (token, emp_id):
+                del self._entries[position]
+    
+    @staticmethod
+    def _packed(tokens):
+        # Each token preceded by a separator, so "<sep>word" in packed is a prefix test
+        return ''.join('\0' + token for token in tokens)
+    
+    def _range(self, prefix):
+        return bisect_left(self._entries, (prefix,)), bisect_left(self._entries, (prefix + PREFIX_END,))
+    
+    def search(self, query, limit=20):
+        """emp_ids matching query, best first; limit=None returns every match
+        
+        Exact token matches come before longer tokens with the same prefix.
+        Only the entries under the narrowest query word are visited, and
+        the scan stops once limit matches are found.
+        """
+        words = query_words(query)
+        if not words:
+            return []
+        with self._lock:
+            ranges = [(self._range(word), word) for word in words]
+            (start, end), narrowest = min(ranges, key=lambda item: item[0][1] - item[0][0])
+            others = ['\0' + word for word in words if word != narrowest]
+            matches = {}
+            seen = set()
+            for position in range(start, end):
+                emp_id = self._entries[position][1]
+                if emp_id in seen:
+                    continue
+                seen.add(emp_id)
+                packed = self._records[emp_id][1]
+                if all(word in packed for word in others):
+                    matches[emp_id] = None
+                    if limit is not None and len(matches) >= limit:
+                        break
+            return list(matches)
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_participant_search(storage):
+    """Get the process-wide search index for storage, rebuilding it if participants changed"""
+    key = storage.participants_cache_key()
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = ParticipantSearchIndex()
+            _indexes[key] = index
+    
+    signature = storage.participants_signature()
+    with index._lock:
+        if index.signature != signature:
+            index.build(storage.load_participants())
+            index.signature = signature
+    return index
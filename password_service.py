@@ -0,0 +1,57 @@
+import bcrypt
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# bcrypt cost factor; each +1 doubles the time per hash
+DEFAULT_ROUNDS = int(os.getenv("EVENT_TRACKER_BCRYPT_ROUNDS", "12"))
+
+class PasswordService:
+    """bcrypt hashing on a shared worker pool
+    
+    bcrypt releases the GIL while hashing, so a thread pool hashes in
+    parallel across cores without the start-up and pickling cost of a
+    process pool. Batch calls hash each distinct password once and share
+    the hash between the accounts that use it.
+    """
+    
+    def __init__(self, rounds=DEFAULT_ROUNDS, max_workers=None):
+        self.rounds = rounds
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+    
+    def _hash(self, password):
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(self.rounds)).decode('utf-8')
+    
+    def hash_password(self, password):
+        """Hash one password"""
+        return self._hash(password)
+    
+    def submit_hash(self, password):
+        """Start hashing in the background; returns a Future for the hash"""
+        return self._executor.submit(self._hash, password)
+    
+    def hash_passwords(self, passwords):
+        """Hash a list of passwords in parallel; returns hashes in the same order"""
+        futures = {password: self.submit_hash(password) for password in set(passwords)}
+        return [futures[password].result() for password in passwords]
+    
+    def check_password(self, password, hashed_password):
+        """Whether password matches a stored hash"""
+        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+    
+    def check_passwords(self, pairs):
+        """Check [(password, hashed_password)] in parallel; returns booleans in order"""
+        futures = [self._executor.submit(self.check_password, password, hashed) for password, hashed in pairs]
+        return [future.result() for future in futures]
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_password_service():
+    """Get the process-wide password service (cost from EVENT_TRACKER_BCRYPT_ROUNDS)"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = PasswordService()
+        return _service
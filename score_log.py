@@ -0,0 +1,443 @@
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from file_lock import atomic_write_json, file_lock
+from snapshot_cache import file_signature
+
+SEGMENT_PATTERN = re.compile(r'^segment-(\d+)\.jsonl$')
+
+# Index name -> entry field it is keyed on
+INDEX_FIELDS = {
+    'game': 'game_number',
+    'operator': 'operator',
+    'emp_id': 'participant_emp_id'
+}
+
+# Persist the active segment's index after this many newly indexed entries
+INDEX_SAVE_EVERY = 500
+
+# Bytes read per step when reading a segment backwards
+TAIL_BLOCK_SIZE = 64 * 1024
+
+def segment_name(number):
+    """File name for a log segment"""
+    return f"segment-{number:06d}.jsonl"
+
+def segment_number(path):
+    """Sequence number of a segment path"""
+    return int(SEGMENT_PATTERN.match(os.path.basename(path)).group(1))
+
+def list_segments(log_dir):
+    """List segment paths in log_dir, oldest first"""
+    if not os.path.isdir(log_dir):
+        return []
+    numbered = []
+    for name in os.listdir(log_dir):
+        match = SEGMENT_PATTERN.match(name)
+        if match:
+            numbered.append((int(match.group(1)), os.path.join(log_dir, name)))
+    return [path for _, path in sorted(numbered)]
+
+def index_path(segment_path):
+    """Path of the persisted index for a segment"""
+    return segment_path[:-len('.jsonl')] + '.idx.json'
+
+def load_legacy_entries(legacy_file):
+    """Load entries from the legacy single-document game_scoring_log.json"""
+    if not legacy_file or not os.path.exists(legacy_file):
+        return []
+    with open(legacy_file, 'r') as f:
+        log_data = json.load(f)
+    return log_data.get("entries", [])
+
+class ScoreLogWriter:
+    """Append-only JSONL writer with fsync batching and segment rotation
+    
+    Each entry is written and flushed as one line, so it survives a process
+    crash. fsync is batched: it runs once `fsync_batch_size` entries are
+    pending, on the next append after `fsync_interval` seconds, or from a
+    timer `fsync_interval` seconds after the last unsynced append, so an OS
+    crash can lose at most that window. Process-wide writers are closed
+    (and fsynced) at exit. Call flush() to force durability.
+    
+    Lock order is the log directory lock (file_lock, re-entrant per thread)
+    before the writer's own lock, so callers may already hold the former.
+    """
+    
+    def __init__(self, log_dir, fsync_batch_size=16, fsync_interval=1.0,
+                 segment_max_bytes=4 * 1024 * 1024, segment_max_age=3600):
+        self.log_dir = log_dir
+        self.fsync_batch_size = fsync_batch_size
+        self.fsync_interval = fsync_interval
+        self.segment_max_bytes = segment_max_bytes
+        self.segment_max_age = segment_max_age
+        self._lock = threading.Lock()
+        self._file = None
+        self._segment_number = 0
+        self._segment_opened = 0.0
+        self._pending = 0
+        self._last_fsync = time.monotonic()
+        self._fsync_timer = None
+        os.makedirs(log_dir, exist_ok=True)
+        
+        segments = list_segments(log_dir)
+        if segments:
+            self._segment_number = segment_number(segments[-1])
+        else:
+            self._segment_number = 1
+    
+    @property
+    def current_segment(self):
+        """Path of the segment currently being written"""
+        return os.path.join(self.log_dir, segment_name(self._segment_number))
+    
+    def _open_segment(self):
+        self._repair_tail(self.current_segment)
+        self._file = open(self.current_segment, 'a', encoding='utf-8')
+        self._segment_opened = time.monotonic()
+    
+    @staticmethod
+    def _repair_tail(path):
+        """Cut a torn final line left by a crash, so the next entry starts on a fresh line"""
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb+') as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b'\n':
+                return
+            position = size
+            while position > 0:
+                step = min(TAIL_BLOCK_SIZE, position)
+                position -= step
+                f.seek(position)
+                newline = f.read(step).rfind(b'\n')
+                if newline != -1:
+                    f.truncate(position + newline + 1)
+                    return
+            f.truncate(0)
+    
+    def _should_rotate(self):
+        if self._file.tell() >= self.segment_max_bytes:
+            return True
+        return time.monotonic() - self._segment_opened >= self.segment_max_age and self._file.tell() > 0
+    
+    def _fsync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_fsync = time.monotonic()
+    
+    def rotate(self):
+        """Close the current segment and start a new one"""
+        with file_lock(self.log_dir), self._lock:
+            self._rotate()
+    
+    def _rotate(self):
+        if self._file is not None:
+            self._fsync()
+            self._file.close()
+            self._file = None
+        # Another process may already have moved on to a newer segment
+        segments = list_segments(self.log_dir)
+        latest = segment_number(segments[-1]) if segments else 0
+        self._segment_number = max(self._segment_number, latest) + 1
+    
+    def _follow_latest(self):
+        """Move to the newest segment if another process rotated past ours
+        
+        Called under the log directory lock before every append, so entries
+        only ever go to the newest segment and readers that resume from a
+        position never miss one written to an older segment.
+        """
+        if not os.path.exists(os.path.join(self.log_dir, segment_name(self._segment_number + 1))):
+            return
+        segments = list_segments(self.log_dir)
+        if self._file is not None:
+            self._fsync()
+            self._file.close()
+            self._file = None
+        self._segment_number = max(self._segment_number, segment_number(segments[-1]))
+    
+    def append(self, entry):
+        """Append one entry as a JSON line"""
+        self.append_many([entry])
+    
+    def append_many(self, entries):
+        """Append several entries in one write, under one lock"""
+        if not entries:
+            return
+        lines = ''.join(json.dumps(entry, separators=(',', ':')) + '\n' for entry in entries)
+        with file_lock(self.log_dir), self._lock:
+            self._follow_latest()
+            if self._file is None:
+                self._open_segment()
+            elif self._should_rotate():
+                self._rotate()
+                self._open_segment()
+            
+            self._file.write(lines)
+            self._file.flush()
+            self._pending += len(entries)
+            
+            if (self._pending >= self.fsync_batch_size or
+                    time.monotonic() - self._last_fsync >= self.fsync_interval):
+                self._fsync()
+            elif self._fsync_timer is None:
+                # Sync these entries even if no further append comes
+                self._fsync_timer = threading.Timer(self.fsync_interval, self._timed_flush)
+                self._fsync_timer.daemon = True
+                self._fsync_timer.start()
+    
+    def _timed_flush(self):
+        with self._lock:
+            self._fsync_timer = None
+            if self._file is not None and self._pending:
+                self._fsync()
+    
+    def flush(self):
+        """fsync any pending entries"""
+        with self._lock:
+            if self._file is not None and self._pending:
+                self._fsync()
+    
+    def close(self):
+        """fsync and close the current segment"""
+        with self._lock:
+            if self._fsync_timer is not None:
+                self._fsync_timer.cancel()
+                self._fsync_timer = None
+            if self._file is not None:
+                self._fsync()
+                self._file.close()
+                self._file = None
+
+class ScoreLogReader:
+    """Streams entries from the legacy log file and the JSONL segments"""
+    
+    def __init__(self, log_dir, legacy_file=None):
+        self.log_dir = log_dir
+        self.legacy_file = legacy_file
+    
+    def iter_segment(self, path):
+        """Stream entries from one segment, skipping a torn final line"""
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    break
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+    
+    def iter_entries(self):
+        """Stream all entries in write order, legacy entries first"""
+        yield from load_legacy_entries(self.legacy_file)
+        for path in list_segments(self.log_dir):
+            yield from self.iter_segment(path)
+
+def read_entry(f, offset):
+    """Entry on the line starting at offset of an open segment (binary mode)"""
+    f.seek(offset)
+    return json.loads(f.readline())
+
+def tail_entries(path, count):
+    """Up to count entries from the end of a segment, newest first
+    
+    Reads the file backwards in blocks, so the cost depends on count and
+    not on the segment size. A torn final line is skipped.
+    """
+    if count <= 0:
+        return []
+    with open(path, 'rb') as f:
+        position = f.seek(0, os.SEEK_END)
+        buffer = b''
+        lines = []
+        while position > 0:
+            step = min(TAIL_BLOCK_SIZE, position)
+            position -= step
+            f.seek(position)
+            buffer = f.read(step) + buffer
+            lines = buffer.split(b'\n')
+            # lines[0] may be cut off mid-line unless we reached the file start
+            if len(lines) - 2 >= count:
+                break
+        complete = lines[:-1] if position == 0 else lines[1:-1]
+    entries = []
+    for line in reversed(complete):
+        if line.strip():
+            entries.append(json.loads(line))
+            if len(entries) >= count:
+                break
+    return entries
+
+class ScoreLogIndex:
+    """Secondary indexes over the scoring log: game, operator and emp_id -> entries
+    
+    Each segment has a sidecar index (segment-NNNNNN.idx.json) mapping
+    each key to the byte offsets of its entries, plus the number of bytes
+    it covers. A query first indexes whatever was appended since (only the
+    new tail is parsed), then reads just the matching lines, newest first.
+    Sealed segments' indexes are saved once; the active segment's every
+    INDEX_SAVE_EVERY entries, so a restart re-parses at most that many
+    lines. Legacy entries are indexed in memory by position.
+    
+    Entries come back in write order, newest first. Entries are appended
+    as they are logged, so this matches timestamp order.
+    """
+    
+    def __init__(self, log_dir, legacy_file=None):
+        self.log_dir = log_dir
+        self.legacy_file = legacy_file
+        self._lock = threading.Lock()
+        self._segments = {}
+        self._legacy_signature = None
+        self._legacy_entries = []
+        self._legacy_postings = {name: {} for name in INDEX_FIELDS}
+    
+    @staticmethod
+    def _empty_state():
+        return {'size': 0, 'count': 0, 'saved_count': 0, 'postings': {name: {} for name in INDEX_FIELDS}}
+    
+    def _load_state(self, path):
+        try:
+            with open(index_path(path), 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self._empty_state()
+        if set(data.get('postings', {})) != set(INDEX_FIELDS) or data.get('size', 0) > os.path.getsize(path):
+            # Written for a different or replaced segment
+            return self._empty_state()
+        data['saved_count'] = data['count']
+        return data
+    
+    def _save_state(self, path, state):
+        atomic_write_json(index_path(path), {
+            'size': state['size'],
+            'count': state['count'],
+            'postings': state['postings']
+        }, indent=None)
+        state['saved_count'] = state['count']
+    
+    def _index_tail(self, path, state):
+        """Index complete lines appended to path since state['size']"""
+        with open(path, 'rb') as f:
+            f.seek(state['size'])
+            data = f.read()
+        offset = state['size']
+        postings = state['postings']
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].split(b'\n')[:-1]:
+            if line.strip():
+                entry = json.loads(line)
+                for name, field in INDEX_FIELDS.items():
+                    postings[name].setdefault(str(entry.get(field)), []).append(offset)
+                state['count'] += 1
+            offset += len(line) + 1
+        state['size'] = offset
+    
+    def _refresh_legacy(self):
+        signature = file_signature(self.legacy_file) if self.legacy_file else None
+        if signature == self._legacy_signature:
+            return
+        self._legacy_entries = load_legacy_entries(self.legacy_file)
+        self._legacy_postings = {name: {} for name in INDEX_FIELDS}
+        for position, entry in enumerate(self._legacy_entries):
+            for name, field in INDEX_FIELDS.items():
+                self._legacy_postings[name].setdefault(str(entry.get(field)), []).append(position)
+        self._legacy_signature = signature
+    
+    def refresh(self):
+        """Bring every segment's index up to date; returns segment paths, oldest first"""
+        segments = list_segments(self.log_dir)
+        for number, path in enumerate(segments):
+            state = self._segments.get(path)
+            if state is None:
+                state = self._segments[path] = self._load_state(path)
+            size = os.path.getsize(path)
+            if size < state['size']:
+                state = self._segments[path] = self._empty_state()
+            if size > state['size']:
+                self._index_tail(path, state)
+            sealed = number < len(segments) - 1
+            unsaved = state['count'] - state['saved_count']
+            if unsaved and (sealed or unsaved >= INDEX_SAVE_EVERY):
+                self._save_state(path, state)
+        for path in set(self._segments) - set(segments):
+            del self._segments[path]
+        self._refresh_legacy()
+        return segments
+    
+    def lookup(self, name, value, limit=None):
+        """Entries whose INDEX_FIELDS[name] equals value, newest first"""
+        key = str(value)
+        with self._lock:
+            segments = self.refresh()
+            entries = []
+            for path in reversed(segments):
+                offsets = self._segments[path]['postings'][name].get(key, [])
+                if not offsets:
+                    continue
+                with open(path, 'rb') as f:
+                    for offset in reversed(offsets):
+                        if limit is not None and len(entries) >= limit:
+                            return entries
+                        entries.append(read_entry(f, offset))
+            for position in reversed(self._legacy_postings[name].get(key, [])):
+                if limit is not None and len(entries) >= limit:
+                    break
+                entries.append(self._legacy_entries[position])
+            return entries
+    
+    def count(self, name, value):
+        """Number of entries whose INDEX_FIELDS[name] equals value"""
+        key = str(value)
+        with self._lock:
+            segments = self.refresh()
+            total = sum(len(self._segments[path]['postings'][name].get(key, [])) for path in segments)
+            return total + len(self._legacy_postings[name].get(key, []))
+    
+    def recent(self, limit=50):
+        """The last limit entries written, newest first, read from the segment tails"""
+        entries = []
+        for path in reversed(list_segments(self.log_dir)):
+            if len(entries) >= limit:
+                return entries
+            entries.extend(tail_entries(path, limit - len(entries)))
+        if len(entries) < limit:
+            with self._lock:
+                self._refresh_legacy()
+                legacy = self._legacy_entries
+            entries.extend(reversed(legacy[max(0, len(legacy) - (limit - len(entries))):]))
+        return entries
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_log_index(log_dir, legacy_file=None):
+    """Get the process-wide index for log_dir"""
+    key = (os.path.abspath(log_dir), os.path.abspath(legacy_file) if legacy_file else None)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = ScoreLogIndex(log_dir, legacy_file)
+            _indexes[key] = index
+        return index
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+def get_log_writer(log_dir, **kwargs):
+    """Get the process-wide writer for log_dir"""
+    key = os.path.abspath(log_dir)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = ScoreLogWriter(log_dir, **kwargs)
+            _writers[key] = writer
+            atexit.register(writer.close)
+        return writer
@@ -0,0 +1,114 @@
+import re
+
+GAME_KEY = re.compile(r'^game\d+$')
+
+# (gift tier, minimum total), highest first; below every minimum is Participation
+GIFT_THRESHOLDS = (('Gold', 40), ('Silver', 30))
+
+def gift_type_for_total(total_score):
+    """Gift tier for a total score"""
+    for gift_type, minimum in GIFT_THRESHOLDS:
+        if total_score >= minimum:
+            return gift_type
+    return "Participation"
+
+class ScoreAggregate:
+    """Running statistics over score records, updated in O(1) per write
+    
+    Keeps count and sum of totals, a histogram of totals (so max/min
+    survive deletes without a rescan), per-gift-tier counts and per-game
+    sums and non-zero entry counts.
+    """
+    
+    def __init__(self, data=None):
+        data = data or {}
+        self.count = data.get('count', 0)
+        self.total_sum = data.get('total_sum', 0)
+        self.total_histogram = {int(k): v for k, v in data.get('total_histogram', {}).items()}
+        self.gift_counts = dict(data.get('gift_counts', {}))
+        self.game_sums = dict(data.get('game_sums', {}))
+        self.game_counts = dict(data.get('game_counts', {}))
+    
+    @classmethod
+    def from_scores(cls, scores):
+        """Recompute from scratch over {emp_id: score record}"""
+        aggregate = cls()
+        for record in scores.values():
+            aggregate.apply(None, record)
+        return aggregate
+    
+    def _add(self, record, sign):
+        total = int(record.get('total', 0))
+        self.count += sign
+        self.total_sum += sign * total
+        
+        self.total_histogram[total] = self.total_histogram.get(total, 0) + sign
+        if self.total_histogram[total] == 0:
+            del self.total_histogram[total]
+        
+        gift_type = record.get('gift_type')
+        if gift_type:
+            self.gift_counts[gift_type] = self.gift_counts.get(gift_type, 0) + sign
+        
+        for key, value in record.items():
+            if GAME_KEY.match(key):
+                self.game_sums[key] = self.game_sums.get(key, 0) + sign * value
+                if value > 0:
+                    self.game_counts[key] = self.game_counts.get(key, 0) + sign
+    
+    def apply(self, old_record, new_record):
+        """Apply one write: old_record replaced by new_record (either may be None)"""
+        if old_record:
+            self._add(old_record, -1)
+        if new_record:
+            self._add(new_record, 1)
+    
+    @property
+    def max_total(self):
+        return max(self.total_histogram) if self.total_histogram else 0
+    
+    @property
+    def min_total(self):
+        return min(self.total_histogram) if self.total_histogram else 0
+    
+    @property
+    def average_total(self):
+        return round(self.total_sum / self.count, 2) if self.count else 0
+    
+    def statistics(self, total_participants):
+        """Statistics in the shape returned by Database.get_statistics"""
+        return {
+            'total_participants': total_participants,
+            'total_scored': self.count,
+            'average_score': self.average_total,
+            'highest_score': self.max_total,
+            'gold_winners': self.gift_counts.get('Gold', 0),
+            'silver_winners': self.gift_counts.get('Silver', 0),
+            'participation_gifts': self.gift_counts.get('Participation', 0)
+        }
+    
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total_sum': self.total_sum,
+            'total_histogram': {str(k): v for k, v in self.total_histogram.items()},
+            'gift_counts': self.gift_counts,
+            'game_sums': self.game_sums,
+            'game_counts': self.game_counts
+        }
+    
+    def verify(self, scores):
+        """Compare against a recompute from scratch; returns a list of differences"""
+        expected = ScoreAggregate.from_scores(scores).to_dict()
+        actual = self.to_dict()
+        differences = []
+        for key in expected:
+            if self._normalize(expected[key]) != self._normalize(actual[key]):
+                differences.append(f"{key}: stored {actual[key]}, recomputed {expected[key]}")
+        return differences
+    
+    @staticmethod
+    def _normalize(value):
+        if isinstance(value, dict):
+            return {k: v for k, v in value.items() if v != 0}
+        return value
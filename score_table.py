@@ -0,0 +1,238 @@
+import sys
+import threading
+import numpy as np
+import pandas as pd
+from score_stats import GAME_KEY
+
+# Smallest integer type first; a column widens when a value does not fit
+INT_LADDER = (np.int8, np.int16, np.int32, np.int64)
+
+# Starting integer type per numeric column
+INT_COLUMNS = {'total': np.int16, 'version': np.int32}
+
+GIFT_TYPES = ['Gold', 'Silver', 'Participation']
+
+# Identifier and contact strings are interned so each distinct value is stored once
+INTERNED_COLUMNS = ('emp_id', 'name', 'email')
+
+class ScoreTable:
+    """All score records as compact columns, updated in place on writes
+    
+    Game scores are int8 and totals int16 (widening if a value ever needs
+    more), gift_type is categorical and emp_id/name/email are interned
+    strings. Rows live in preallocated arrays indexed by emp_id, so a
+    write touches one row instead of rebuilding the table. frame() turns
+    the arrays into a DataFrame once per change and hands out shallow
+    copies of it; treat those as read-only.
+    """
+    
+    def __init__(self, capacity=256):
+        self._lock = threading.RLock()
+        self._capacity = capacity
+        self._rows = {}
+        self._emp_ids = np.empty(capacity, dtype=object)
+        self._columns = {}
+        self._categories = list(GIFT_TYPES)
+        self._frame = None
+        self.signature = None
+    
+    def __len__(self):
+        return len(self._rows)
+    
+    def _new_column(self, key, size, dtype=None):
+        if key == 'gift_type':
+            return np.full(size, -1, dtype=np.int8)
+        if dtype is None:
+            if GAME_KEY.match(key):
+                dtype = np.int8
+            else:
+                dtype = INT_COLUMNS.get(key, object)
+        if np.dtype(dtype).kind == 'O':
+            return np.full(size, None, dtype=object)
+        return np.zeros(size, dtype=dtype)
+    
+    def _grow(self, needed):
+        capacity = self._capacity
+        while needed > capacity:
+            capacity *= 2
+        emp_ids = np.empty(capacity, dtype=object)
+        emp_ids[:self._capacity] = self._emp_ids
+        self._emp_ids = emp_ids
+        for key, array in self._columns.items():
+            grown = self._new_column(key, capacity, array.dtype)
+            grown[:self._capacity] = array
+            self._columns[key] = grown
+        self._capacity = capacity
+    
+    def _fit(self, key, value):
+        """Widen column key if value does not fit its dtype"""
+        array = self._columns[key]
+        if array.dtype.kind != 'i':
+            return
+        if not isinstance(value, (int, np.integer)) or isinstance(value, bool):
+            self._columns[key] = array.astype(np.float64)
+            return
+        if np.iinfo(array.dtype).min <= value <= np.iinfo(array.dtype).max:
+            return
+        for dtype in INT_LADDER:
+            if np.iinfo(dtype).min <= value <= np.iinfo(dtype).max and np.dtype(dtype).itemsize > array.dtype.itemsize:
+                self._columns[key] = array.astype(dtype)
+                return
+        self._columns[key] = array.astype(np.float64)
+    
+    def _set_row(self, row, emp_id, record):
+        self._emp_ids[row] = sys.intern(emp_id)
+        for key in self._columns:
+            if key not in record:
+                self._clear_cell(key, row)
+        for key, value in record.items():
+            if key == 'emp_id':
+                continue
+            if key not in self._columns:
+                self._columns[key] = self._new_column(key, self._capacity)
+            if key == 'gift_type' and value is not None:
+                if value not in self._categories:
+                    self._categories.append(value)
+                self._columns[key][row] = self._categories.index(value)
+                continue
+            if value is None:
+                self._clear_cell(key, row)
+                continue
+            self._fit(key, value)
+            if key in INTERNED_COLUMNS and isinstance(value, str):
+                value = sys.intern(value)
+            self._columns[key][row] = value
+    
+    def _clear_cell(self, key, row):
+        array = self._columns[key]
+        if key == 'gift_type':
+            array[row] = -1
+        elif array.dtype.kind == 'O':
+            array[row] = None
+        else:
+            array[row] = 0
+    
+    def _column_from_values(self, key, values):
+        """Build one full-capacity column from a list of values, column-wise"""
+        column = self._new_column(key, self._capacity)
+        count = len(values)
+        if key == 'gift_type':
+            for value in dict.fromkeys(values):
+                if value is not None and value not in self._categories:
+                    self._categories.append(value)
+            codes = {category: code for code, category in enumerate(self._categories)}
+            column[:count] = [codes.get(value, -1) for value in values]
+            return column
+        if column.dtype.kind == 'O':
+            if key in INTERNED_COLUMNS:
+                values = [sys.intern(value) if isinstance(value, str) else value for value in values]
+            column[:count] = values
+            return column
+        values = [0 if value is None else value for value in values]
+        if all(isinstance(value, (int, np.integer)) for value in values):
+            array = np.asarray(values, dtype=np.int64)
+        else:
+            array = np.asarray(values, dtype=np.float64)
+        if array.dtype.kind == 'i' and count:
+            low, high = array.min(), array.max()
+            for dtype in INT_LADDER:
+                if np.dtype(dtype).itemsize >= column.dtype.itemsize and np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+                    break
+        else:
+            dtype = array.dtype if count else column.dtype
+        column = column.astype(dtype)
+        column[:count] = array
+        return column
+    
+    def build(self, scores):
+        """Rebuild from {emp_id: score record}, one column at a time"""
+        with self._lock:
+            records = list(scores.values())
+            self._capacity = max(self._capacity, len(records))
+            self._categories = list(GIFT_TYPES)
+            self._rows = {emp_id: row for row, emp_id in enumerate(scores)}
+            self._emp_ids = np.empty(self._capacity, dtype=object)
+            self._emp_ids[:len(records)] = [sys.intern(emp_id) for emp_id in scores]
+            keys = {}
+            for record in records:
+                keys.update(dict.fromkeys(record))
+            keys.pop('emp_id', None)
+            self._columns = {
+                key: self._column_from_values(key, [record.get(key) for record in records])
+                for key in keys
+            }
+            self._frame = None
+    
+    def _insert(self, emp_id, record):
+        row = len(self._rows)
+        if row >= self._capacity:
+            self._grow(row + 1)
+        self._rows[emp_id] = row
+        self._set_row(row, emp_id, record)
+    
+    def update(self, emp_id, record, signature=None):
+        """Set the record for emp_id, optionally recording the store signature it matches"""
+        with self._lock:
+            row = self._rows.get(emp_id)
+            if row is None:
+                self._insert(emp_id, record)
+            else:
+                self._set_row(row, emp_id, record)
+            self._frame = None
+            if signature is not None:
+                self.signature = signature
+    
+    def remove(self, emp_id, signature=None):
+        """Remove emp_id, moving the last row into its slot"""
+        with self._lock:
+            row = self._rows.pop(emp_id, None)
+            if row is not None:
+                last = len(self._rows)
+                if row != last:
+                    moved = self._emp_ids[last]
+                    self._emp_ids[row] = moved
+                    for array in self._columns.values():
+                        array[row] = array[last]
+                    self._rows[moved] = row
+                self._emp_ids[last] = None
+                for key in self._columns:
+                    self._clear_cell(key, last)
+            self._frame = None
+            if signature is not None:
+                self.signature = signature
+    
+    def frame(self):
+        """The table as a DataFrame (columns as stored, then emp_id); do not modify it"""
+        with self._lock:
+            if self._frame is None:
+                count = len(self._rows)
+                data = {}
+                for key, array in self._columns.items():
+                    if key == 'gift_type':
+                        data[key] = pd.Categorical.from_codes(
+                            array[:count], self._categories
+                        ).remove_unused_categories()
+                    else:
+                        data[key] = array[:count].copy()
+                data['emp_id'] = self._emp_ids[:count].copy()
+                self._frame = pd.DataFrame(data)
+            return self._frame.copy(deep=False)
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+def get_score_table(storage):
+    """Get the process-wide score table for storage, rebuilding it if scores changed"""
+    key = storage.scores_cache_key()
+    with _tables_lock:
+        table = _tables.get(key)
+        if table is None:
+            table = ScoreTable()
+            _tables[key] = table
+    
+    signature = storage.scores_signature()
+    with table._lock:
+        if table.signature != signature:
+            table.build(storage.load_scores())
+            table.signature = signature
+    return table
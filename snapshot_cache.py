@@ -0,0 +1,80 @@
+import os
+import threading
+
+def file_signature(*paths):
+    """(mtime_ns, size, inode) for each path, None for missing files"""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size, stat.st_ino))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+class SnapshotCache:
+    """Process-wide cache of parsed data snapshots keyed by file path
+    
+    An entry is reused while its file signature (mtime/size/inode) and the
+    key's version counter are unchanged. Writers bump the version so a
+    rewrite that keeps the same mtime and size is still seen. Snapshots
+    are shared between callers and must be treated as read-only.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._versions = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def version(self, key):
+        """Current write version for key"""
+        with self._lock:
+            return self._versions.get(key, 0)
+    
+    def bump(self, key):
+        """Mark key as written, invalidating its snapshot"""
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            self._entries.pop(key, None)
+            return self._versions[key]
+    
+    def get(self, key, signature, loader):
+        """Return the snapshot for key, calling loader() on a miss"""
+        with self._lock:
+            version = self._versions.get(key, 0)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == (signature, version):
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        
+        data = loader()
+        
+        with self._lock:
+            # Only store if no writer bumped the version while loading
+            if self._versions.get(key, 0) == version:
+                self._entries[key] = ((signature, version), data)
+        return data
+    
+    def invalidate(self, key=None):
+        """Drop one snapshot, or all of them"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+    
+    def stats(self):
+        """Hit/miss counters"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total * 100, 1) if total else 0.0,
+                'entries': len(self._entries)
+            }
+
+snapshot_cache = SnapshotCache()
@@ -0,0 +1,515 @@
+import json
+import os
+import sqlite3
+import threading
+from errors import EventTrackerError
+from file_lock import atomic_write_json, file_lock
+from snapshot_cache import file_signature, snapshot_cache
+
+PARTICIPANT_UPSERT = (
+    "INSERT INTO participants (emp_id, name, data) VALUES (?, ?, ?) "
+    "ON CONFLICT(emp_id) DO UPDATE SET name = excluded.name, data = excluded.data"
+)
+
+SCORE_UPSERT = (
+    "INSERT INTO scores (emp_id, total, gift_type, data) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(emp_id) DO UPDATE SET total = excluded.total, "
+    "gift_type = excluded.gift_type, data = excluded.data"
+)
+
+class VersionConflict(EventTrackerError):
+    """A versioned write found the record changed since it was read"""
+
+def record_version(record):
+    """Version of a stored record (0 if missing or written before versioning)"""
+    return record.get('version', 0) if record else 0
+
+class StorageBackend:
+    """Base class for participant and score storage backends"""
+    
+    def load_participants(self):
+        """Load all participants as {emp_id: record}"""
+        raise NotImplementedError
+    
+    def save_participants(self, participants):
+        """Replace all participants"""
+        raise NotImplementedError
+    
+    def get_participant(self, emp_id):
+        """Get a single participant record or None"""
+        raise NotImplementedError
+    
+    def upsert_participant(self, emp_id, record):
+        """Insert or replace a single participant record"""
+        raise NotImplementedError
+    
+    def delete_participant(self, emp_id):
+        """Delete a single participant record"""
+        raise NotImplementedError
+    
+    def load_scores(self):
+        """Load all scores as {emp_id: record}"""
+        raise NotImplementedError
+    
+    def save_scores(self, scores):
+        """Replace all scores"""
+        raise NotImplementedError
+    
+    def get_score(self, emp_id):
+        """Get a single score record or None"""
+        raise NotImplementedError
+    
+    def upsert_score(self, emp_id, record, expected_version=None):
+        """Insert or replace a single score record, returning the old record
+        
+        If expected_version is given, raise VersionConflict unless the stored
+        record is still at that version (0 = no record).
+        """
+        raise NotImplementedError
+    
+    def upsert_scores(self, records):
+        """Insert or replace several score records in one write
+        
+        Returns {emp_id: old record}. Callers hold write_lock() across the
+        read that built the records.
+        """
+        raise NotImplementedError
+    
+    def delete_score(self, emp_id):
+        """Delete a single score record"""
+        raise NotImplementedError
+    
+    def iter_participants(self, chunk_size=1000):
+        """Yield (emp_id, record) for every participant without building a copy"""
+        yield from self.load_participants().items()
+    
+    def iter_scores(self, chunk_size=1000):
+        """Yield (emp_id, record) for every score record without building a copy"""
+        yield from self.load_scores().items()
+    
+    def write_lock(self):
+        """Cross-process lock for read-modify-write sequences (re-entrant)"""
+        raise NotImplementedError
+    
+    def scores_cache_key(self):
+        """Snapshot cache key for the scores store"""
+        raise NotImplementedError
+    
+    def participants_cache_key(self):
+        """Snapshot cache key for the participants store"""
+        raise NotImplementedError
+    
+    def participants_signature(self):
+        """Value that changes whenever the participants store is written"""
+        raise NotImplementedError
+    
+    def scores_signature(self):
+        """Value that changes whenever the scores store is written"""
+        raise NotImplementedError
+    
+    def load_aggregate(self):
+        """Load the stored score aggregate, or None if missing or stale"""
+        raise NotImplementedError
+    
+    def save_aggregate(self, aggregate):
+        """Store the score aggregate for the current scores"""
+        raise NotImplementedError
+
+class JSONStorage(StorageBackend):
+    """Whole-file JSON storage (participants.json / scores.json)"""
+    
+    def __init__(self, participants_file='participants.json', scores_file='scores.json'):
+        self.participants_file = participants_file
+        self.scores_file = scores_file
+        self.aggregate_file = os.path.splitext(scores_file)[0] + '_aggregate.json'
+        self.ensure_files_exist()
+    
+    def ensure_files_exist(self):
+        """Ensure JSON files exist"""
+        for path in (self.participants_file, self.scores_file):
+            if not os.path.exists(path):
+                with open(path, 'w') as f:
+                    json.dump({}, f)
+    
+    def _read(self, path, fresh=False):
+        """Read a file through the shared snapshot cache"""
+        key = os.path.abspath(path)
+        if fresh:
+            snapshot_cache.invalidate(key)
+        def loader():
+            with open(path, 'r') as f:
+                return json.load(f)
+        return snapshot_cache.get(key, file_signature(path), loader)
+    
+    def _write(self, path, data):
+        with self.write_lock():
+            atomic_write_json(path, data)
+        snapshot_cache.bump(os.path.abspath(path))
+    
+    def write_lock(self):
+        return file_lock(self.scores_file)
+    
+    def load_participants(self):
+        return self._read(self.participants_file)
+    
+    def save_participants(self, participants):
+        self._write(self.participants_file, participants)
+    
+    def get_participant(self, emp_id):
+        return self.load_participants().get(emp_id)
+    
+    def upsert_participant(self, emp_id, record):
+        with self.write_lock():
+            # Copy the shared snapshot before modifying it
+            participants = dict(self._read(self.participants_file, fresh=True))
+            participants[emp_id] = record
+            self.save_participants(participants)
+    
+    def delete_participant(self, emp_id):
+        with self.write_lock():
+            participants = dict(self._read(self.participants_file, fresh=True))
+            if emp_id in participants:
+                del participants[emp_id]
+                self.save_participants(participants)
+    
+    def load_scores(self):
+        return self._read(self.scores_file)
+    
+    def save_scores(self, scores):
+        self._write(self.scores_file, scores)
+    
+    def get_score(self, emp_id):
+        return self.load_scores().get(emp_id)
+    
+    def upsert_score(self, emp_id, record, expected_version=None):
+        with self.write_lock():
+            scores = dict(self._read(self.scores_file, fresh=True))
+            old_record = scores.get(emp_id)
+            if expected_version is not None and record_version(old_record) != expected_version:
+                raise VersionConflict(f"Scores for {emp_id} changed (version {record_version(old_record)}, expected {expected_version})")
+            scores[emp_id] = record
+            self.save_scores(scores)
+            return old_record
+    
+    def upsert_scores(self, records):
+        with self.write_lock():
+            scores = dict(self._read(self.scores_file, fresh=True))
+            old_records = {emp_id: scores.get(emp_id) for emp_id in records}
+            scores.update(records)
+            self.save_scores(scores)
+            return old_records
+    
+    def delete_score(self, emp_id):
+        with self.write_lock():
+            scores = dict(self._read(self.scores_file, fresh=True))
+            if emp_id in scores:
+                del scores[emp_id]
+                self.save_scores(scores)
+    
+    def scores_cache_key(self):
+        return os.path.abspath(self.scores_file)
+    
+    def scores_signature(self):
+        key = self.scores_cache_key()
+        return (file_signature(self.scores_file), snapshot_cache.version(key))
+    
+    def participants_cache_key(self):
+        return os.path.abspath(self.participants_file)
+    
+    def participants_signature(self):
+        key = self.participants_cache_key()
+        return (file_signature(self.participants_file), snapshot_cache.version(key))
+    
+    def _stored_signature(self):
+        # Round-trip through JSON so it compares equal to the stored copy
+        return json.loads(json.dumps(file_signature(self.scores_file)))
+    
+    def load_aggregate(self):
+        if not os.path.exists(self.aggregate_file):
+            return None
+        stored = self._read(self.aggregate_file)
+        # Stale if scores.json was written after the aggregate
+        if stored.get('scores_signature') != self._stored_signature():
+            return None
+        return stored['aggregate']
+    
+    def save_aggregate(self, aggregate):
+        self._write(self.aggregate_file, {
+            'scores_signature': self._stored_signature(),
+            'aggregate': aggregate
+        })
+
+class SQLiteStorage(StorageBackend):
+    """SQLite storage in WAL mode with row-level upserts keyed on emp_id"""
+    
+    def __init__(self, db_file='event_tracker.db'):
+        self.db_file = db_file
+        self._local = threading.local()
+        self.ensure_schema()
+    
+    def _connect(self):
+        """Get the connection for the current thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+    
+    def ensure_schema(self):
+        """Create tables if they don't exist"""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS participants ("
+                "emp_id TEXT PRIMARY KEY, "
+                "name TEXT, "
+                "data TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scores ("
+                "emp_id TEXT PRIMARY KEY, "
+                "total INTEGER NOT NULL DEFAULT 0, "
+                "gift_type TEXT, "
+                "data TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_scores_total ON scores(total)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta ("
+                "key TEXT PRIMARY KEY, "
+                "value INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS aggregates ("
+                "name TEXT PRIMARY KEY, "
+                "scores_version INTEGER NOT NULL, "
+                "data TEXT NOT NULL)"
+            )
+            # Every change to a table bumps <table>_version in the same transaction
+            for table in ('participants', 'scores'):
+                for event in ('INSERT', 'UPDATE', 'DELETE'):
+                    conn.execute(
+                        f"CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} "
+                        f"AFTER {event} ON {table} BEGIN "
+                        f"INSERT INTO meta (key, value) VALUES ('{table}_version', 1) "
+                        "ON CONFLICT(key) DO UPDATE SET value = value + 1; "
+                        "END"
+                    )
+    
+    def close(self):
+        """Close the connection for the current thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+    
+    def _cache_key(self, table):
+        return (os.path.abspath(self.db_file), table)
+    
+    def _table_version(self, table):
+        row = self._connect().execute(
+            "SELECT value FROM meta WHERE key = ?", (f'{table}_version',)
+        ).fetchone()
+        return row[0] if row else 0
+    
+    def _load_table(self, table):
+        """Load a whole table through the shared snapshot cache"""
+        def loader():
+            rows = self._connect().execute(f"SELECT emp_id, data FROM {table}").fetchall()
+            return {emp_id: json.loads(data) for emp_id, data in rows}
+        return snapshot_cache.get(self._cache_key(table), self._table_version(table), loader)
+    
+    def _iter_table(self, table, chunk_size):
+        """Stream rows chunk_size at a time from one consistent read snapshot"""
+        cursor = self._connect().execute(f"SELECT emp_id, data FROM {table}")
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                for emp_id, data in rows:
+                    yield emp_id, json.loads(data)
+        finally:
+            cursor.close()
+    
+    def _get_row(self, table, emp_id):
+        row = self._connect().execute(
+            f"SELECT data FROM {table} WHERE emp_id = ?", (emp_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def _delete_row(self, table, emp_id):
+        conn = self._connect()
+        with conn:
+            conn.execute(f"DELETE FROM {table} WHERE emp_id = ?", (emp_id,))
+        snapshot_cache.bump(self._cache_key(table))
+    
+    def _participant_row(self, emp_id, record):
+        return (emp_id, record.get('name'), json.dumps(record))
+    
+    def _score_row(self, emp_id, record):
+        return (emp_id, record.get('total', 0), record.get('gift_type'), json.dumps(record))
+    
+    def load_participants(self):
+        return self._load_table('participants')
+    
+    def iter_participants(self, chunk_size=1000):
+        return self._iter_table('participants', chunk_size)
+    
+    def save_participants(self, participants):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM participants")
+            conn.executemany(
+                "INSERT INTO participants (emp_id, name, data) VALUES (?, ?, ?)",
+                [self._participant_row(emp_id, record) for emp_id, record in participants.items()]
+            )
+        snapshot_cache.bump(self._cache_key('participants'))
+    
+    def get_participant(self, emp_id):
+        return self._get_row('participants', emp_id)
+    
+    def upsert_participant(self, emp_id, record):
+        conn = self._connect()
+        with conn:
+            conn.execute(PARTICIPANT_UPSERT, self._participant_row(emp_id, record))
+        snapshot_cache.bump(self._cache_key('participants'))
+    
+    def delete_participant(self, emp_id):
+        self._delete_row('participants', emp_id)
+    
+    def load_scores(self):
+        return self._load_table('scores')
+    
+    def iter_scores(self, chunk_size=1000):
+        return self._iter_table('scores', chunk_size)
+    
+    def save_scores(self, scores):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM scores")
+            conn.executemany(
+                "INSERT INTO scores (emp_id, total, gift_type, data) VALUES (?, ?, ?, ?)",
+                [self._score_row(emp_id, record) for emp_id, record in scores.items()]
+            )
+        snapshot_cache.bump(self._cache_key('scores'))
+    
+    def get_score(self, emp_id):
+        return self._get_row('scores', emp_id)
+    
+    def upsert_score(self, emp_id, record, expected_version=None):
+        conn = self._connect()
+        with self.write_lock():
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT data FROM scores WHERE emp_id = ?", (emp_id,)).fetchone()
+                old_record = json.loads(row[0]) if row else None
+                if expected_version is not None and record_version(old_record) != expected_version:
+                    raise VersionConflict(f"Scores for {emp_id} changed (version {record_version(old_record)}, expected {expected_version})")
+                conn.execute(SCORE_UPSERT, self._score_row(emp_id, record))
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        snapshot_cache.bump(self._cache_key('scores'))
+        return old_record
+    
+    def upsert_scores(self, records):
+        conn = self._connect()
+        old_records = {}
+        with self.write_lock():
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for emp_id in records:
+                    row = conn.execute("SELECT data FROM scores WHERE emp_id = ?", (emp_id,)).fetchone()
+                    old_records[emp_id] = json.loads(row[0]) if row else None
+                conn.executemany(SCORE_UPSERT, [self._score_row(emp_id, record) for emp_id, record in records.items()])
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        snapshot_cache.bump(self._cache_key('scores'))
+        return old_records
+    
+    def delete_score(self, emp_id):
+        self._delete_row('scores', emp_id)
+    
+    def scores_cache_key(self):
+        return self._cache_key('scores')
+    
+    def write_lock(self):
+        return file_lock(self.db_file)
+    
+    def scores_signature(self):
+        return self._table_version('scores')
+    
+    def participants_cache_key(self):
+        return self._cache_key('participants')
+    
+    def participants_signature(self):
+        return self._table_version('participants')
+    
+    def load_aggregate(self):
+        row = self._connect().execute(
+            "SELECT scores_version, data FROM aggregates WHERE name = 'scores'"
+        ).fetchone()
+        if row is None or row[0] != self._table_version('scores'):
+            return None
+        return json.loads(row[1])
+    
+    def save_aggregate(self, aggregate):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO aggregates (name, scores_version, data) "
+                "SELECT 'scores', COALESCE((SELECT value FROM meta WHERE key = 'scores_version'), 0), ? "
+                "ON CONFLICT(name) DO UPDATE SET scores_version = excluded.scores_version, data = excluded.data",
+                (json.dumps(aggregate),)
+            )
+    
+    def import_json(self, participants_file='participants.json', scores_file='scores.json'):
+        """Ingest participants/scores JSON files, upserting each record"""
+        counts = {'participants': 0, 'scores': 0}
+        
+        if os.path.exists(participants_file):
+            with open(participants_file, 'r') as f:
+                participants = json.load(f)
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    PARTICIPANT_UPSERT,
+                    [self._participant_row(emp_id, record) for emp_id, record in participants.items()]
+                )
+            snapshot_cache.bump(self._cache_key('participants'))
+            counts['participants'] = len(participants)
+        
+        if os.path.exists(scores_file):
+            with open(scores_file, 'r') as f:
+                scores = json.load(f)
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    SCORE_UPSERT,
+                    [self._score_row(emp_id, record) for emp_id, record in scores.items()]
+                )
+            snapshot_cache.bump(self._cache_key('scores'))
+            counts['scores'] = len(scores)
+        
+        return counts
+    
+    def export_json(self, participants_file='participants.json', scores_file='scores.json'):
+        """Write the database contents back out in the JSON file format"""
+        atomic_write_json(participants_file, self.load_participants())
+        atomic_write_json(scores_file, self.load_scores())
+
+def get_storage_backend():
+    """Create the storage backend selected by EVENT_TRACKER_STORAGE (json, sqlite or events)"""
+    backend = os.getenv("EVENT_TRACKER_STORAGE", "json").lower()
+    if backend == "sqlite":
+        return SQLiteStorage(os.getenv("EVENT_TRACKER_DB", "event_tracker.db"))
+    if backend == "events":
+        from event_store import SNAPSHOT_EVERY, EventSourcedStorage
+        snapshot_every = int(os.getenv("EVENT_TRACKER_SNAPSHOT_EVERY", SNAPSHOT_EVERY))
+        return EventSourcedStorage(JSONStorage(), snapshot_every=snapshot_every)
+    return JSONStorage()
@@ -0,0 +1,18 @@
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from errors import log_error, set_error_reporter
+
+def streamlit_error(message):
+    """Show message with st.error in a script run; log it from background threads
+    
+    The write-behind, outbox and bulk-mailer threads have no script-run
+    context, so st.error there would drop the message.
+    """
+    if get_script_run_ctx(suppress_warning=True) is None:
+        log_error(message)
+    else:
+        st.error(message)
+
+def install_streamlit_reporter():
+    """Show core error messages in the current Streamlit session with st.error"""
+    set_error_reporter(streamlit_error)
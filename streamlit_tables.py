@@ -0,0 +1,47 @@
+import math
+import streamlit as st
+from database import PAGE_SIZE
+
+def _move(key, step):
+    st.session_state[key] = max(0, st.session_state.get(key, 0) + step)
+
+def paginated_table(fetch, key, page_size=PAGE_SIZE, reset_on=None, prepare=None, **dataframe_args):
+    """Show one page of a query with previous/next controls; returns the Page
+    
+    fetch(offset, limit) returns a database Page; only that page is sent
+    to the browser. The page number lives in st.session_state[key] and
+    goes back to the first page whenever reset_on (e.g. the search term)
+    changes. prepare(rows) turns the page's rows into the table shown.
+    """
+    filter_key = f"{key}_filter"
+    if st.session_state.get(filter_key) != reset_on:
+        st.session_state[filter_key] = reset_on
+        st.session_state[key] = 0
+    page_number = st.session_state.get(key, 0)
+    
+    page = fetch(page_number * page_size, page_size)
+    pages = max(1, math.ceil(page.total / page_size))
+    if page_number >= pages:
+        # Rows were removed since the page was chosen
+        page_number = pages - 1
+        st.session_state[key] = page_number
+        page = fetch(page_number * page_size, page_size)
+    
+    rows = prepare(page.rows) if prepare else page.rows
+    st.dataframe(rows, use_container_width=True, hide_index=True, **dataframe_args)
+    
+    col1, col2, col3 = st.columns([1, 3, 1])
+    with col1:
+        st.button("◀ Previous", key=f"{key}_previous", disabled=page_number == 0,
+                  on_click=_move, args=(key, -1))
+    with col2:
+        if page.total:
+            first = page.offset + 1
+            last = page.offset + len(page.rows)
+            st.caption(f"Rows {first}–{last} of {page.total} · page {page_number + 1} of {pages}")
+        else:
+            st.caption("No matching rows")
+    with col3:
+        st.button("Next ▶", key=f"{key}_next", disabled=page_number >= pages - 1,
+                  on_click=_move, args=(key, 1))
+    return page
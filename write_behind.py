@@ -0,0 +1,229 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+class WriteBehindQueue:
+    """Background writer that batches operator score entries
+    
+    submit() returns as soon as the entry is queued. One writer thread
+    collects entries for flush_interval seconds, applies all their score
+    updates in a single storage write (Database.set_game_scores) and then
+    appends and fsyncs their log entries.
+    
+    Durability: an entry is durable once the flush containing it finishes.
+    Entries still queued when the process is killed are lost. flush() waits
+    until everything submitted so far is written, and close() (run at exit)
+    drains the queue on a normal shutdown. When max_pending entries are
+    waiting, submit() blocks for up to submit_timeout seconds and then
+    raises queue.Full. Entries that fail to store or log are kept in a
+    short list of recent failures (see failures_since) for the operator
+    panel to show.
+    """
+    
+    def __init__(self, database, game_logger, flush_interval=0.05, max_pending=1000, submit_timeout=5.0, max_failures=200):
+        self.db = database
+        self.logger = game_logger
+        self.flush_interval = flush_interval
+        self.submit_timeout = submit_timeout
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._condition = threading.Condition()
+        self._submitted = 0
+        self._written = 0
+        self._pending_scores = {}
+        self._stopping = threading.Event()
+        self.flushes = 0
+        self.failed = 0
+        self.last_error = None
+        self._failures = deque(maxlen=max_failures)
+        self._thread = threading.Thread(target=self._run, name="score-write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+    
+    def submit(self, emp_id, participant_name, game_number, score, operator_username):
+        """Queue one score entry; blocks while the queue is full"""
+        if self._stopping.is_set():
+            raise RuntimeError("Write-behind queue is closed")
+        with self._condition:
+            self._submitted += 1
+            sequence = self._submitted
+            self._pending_scores[(emp_id, game_number)] = (score, sequence)
+        entry = {
+            'sequence': sequence,
+            'emp_id': emp_id,
+            'participant_name': participant_name,
+            'game_number': game_number,
+            'score': score,
+            'operator': operator_username
+        }
+        try:
+            self._queue.put(entry, timeout=self.submit_timeout)
+        except queue.Full:
+            self._finish([entry])
+            raise
+        return sequence
+    
+    def pending_score(self, emp_id, game_number):
+        """Queued score for one game that has not been written yet, or None"""
+        with self._condition:
+            pending = self._pending_scores.get((emp_id, game_number))
+            return pending[0] if pending else None
+    
+    def pending_count(self):
+        """Entries submitted but not yet written"""
+        with self._condition:
+            return self._submitted - self._written
+    
+    def flush(self, timeout=None):
+        """Wait until every entry submitted so far has been written; returns False on timeout"""
+        with self._condition:
+            target = self._submitted
+            return self._condition.wait_for(lambda: self._written >= target, timeout=timeout)
+    
+    def close(self, timeout=30.0):
+        """Stop accepting entries, write everything queued and stop the writer thread"""
+        if self._stopping.is_set():
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+    
+    def stats(self):
+        """Queue depth and flush counters"""
+        return {
+            'pending': self.pending_count(),
+            'flushes': self.flushes,
+            'failed': self.failed,
+            'last_error': self.last_error
+        }
+    
+    def failures_since(self, failure_id=0, game_number=None):
+        """Recent failed entries with an id above failure_id, oldest first
+        
+        Each failure is a dict with id, emp_id, participant_name,
+        game_number, score, operator, stage ('store' when the score was not
+        saved, 'log' when it was saved but not logged) and error. Only the newest
+        max_failures are kept.
+        """
+        with self._condition:
+            return [
+                failure for failure in self._failures
+                if failure['id'] > failure_id and (game_number is None or failure['game_number'] == game_number)
+            ]
+    
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return
+                continue
+            
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while not self._stopping.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            # On shutdown, take everything still queued
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            self._write_batch(batch)
+    
+    def _write_batch(self, batch):
+        try:
+            stored = self._store(batch)
+        except Exception:
+            # One bad entry (e.g. a deleted participant) must not drop the rest
+            stored = []
+            for entry in batch:
+                try:
+                    stored.extend(self._store([entry]))
+                except Exception as e:
+                    self._record_failure(entry, e, 'store')
+        # Scores are stored by now; a log failure must not write them (or log them) again
+        self._log(stored)
+        self.flushes += 1
+        self._finish(batch)
+    
+    def _store(self, batch):
+        """Write the batch's scores; returns [(entry, previous score)]"""
+        previous_scores = self.db.set_game_scores(
+            [(entry['emp_id'], entry['game_number'], entry['score'], entry['operator']) for entry in batch]
+        )
+        return list(zip(batch, previous_scores))
+    
+    def _log(self, stored):
+        """Append a scoring-log entry for each stored score, once"""
+        for entry, previous_score in stored:
+            try:
+                self.logger.log_score_entry(
+                    entry['game_number'],
+                    entry['operator'],
+                    entry['emp_id'],
+                    entry['participant_name'],
+                    entry['score'],
+                    previous_score
+                )
+            except Exception as e:
+                self._record_failure(entry, e, 'log')
+        try:
+            self.logger.writer.flush()
+        except Exception as e:
+            self.last_error = f"Log flush: {str(e)}"
+    
+    def _record_failure(self, entry, error, stage):
+        with self._condition:
+            self.failed += 1
+            self.last_error = f"{entry['emp_id']} game {entry['game_number']}: {str(error)}"
+            self._failures.append({
+                'id': self.failed,
+                'emp_id': entry['emp_id'],
+                'participant_name': entry['participant_name'],
+                'game_number': entry['game_number'],
+                'score': entry['score'],
+                'operator': entry['operator'],
+                'stage': stage,
+                'error': str(error)
+            })
+    
+    def _finish(self, batch):
+        with self._condition:
+            for entry in batch:
+                key = (entry['emp_id'], entry['game_number'])
+                pending = self._pending_scores.get(key)
+                if pending and pending[1] == entry['sequence']:
+                    del self._pending_scores[key]
+            self._written += len(batch)
+            self._condition.notify_all()
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+def write_behind_enabled():
+    """Whether EVENT_TRACKER_WRITE_BEHIND is switched on"""
+    return os.getenv("EVENT_TRACKER_WRITE_BEHIND", "").lower() in ("1", "true", "yes", "on")
+
+def get_write_behind_queue(database, game_logger):
+    """Get the process-wide write-behind queue for this database's score store
+    
+    The flush interval is EVENT_TRACKER_WRITE_BEHIND_MS (default 50 ms).
+    """
+    key = database.storage.scores_cache_key()
+    with _queues_lock:
+        write_queue = _queues.get(key)
+        if write_queue is None:
+            flush_interval = int(os.getenv("EVENT_TRACKER_WRITE_BEHIND_MS", "50")) / 1000
+            write_queue = WriteBehindQueue(database, game_logger, flush_interval=flush_interval)
+            _queues[key] = write_queue
+        return write_queue